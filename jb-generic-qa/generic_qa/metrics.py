@@ -0,0 +1,167 @@
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client import REGISTRY, Gauge
+from jugalbandi.core import HttpClients
+from jugalbandi.speech_processor import SpeechPayloadEncoder, SpeechRouter
+from jugalbandi.translator import TranslatorRouter
+from jugalbandi.storage import LocalStorageJanitor
+
+
+def register_local_storage_metrics(janitor: LocalStorageJanitor):
+    gauges = {
+        "total_bytes": "Bytes used by local storage caches",
+        "entries": "Directories in local storage caches",
+        "in_use": "Local storage cache directories in use by queries",
+        "evicted_entries": "Local storage cache directories evicted",
+        "evicted_bytes": "Bytes evicted from local storage caches",
+    }
+    for field, description in gauges.items():
+        Gauge(f"jb_local_storage_{field}", description).set_function(
+            lambda field=field: getattr(janitor.stats, field)
+        )
+
+
+class HttpClientCollector:
+    def __init__(self, http_clients: HttpClients):
+        self.http_clients = http_clients
+
+    def collect(self):
+        metrics = {
+            "requests": "Requests made to external providers",
+            "connections": "Connections opened to external providers",
+            "reused": "Requests to external providers made on a reused connection",
+        }
+        for field, description in metrics.items():
+            family = GaugeMetricFamily(
+                f"jb_http_client_{field}", description, labels=["provider"]
+            )
+            for provider, stats in self.http_clients.stats.items():
+                family.add_metric([provider], getattr(stats, field))
+            yield family
+
+
+def register_http_client_metrics(http_clients: HttpClients):
+    REGISTRY.register(HttpClientCollector(http_clients))
+
+
+class TranslatorRoutingCollector:
+    def __init__(self, router: TranslatorRouter):
+        self.router = router
+
+    def collect(self):
+        labels = ["provider", "source_language", "destination_language"]
+        latency = GaugeMetricFamily(
+            "jb_translator_latency_seconds",
+            "Moving average latency of translation providers",
+            labels=labels,
+        )
+        error_rate = GaugeMetricFamily(
+            "jb_translator_error_rate",
+            "Moving average error rate of translation providers",
+            labels=labels,
+        )
+        circuit_open = GaugeMetricFamily(
+            "jb_translator_circuit_open",
+            "Whether the circuit breaker of a translation provider is open",
+            labels=labels,
+        )
+        for (provider, source, destination), health in self.router.health.items():
+            key = [provider, source, destination]
+            if health.latency is not None:
+                latency.add_metric(key, health.latency)
+            error_rate.add_metric(key, health.error_rate)
+            circuit_open.add_metric(key, int(health.opened_at is not None))
+        yield latency
+        yield error_rate
+        yield circuit_open
+
+        counters = {
+            "routed": "Translation requests routed to a provider first",
+            "hedges": "Hedged translation requests sent to a provider",
+            "hedge_wins": "Hedged translation requests answered first",
+            "circuit_opens": "Times the circuit breaker of a provider opened",
+        }
+        for field, description in counters.items():
+            family = CounterMetricFamily(
+                f"jb_translator_{field}", description, labels=["provider"]
+            )
+            for provider, stats in self.router.stats.items():
+                family.add_metric([provider], getattr(stats, field))
+            yield family
+
+
+def register_translator_routing_metrics(router: TranslatorRouter):
+    REGISTRY.register(TranslatorRoutingCollector(router))
+
+
+class SpeechPayloadCollector:
+    def __init__(self, encoder: SpeechPayloadEncoder):
+        self.encoder = encoder
+
+    def collect(self):
+        counters = {
+            "requests": "Speech to text requests made to providers",
+            "wav_bytes": "Bytes of WAV audio to be recognized",
+            "sent_bytes": "Bytes of encoded audio sent to speech providers",
+            "encode_seconds": "Seconds spent encoding audio for speech providers",
+            "encode_failures": "Failed encodings of audio for speech providers",
+        }
+        for field, description in counters.items():
+            family = CounterMetricFamily(
+                f"jb_speech_payload_{field}", description, labels=["provider"]
+            )
+            for provider, stats in self.encoder.stats.items():
+                family.add_metric([provider], getattr(stats, field))
+            yield family
+
+
+def register_speech_payload_metrics(encoder: SpeechPayloadEncoder):
+    REGISTRY.register(SpeechPayloadCollector(encoder))
+
+
+class SpeechRoutingCollector:
+    def __init__(self, router: SpeechRouter):
+        self.router = router
+
+    def collect(self):
+        labels = ["provider", "task", "language"]
+        latency = GaugeMetricFamily(
+            "jb_speech_latency_seconds",
+            "Moving average latency of speech providers",
+            labels=labels,
+        )
+        error_rate = GaugeMetricFamily(
+            "jb_speech_error_rate",
+            "Moving average error rate of speech providers",
+            labels=labels,
+        )
+        circuit_open = GaugeMetricFamily(
+            "jb_speech_circuit_open",
+            "Whether the circuit breaker of a speech provider is open",
+            labels=labels,
+        )
+        for (provider, task, language), health in self.router.health.items():
+            key = [provider, task, language]
+            if health.latency is not None:
+                latency.add_metric(key, health.latency)
+            error_rate.add_metric(key, health.error_rate)
+            circuit_open.add_metric(key, int(health.opened_at is not None))
+        yield latency
+        yield error_rate
+        yield circuit_open
+
+        counters = {
+            "routed": "Speech requests routed to a provider first",
+            "failovers": "Speech requests sent to a provider after another failed",
+            "circuit_opens": "Times the circuit breaker of a speech provider opened",
+        }
+        for field, description in counters.items():
+            family = CounterMetricFamily(
+                f"jb_speech_{field}", description, labels=["provider"]
+            )
+            for provider, stats in self.router.stats.items():
+                family.add_metric([provider], getattr(stats, field))
+            yield family
+
+
+def register_speech_routing_metrics(router: SpeechRouter):
+    REGISTRY.register(SpeechRoutingCollector(router))
@@ -6,7 +6,7 @@ from typing import Annotated, List
 from asyncpg import Pool
 
 from doc_collection.doc_db import DOCRepository
-from doc_collection.repository import ExtendedDocumentCollection
+from doc_collection.repository import ExtendedDocumentRepository
 from fastapi.security import OAuth2PasswordRequestForm
 
 from fastapi.security.api_key import APIKey
@@ -59,6 +59,8 @@ async def process_files(
     
     if document_id:
         document = await get_document_info(document_id, doc_db)
+        # build on the latest manifest, other workers may have changed it
+        document_repository.invalidate_collection(document["uuid_number"])
         document_collection = document_repository.get_collection(document["uuid_number"])
     else:
         document_collection = document_repository.new_collection()
@@ -183,13 +185,14 @@ async def update_or_add_document(
 )
 async def delete_document(
     document_id: int,
-    document_repository: ExtendedDocumentCollection = Depends(get_document_repository),
+    document_repository: ExtendedDocumentRepository = Depends(get_document_repository),
     doc_db: DOCRepository = Depends(get_document_repo),
 ):
     print(document_id)
     try:   
         document = await get_document_info(document_id, doc_db)
         uuid_no = document["uuid_number"]
+        document_repository.invalidate_collection(uuid_no)
         collection = document_repository.get_collection(uuid_no)
         await collection.remove_file(uuid_no)
 
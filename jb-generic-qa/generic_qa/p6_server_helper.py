@@ -5,6 +5,13 @@ from doc_collection.repository import ExtendedDocumentCollection, ExtendedDocume
 from storage.google_storage import P6GoogleStorage
 from storage.storage import P6LocalStorage
 from .server_env import init_env
+from .server_helper import (
+    get_local_storage_janitor,
+    get_speech_processor,
+    get_translation_cache,
+    get_translator_router,
+    get_tts_cache,
+)
 from jose import JWTError
 from fastapi import HTTPException, Depends, status, Security
 from fastapi.security import OAuth2PasswordBearer
@@ -18,14 +25,10 @@ from jugalbandi.qa import (
     TextConverter,
     LangchainQAModel,
 )
-from jugalbandi.speech_processor import (
-    CompositeSpeechProcessor,
-    DhruvaSpeechProcessor,
-    GoogleSpeechProcessor,
-    AzureSpeechProcessor,
-)
+from jugalbandi.speech_processor import TTSCache
 from jugalbandi.translator import (
     CompositeTranslator,
+    LongTextTranslator,
     GoogleTranslator,
     DhruvaTranslator,
     AzureTranslator,
@@ -63,7 +66,8 @@ async def get_document_repository() -> ExtendedDocumentRepository:
     # TODO: Rename the env variable
     return ExtendedDocumentRepository(P6LocalStorage(os.environ["DOCUMENT_LOCAL_STORAGE_PATH"]),
                               P6GoogleStorage(os.environ["GCP_BUCKET_NAME"],
-                              os.environ["GCP_BUCKET_FOLDER_NAME"]))
+                              os.environ["GCP_BUCKET_FOLDER_NAME"]),
+                              janitor=await get_local_storage_janitor())
 
 
 async def get_document_collection(
@@ -75,16 +79,15 @@ async def get_document_collection(
     return document_repository.get_collection(uuid_number)
 
 
-async def get_speech_processor():
-    return CompositeSpeechProcessor(DhruvaSpeechProcessor(),
-                                    AzureSpeechProcessor(),
-                                    GoogleSpeechProcessor())
-
-
 async def get_translator():
-    return CompositeTranslator(AzureTranslator(),
-                               DhruvaTranslator(),
-                               GoogleTranslator())
+    # answers are translated sentence by sentence, sentences are cached
+    return LongTextTranslator(
+        CompositeTranslator(AzureTranslator(),
+                            DhruvaTranslator(),
+                            GoogleTranslator(),
+                            cache=await get_translation_cache(),
+                            router=await get_translator_router())
+    )
 
 async def get_gpt_index_qa_engine(
     document_collection: Annotated[
@@ -92,8 +95,10 @@ async def get_gpt_index_qa_engine(
     ],
     speech_processor: Annotated[ExtendedDocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
-    return GPTIndexQAEngine(document_collection, speech_processor, translator)
+    return GPTIndexQAEngine(document_collection, speech_processor, translator,
+                            tts_cache=tts_cache)
 
 
 async def get_langchain_gpt3_qa_engine(
@@ -102,9 +107,11 @@ async def get_langchain_gpt3_qa_engine(
     ],
     speech_processor: Annotated[ExtendedDocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
     return LangchainQAEngine(
-        document_collection, speech_processor, translator, LangchainQAModel.GPT3
+        document_collection, speech_processor, translator, LangchainQAModel.GPT3,
+        tts_cache=tts_cache,
     )
 
 
@@ -114,9 +121,11 @@ async def get_langchain_gpt35_turbo_qa_engine(
     ],
     speech_processor: Annotated[ExtendedDocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
     return LangchainQAEngine(
-        document_collection, speech_processor, translator, LangchainQAModel.GPT35_TURBO
+        document_collection, speech_processor, translator, LangchainQAModel.GPT35_TURBO,
+        tts_cache=tts_cache,
     )
 
 
@@ -126,9 +135,11 @@ async def get_langchain_gpt4_qa_engine(
     ],
     speech_processor: Annotated[ExtendedDocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
     return LangchainQAEngine(
-        document_collection, speech_processor, translator, LangchainQAModel.GPT4
+        document_collection, speech_processor, translator, LangchainQAModel.GPT4,
+        tts_cache=tts_cache,
     )
 
 
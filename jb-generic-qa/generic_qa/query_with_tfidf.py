@@ -3,10 +3,9 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 import os
 import re
 import csv
-import tempfile
 import numpy as np
 from jugalbandi.core.language import Language
-from jugalbandi.audio_converter import convert_to_wav_with_ffmpeg
+from jugalbandi.audio_converter import convert_bytes_to_wav_with_ffmpeg
 from jugalbandi.core.errors import InternalServerException
 
 
@@ -85,10 +84,7 @@ async def querying_with_tfidf(
 
     if query == "":
         if audio_file is not None:
-            local_file = tempfile.NamedTemporaryFile()
-            local_file.write(audio_file.file.read())
-
-            wav_data = await convert_to_wav_with_ffmpeg(local_file.name)
+            wav_data = await convert_bytes_to_wav_with_ffmpeg(await audio_file.read())
             converted_query = await speech_processor.speech_to_text(wav_data,
                                                                     input_language)
             query = await translator.translate_text(
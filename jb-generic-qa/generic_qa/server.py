@@ -1,26 +1,30 @@
 from .server_env import init_env
-from typing import Annotated, List
+from typing import Annotated, Dict, List
 from fastapi import FastAPI, UploadFile, Depends, Query, File
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security.api_key import APIKey
 from jugalbandi.core import (
   Language,
   MediaFormat,
   IncorrectInputException,
-  SpeechProcessor as SpeechProcessorEnum
+  SpeechProcessor as SpeechProcessorEnum,
+  HttpClients,
 )
 from jugalbandi.translator import (
   Translator,
-  AzureTranslator
+  Transliterator,
 )
 from jugalbandi.speech_processor import (
   SpeechProcessor,
-  AzureSpeechProcessor,
-  GoogleSpeechProcessor,
-  DhruvaSpeechProcessor
+  AsyncAzureSpeech,
+  SpeechPayloadEncoder,
+)
+from jugalbandi.audio_converter import (
+  AudioCodec,
+  convert_to_wav_with_ffmpeg,
+  shutdown_encoder_pool,
 )
-from jugalbandi.audio_converter import convert_to_wav_with_ffmpeg
 from jugalbandi.tenant import TenantRepository
 from jugalbandi.document_collection import (
     DocumentRepository,
@@ -48,16 +52,29 @@ from .server_helper import (
     get_text_converter,
     verify_access_token,
     get_document_repository,
+    get_local_storage_janitor,
+    get_translator_router,
     get_speech_processor,
+    get_speech_providers,
+    get_speech_router,
     get_translator,
+    get_transliterator,
     User,
 )
 
 from .p6_server import router
+from .metrics import (
+    register_http_client_metrics,
+    register_local_storage_metrics,
+    register_speech_payload_metrics,
+    register_speech_routing_metrics,
+    register_translator_routing_metrics,
+)
 
 
 from prometheus_fastapi_instrumentator import Instrumentator
 import base64
+import json
 # from .server_middleware import ApiKeyMiddleware
 
 init_env()
@@ -106,6 +123,35 @@ app.add_middleware(
 app.include_router(router, prefix="/p6_server")
 
 Instrumentator().instrument(app).expose(app)
+
+
+@app.on_event("startup")
+async def start_local_storage_janitor():
+    janitor = await get_local_storage_janitor()
+    register_local_storage_metrics(janitor)
+    janitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_local_storage_janitor():
+    janitor = await get_local_storage_janitor()
+    await janitor.stop()
+
+
+@app.on_event("startup")
+async def start_http_clients():
+    register_http_client_metrics(HttpClients())
+    register_translator_routing_metrics(await get_translator_router())
+    register_speech_payload_metrics(SpeechPayloadEncoder())
+    register_speech_routing_metrics(await get_speech_router())
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await HttpClients().close()
+    AsyncAzureSpeech.shutdown()
+    shutdown_encoder_pool()
+
 # app.add_middleware(ApiKeyMiddleware, tenant_repository=get_tenant_repository()
 
 @app.exception_handler(Exception)
@@ -307,6 +353,7 @@ async def query_with_voice_input_gpt3_5(
     query_text: str = "",
     audio_url: str = "",
     prompt: str = "",
+    audio_codec: AudioCodec = AudioCodec.MP3,
 ) -> QueryResponse:
     return await langchain_qa_engine.query(
         query=query_text,
@@ -315,6 +362,7 @@ async def query_with_voice_input_gpt3_5(
         output_format=output_format,
         prompt=prompt,
         source_text_filtering=False,
+        audio_codec=audio_codec,
     )
 
 
@@ -332,6 +380,7 @@ async def query_with_voice_input_gpt4(
     query_text: str = "",
     audio_url: str = "",
     prompt: str = "",
+    audio_codec: AudioCodec = AudioCodec.MP3,
 ) -> QueryResponse:
     return await langchain_qa_engine.query(
         query=query_text,
@@ -339,9 +388,46 @@ async def query_with_voice_input_gpt4(
         input_language=input_language,
         output_format=output_format,
         prompt=prompt,
+        audio_codec=audio_codec,
     )
 
 
+@app.get(
+    "/query-using-voice-stream",
+    summary="Query using voice with langchain (GPT-3.5) with custom prompt, "
+    "streaming the audio of the answer sentence by sentence",
+    tags=["Q&A over Document Store"],
+)
+async def query_with_voice_input_gpt3_5_stream(
+    authorization: Annotated[User, Depends(verify_access_token)],
+    api_key: Annotated[APIKey, Depends(get_api_key)],
+    langchain_qa_engine: Annotated[QAEngine,
+                                   Depends(get_langchain_gpt35_turbo_qa_engine)],
+    input_language: Language,
+    query_text: str = "",
+    audio_url: str = "",
+    prompt: str = "",
+    audio_codec: AudioCodec = AudioCodec.MP3,
+) -> StreamingResponse:
+    response, audio_urls = await langchain_qa_engine.query_with_audio_stream(
+        query=query_text,
+        speech_query_url=audio_url,
+        input_language=input_language,
+        prompt=prompt,
+        source_text_filtering=False,
+        audio_codec=audio_codec,
+    )
+
+    # newline delimited JSON: the response first, then the audio URL of
+    # each segment of the answer, in order, as soon as it is available
+    async def _lines():
+        yield response.json() + "\n"
+        async for url in audio_urls:
+            yield json.dumps({"audio_output_url": url}) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @app.get("/rephrased-query")
 async def get_rephrased_query(
     authorization: Annotated[User, Depends(verify_access_token)],
@@ -417,14 +503,12 @@ async def get_speech_to_text(
     authorization: Annotated[User, Depends(verify_access_token)],
     speech_query_url: str,
     language: Language,
-    speech_processor_enum: SpeechProcessorEnum
+    speech_processor_enum: SpeechProcessorEnum,
+    speech_providers: Annotated[
+        Dict[SpeechProcessorEnum, SpeechProcessor], Depends(get_speech_providers)
+    ],
 ):
-    if speech_processor_enum.value == "Azure":
-        speech_processor = AzureSpeechProcessor()
-    elif speech_processor_enum.value == "Google":
-        speech_processor = GoogleSpeechProcessor()
-    else:
-        speech_processor = DhruvaSpeechProcessor()
+    speech_processor = speech_providers[speech_processor_enum]
 
     wav_data = await convert_to_wav_with_ffmpeg(speech_query_url)
     text = await speech_processor.speech_to_text(wav_data, language)
@@ -441,17 +525,17 @@ async def get_text_to_speech(
     authorization: Annotated[User, Depends(verify_access_token)],
     text_query: str,
     language: Language,
-    speech_processor_enum: SpeechProcessorEnum
+    speech_processor_enum: SpeechProcessorEnum,
+    speech_providers: Annotated[
+        Dict[SpeechProcessorEnum, SpeechProcessor], Depends(get_speech_providers)
+    ],
+    audio_codec: AudioCodec = AudioCodec.MP3,
 ):
-    if speech_processor_enum.value == "Azure":
-        speech_processor = AzureSpeechProcessor()
-    elif speech_processor_enum.value == "Google":
-        speech_processor = GoogleSpeechProcessor()
-    else:
-        speech_processor = DhruvaSpeechProcessor()
+    speech_processor = speech_providers[speech_processor_enum]
 
     print(text_query)
-    audio_bytes = await speech_processor.text_to_speech(text_query, language)
+    audio_bytes = await speech_processor.text_to_speech(
+        text_query, language, codec=audio_codec)
     audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
     return {"audio_bytes": audio_base64}
 
@@ -464,14 +548,13 @@ async def get_text_to_speech(
 )
 async def get_azure_hinglish_transliterator(
     authorization: Annotated[User, Depends(verify_access_token)],
+    transliterator: Annotated[Transliterator, Depends(get_transliterator)],
     text_query: str,
 ):
-    translator = AzureTranslator()
-    print(text_query)
-    transliterated_text = await translator.transliterate_text(text_query,
-                                                              source_language=Language.HI,
-                                                              from_script="Latn",
-                                                              to_script="Deva")
+    transliterated_text = await transliterator.transliterate_text(text_query,
+                                                                  language=Language.HI,
+                                                                  from_script="Latn",
+                                                                  to_script="Deva")
     return {"transliterated_text": transliterated_text}
 
 
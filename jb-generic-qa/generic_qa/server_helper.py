@@ -1,11 +1,12 @@
 import os
-from typing import Annotated
+from typing import Annotated, Dict
 from .server_env import init_env
 from jose import JWTError
 from fastapi import HTTPException, Depends, status, Security
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.security.api_key import APIKeyHeader
 from pydantic import BaseModel
+from jugalbandi.core import SpeechProcessor as SpeechProcessorEnum
 from jugalbandi.core.caching import aiocached
 from jugalbandi.core.errors import QuotaExceededException, UnAuthorisedException
 from jugalbandi.document_collection import (
@@ -14,6 +15,7 @@ from jugalbandi.document_collection import (
     LocalStorage,
     GoogleStorage,
 )
+from jugalbandi.storage import LocalStorageJanitor
 from jugalbandi.qa import (
     GPTIndexQAEngine,
     LangchainQAEngine,
@@ -25,13 +27,24 @@ from jugalbandi.speech_processor import (
     DhruvaSpeechProcessor,
     GoogleSpeechProcessor,
     AzureSpeechProcessor,
+    LongAudioSpeechProcessor,
+    SpeechProcessor,
+    SpeechRouter,
+    TTSCache,
 )
 from jugalbandi.translator import (
     CompositeTranslator,
+    LongTextTranslator,
     GoogleTranslator,
     DhruvaTranslator,
+    SqliteTranslationStore,
+    TranslationCache,
+    TranslatorRouter,
     AzureTranslator,
     Translator,
+    Transliterator,
+    AzureTransliterator,
+    CachingTransliterator,
 )
 from jugalbandi.auth_token.token import decode_token
 from jugalbandi.feedback import QAFeedbackRepository, FeedbackRepository
@@ -60,12 +73,23 @@ async def verify_access_token(token: Annotated[str, Depends(reusable_oauth)]):
     return User(username=username, email=username)
 
 
+@aiocached(cache={})
+async def get_local_storage_janitor() -> LocalStorageJanitor:
+    max_age = os.environ.get("LOCAL_STORAGE_MAX_AGE_SECONDS")
+    return LocalStorageJanitor(
+        [os.environ["DOCUMENT_LOCAL_STORAGE_PATH"]],
+        max_bytes=int(os.environ.get("LOCAL_STORAGE_MAX_BYTES", 10 * 1024**3)),
+        max_age=float(max_age) if max_age else None,
+    )
+
+
 @aiocached(cache={})
 async def get_document_repository() -> DocumentRepository:
     # TODO: Rename the env variable
     return DocumentRepository(LocalStorage(os.environ["DOCUMENT_LOCAL_STORAGE_PATH"]),
                               GoogleStorage(os.environ["GCP_BUCKET_NAME"],
-                              os.environ["GCP_BUCKET_FOLDER_NAME"]))
+                              os.environ["GCP_BUCKET_FOLDER_NAME"]),
+                              janitor=await get_local_storage_janitor())
 
 
 async def get_document_collection(
@@ -77,16 +101,66 @@ async def get_document_collection(
     return document_repository.get_collection(uuid_number)
 
 
-async def get_speech_processor():
-    return CompositeSpeechProcessor(DhruvaSpeechProcessor(),
-                                    AzureSpeechProcessor(),
-                                    GoogleSpeechProcessor())
+@aiocached(cache={})
+async def get_speech_providers() -> Dict[SpeechProcessorEnum, SpeechProcessor]:
+    # providers hold clients and configuration, they are shared by all requests
+    return {
+        SpeechProcessorEnum.DHRUVA: DhruvaSpeechProcessor(),
+        SpeechProcessorEnum.AZURE: AzureSpeechProcessor(),
+        SpeechProcessorEnum.GOOGLE: GoogleSpeechProcessor(),
+    }
+
+
+@aiocached(cache={})
+async def get_speech_router() -> SpeechRouter:
+    return SpeechRouter()
+
+
+@aiocached(cache={})
+async def get_speech_processor() -> SpeechProcessor:
+    providers = await get_speech_providers()
+    # long voice notes are recognized in segments split at pauses
+    return LongAudioSpeechProcessor(
+        CompositeSpeechProcessor(providers[SpeechProcessorEnum.DHRUVA],
+                                 providers[SpeechProcessorEnum.AZURE],
+                                 providers[SpeechProcessorEnum.GOOGLE],
+                                 router=await get_speech_router())
+    )
+
+
+@aiocached(cache={})
+async def get_tts_cache() -> TTSCache:
+    return TTSCache(GoogleStorage(os.environ["GCP_BUCKET_NAME"],
+                                  f"{os.environ['GCP_BUCKET_FOLDER_NAME']}/output_audio_files"))
+
+
+@aiocached(cache={})
+async def get_translation_cache() -> TranslationCache:
+    store_path = os.environ.get("TRANSLATION_CACHE_PATH")
+    return TranslationCache(
+        store=SqliteTranslationStore(store_path) if store_path else None
+    )
+
+
+@aiocached(cache={})
+async def get_translator_router() -> TranslatorRouter:
+    return TranslatorRouter(hedging=os.environ.get("TRANSLATION_HEDGING") == "true")
+
+
+@aiocached(cache={})
+async def get_transliterator() -> Transliterator:
+    return CachingTransliterator(AzureTransliterator(), await get_translation_cache())
 
 
 async def get_translator():
-    return CompositeTranslator(AzureTranslator(),
-                               DhruvaTranslator(),
-                               GoogleTranslator())
+    # answers are translated sentence by sentence, sentences are cached
+    return LongTextTranslator(
+        CompositeTranslator(AzureTranslator(),
+                            DhruvaTranslator(),
+                            GoogleTranslator(),
+                            cache=await get_translation_cache(),
+                            router=await get_translator_router())
+    )
 
 async def get_gpt_index_qa_engine(
     document_collection: Annotated[
@@ -94,8 +168,10 @@ async def get_gpt_index_qa_engine(
     ],
     speech_processor: Annotated[DocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
-    return GPTIndexQAEngine(document_collection, speech_processor, translator)
+    return GPTIndexQAEngine(document_collection, speech_processor, translator,
+                            tts_cache=tts_cache)
 
 
 async def get_langchain_gpt3_qa_engine(
@@ -104,9 +180,11 @@ async def get_langchain_gpt3_qa_engine(
     ],
     speech_processor: Annotated[DocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
     return LangchainQAEngine(
-        document_collection, speech_processor, translator, LangchainQAModel.GPT3
+        document_collection, speech_processor, translator, LangchainQAModel.GPT3,
+        tts_cache=tts_cache,
     )
 
 
@@ -116,9 +194,11 @@ async def get_langchain_gpt35_turbo_qa_engine(
     ],
     speech_processor: Annotated[DocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
     return LangchainQAEngine(
-        document_collection, speech_processor, translator, LangchainQAModel.GPT35_TURBO
+        document_collection, speech_processor, translator, LangchainQAModel.GPT35_TURBO,
+        tts_cache=tts_cache,
     )
 
 
@@ -128,9 +208,11 @@ async def get_langchain_gpt4_qa_engine(
     ],
     speech_processor: Annotated[DocumentCollection, Depends(get_speech_processor)],
     translator: Annotated[Translator, Depends(get_translator)],
+    tts_cache: Annotated[TTSCache, Depends(get_tts_cache)],
 ):
     return LangchainQAEngine(
-        document_collection, speech_processor, translator, LangchainQAModel.GPT4
+        document_collection, speech_processor, translator, LangchainQAModel.GPT4,
+        tts_cache=tts_cache,
     )
 
 
@@ -4,11 +4,14 @@ from jose import JWTError
 from jugalbandi.core.caching import aiocached
 from jugalbandi.auth_token.token import decode_token, decode_refresh_token
 from jugalbandi.legal_library import LegalLibrary
-from jugalbandi.storage import GoogleStorage
+from jugalbandi.storage import GoogleStorage, LocalStorageJanitor
 from jugalbandi.translator import (
     CompositeTranslator,
     GoogleTranslator,
     DhruvaTranslator,
+    SqliteTranslationStore,
+    TranslationCache,
+    TranslatorRouter,
 )
 from jugalbandi.jiva_repository import JivaRepository
 from .model import User
@@ -31,16 +34,46 @@ async def get_jiva_repo() -> JivaRepository:
     return jiva_repo
 
 
+@aiocached(cache={})
+async def get_local_storage_janitor() -> LocalStorageJanitor:
+    max_age = os.environ.get("LOCAL_STORAGE_MAX_AGE_SECONDS")
+    return LocalStorageJanitor(
+        [],
+        max_bytes=int(os.environ.get("LOCAL_STORAGE_MAX_BYTES", 10 * 1024**3)),
+        max_age=float(max_age) if max_age else None,
+    )
+
+
 @aiocached(cache={})
 async def get_library() -> LegalLibrary:
     bucket_name = os.environ["JIVA_LIBRARY_BUCKET"]
     library_path = os.environ["JIVA_LIBRARY_PATH"]
     google_storage = GoogleStorage(bucket_name, library_path)
-    return LegalLibrary(id="jiva", store=google_storage)
+    return LegalLibrary(
+        id="jiva", store=google_storage, janitor=await get_local_storage_janitor()
+    )
+
+
+@aiocached(cache={})
+async def get_translation_cache() -> TranslationCache:
+    store_path = os.environ.get("TRANSLATION_CACHE_PATH")
+    return TranslationCache(
+        store=SqliteTranslationStore(store_path) if store_path else None
+    )
+
+
+@aiocached(cache={})
+async def get_translator_router() -> TranslatorRouter:
+    return TranslatorRouter(hedging=os.environ.get("TRANSLATION_HEDGING") == "true")
 
 
 async def get_translator():
-    return CompositeTranslator(GoogleTranslator(), DhruvaTranslator())
+    return CompositeTranslator(
+        GoogleTranslator(),
+        DhruvaTranslator(),
+        cache=await get_translation_cache(),
+        router=await get_translator_router(),
+    )
 
 
 async def verify_access_token(
@@ -7,6 +7,8 @@ def create_app(**kwargs):
     app = FastAPI()
     add_cors(app)
     mount_routes(app)
+    add_local_storage_janitor(app)
+    add_http_clients(app)
     return app
 
 
@@ -26,3 +28,25 @@ def add_cors(app):
         allow_methods=["*"],
         allow_headers=["*"],
     )
+
+
+def add_local_storage_janitor(app):
+    from .helper import get_local_storage_janitor
+
+    @app.on_event("startup")
+    async def start_local_storage_janitor():
+        janitor = await get_local_storage_janitor()
+        janitor.start()
+
+    @app.on_event("shutdown")
+    async def stop_local_storage_janitor():
+        janitor = await get_local_storage_janitor()
+        await janitor.stop()
+
+
+def add_http_clients(app):
+    from jugalbandi.core import HttpClients
+
+    @app.on_event("shutdown")
+    async def close_http_clients():
+        await HttpClients().close()
@@ -22,7 +22,12 @@ import csv
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 from dotenv import load_dotenv
-from jugalbandi.translator import GoogleTranslator
+from jugalbandi.translator import (
+    CachingTranslator,
+    GoogleTranslator,
+    SqliteTranslationStore,
+    TranslationCache,
+)
 from jugalbandi.core.language import Language
 
 
@@ -199,46 +204,48 @@ async def act_uploading_process(jiva_library: Library, csv_file_name: str):
 
 # Function to translate certain metadata fields to Kannada & Hindi
 async def translate_meta_data(jiva_library: Library, translator: GoogleTranslator):
+    # act titles repeat across documents, translate each one only once, also
+    # across runs
+    cached_translator = CachingTranslator(
+        translator, TranslationCache(store=SqliteTranslationStore("tools/translations.db"))
+    )
     catalog = await jiva_library.catalog()
     with open("tools/docs_meta_data.csv", "r") as csv_input:
         reader = csv.DictReader(csv_input)
-        counter = 1
+        rows = []
         for row in reader:
             cat = row["Document ID"]
-            print("\nFile Count:", counter)
-            print("Document ID:", cat)
             meta_data = catalog[cat]
-            title = meta_data.title
-            legal_act_title = meta_data.extra_data["legal_act_title"]
-            legal_ministry = meta_data.extra_data["legal_ministry"]
-            kn_translated_title = await translator.translate_text(title, Language.EN, Language.KN)
-            hi_translated_title = await translator.translate_text(title, Language.EN, Language.HI)
-            kn_translated_legal_act_title = await translator.translate_text(legal_act_title, Language.EN, Language.KN)
-            hi_translated_legal_act_title = await translator.translate_text(legal_act_title, Language.EN, Language.HI)
-            if legal_ministry != "":
-                kn_translated_legal_ministry = await translator.translate_text(legal_ministry, Language.EN, Language.KN)
-                hi_translated_legal_ministry = await translator.translate_text(legal_ministry, Language.EN, Language.HI)
-            else:
-                kn_translated_legal_ministry = ""
-                hi_translated_legal_ministry = ""
-            with open("tools/translated_new_meta_data.csv", "a", newline="") as csv_output:
-                writer = csv.DictWriter(csv_output, fieldnames=["Document ID", "Title", "Legal Act Title",
-                                                                "Legal Ministry", "Title in Kannada", "Legal Act Title in Kannada",
-                                                                "Legal Ministry in Kannada", "Title in Hindi", "Legal Act Title in Hindi",
-                                                                "Legal Ministry in Hindi"])
-                writer.writerow({
-                    "Document ID": cat,
-                    "Title": title,
-                    "Legal Act Title": legal_act_title,
-                    "Legal Ministry": legal_ministry,
-                    "Title in Kannada": kn_translated_title,
-                    "Legal Act Title in Kannada": kn_translated_legal_act_title,
-                    "Legal Ministry in Kannada": kn_translated_legal_ministry,
-                    "Title in Hindi": hi_translated_title,
-                    "Legal Act Title in Hindi": hi_translated_legal_act_title,
-                    "Legal Ministry in Hindi": hi_translated_legal_ministry
-                })
-            counter += 1
+            rows.append((cat, meta_data.title, meta_data.extra_data["legal_act_title"],
+                         meta_data.extra_data["legal_ministry"]))
+    # translate the fields of all documents together, in as few requests as
+    # the translation API allows
+    texts = [text for _, title, legal_act_title, legal_ministry in rows
+             for text in (title, legal_act_title, legal_ministry)]
+    kn_translations = await cached_translator.translate_batch(texts, Language.EN, Language.KN)
+    hi_translations = await cached_translator.translate_batch(texts, Language.EN, Language.HI)
+    with open("tools/translated_new_meta_data.csv", "a", newline="") as csv_output:
+        writer = csv.DictWriter(csv_output, fieldnames=["Document ID", "Title", "Legal Act Title",
+                                                        "Legal Ministry", "Title in Kannada", "Legal Act Title in Kannada",
+                                                        "Legal Ministry in Kannada", "Title in Hindi", "Legal Act Title in Hindi",
+                                                        "Legal Ministry in Hindi"])
+        for counter, (cat, title, legal_act_title, legal_ministry) in enumerate(rows):
+            print("\nFile Count:", counter + 1)
+            print("Document ID:", cat)
+            kn = kn_translations[3 * counter:3 * counter + 3]
+            hi = hi_translations[3 * counter:3 * counter + 3]
+            writer.writerow({
+                "Document ID": cat,
+                "Title": title,
+                "Legal Act Title": legal_act_title,
+                "Legal Ministry": legal_ministry,
+                "Title in Kannada": kn[0],
+                "Legal Act Title in Kannada": kn[1],
+                "Legal Ministry in Kannada": kn[2],
+                "Title in Hindi": hi[0],
+                "Legal Act Title in Hindi": hi[1],
+                "Legal Ministry in Hindi": hi[2]
+            })
 
 
 # Function to update translated metadata fields in DocumentMetaData object for each document and upload it to cloud storage
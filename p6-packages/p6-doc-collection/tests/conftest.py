@@ -4,7 +4,6 @@ from typing import Dict
 from zipfile import ZipFile
 from jugalbandi.document_collection.repository import DocumentSourceFile, WrapSyncReader
 import pytest
-import asyncio
 import pytest_asyncio
 import tempfile
 
@@ -45,9 +44,7 @@ async def doc_repo():
         repo = DocumentRepository(local_store, remote_store)
         yield repo
 
-    async with asyncio.TaskGroup() as task_group:
-        async for f in remote_store.list_all_files(""):
-            task_group.create_task(remote_store.remove_file(f))
+    await remote_store.remove_folder("")
 
     await repo.shutdown()
 
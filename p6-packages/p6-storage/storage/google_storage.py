@@ -1,10 +1,11 @@
-from typing import AsyncIterator, Self
+import asyncio
+from typing import AsyncIterator, List, Self
 import os
 import logging
 import aiohttp
 from gcloud.aio.storage import Storage as GoogleAioStorage  # for async operations
 from google.cloud import storage  # for synchronous operations
-from gcloud.aio.auth import Token
+from jugalbandi.storage import GoogleStorage
 from storage.storage import P6Storage
 from tenacity import (
     retry,
@@ -25,6 +26,8 @@ STORAGE_EMULATOR_HOST = os.environ.get("STORAGE_EMULATOR_HOST")
 if STORAGE_EMULATOR_HOST:
     VERIFY_SSL = False
 
+REMOVE_CONCURRENCY = 16
+
 
 @retry(
     wait=wait_random_exponential(multiplier=1, max=60),
@@ -39,70 +42,9 @@ async def _list_objects(client, bucket_name: str, params):
     return data
 
 
-@retry(
-    wait=wait_random_exponential(multiplier=1, max=60),
-    after=after_log(logger, logging.DEBUG),
-)
-async def _upload(client, bucket_name, object_name, content):
-    status = await client.upload(bucket_name, object_name, content)
-    return status
-
-
-class P6GoogleStorage(P6Storage):
-    def __init__(self, bucket_name: str, base_path: str):
-        self.bucket_name = bucket_name
-        self.base_path = base_path
-        self._token_session: aiohttp.ClientSession | None = None
-        self._token: Token | None = None
-        self._connector: aiohttp.TCPConnector | None = None
-
-    async def shutdown(self):
-        try:
-            if self._token is not None:
-                await self._token.close()
-            self._token = None
-        except Exception:
-            logger.exception("error closing token")
-
-        try:
-            if self._token_session is not None:
-                await self._token_session.close()
-            self._token_session = None
-        except Exception:
-            logger.exception("error closing token session")
-
-        try:
-            if self._connector is not None:
-                await self._connector.close()
-            self._connector = None
-        except Exception:
-            logger.exception("error closing connector")
-
-    @property
-    def connector(self) -> aiohttp.TCPConnector:
-        if self._connector is None:
-            self._connector = aiohttp.TCPConnector(ssl=VERIFY_SSL, limit=1000)
-        return self._connector
-
-    @property
-    def token(self) -> Token:
-        if self._token is None:
-            self._token_session = aiohttp.ClientSession(
-                connector=self.connector, connector_owner=False
-            )
-            self._token = Token(
-                session=self._token_session,
-                scopes=["https://www.googleapis.com/auth/devstorage.read_write"],
-            )
-        return self._token
-
-    async def write_file(self, file_path: str, content: bytes):
-        object_name = f"{self.base_path}/{file_path}"
-        async with aiohttp.ClientSession(
-            connector=self.connector, connector_owner=False
-        ) as session:
-            async with GoogleAioStorage(session=session, token=self.token) as client:
-                await _upload(client, self.bucket_name, object_name, content)
+class P6GoogleStorage(P6Storage, GoogleStorage):
+    # the client session, token and writes come from GoogleStorage, streamed
+    # uploads are sent in resumable chunks
 
     @retry(
         wait=wait_random_exponential(multiplier=1, max=60),
@@ -262,16 +204,37 @@ class P6GoogleStorage(P6Storage):
 
     async def remove_file(self, file_path: str):
         full_file_path = self._relative_path(file_path)
+        semaphore = asyncio.Semaphore(REMOVE_CONCURRENCY)
+        failed: List[Exception] = []
+
         async with aiohttp.ClientSession(
             connector=self.connector, connector_owner=False
         ) as session:
             async with GoogleAioStorage(session=session, token=self.token) as client:
-                objects = await client.list_objects(self.bucket_name,
-                                                    params={"prefix": full_file_path})
-                
-                print(objects)
-                for blob in objects['items']:
-                    await client.delete(self.bucket_name, blob['name'])
+
+                async def _delete(object_name: str):
+                    async with semaphore:
+                        try:
+                            await client.delete(self.bucket_name, object_name)
+                        except aiohttp.ClientResponseError as e:
+                            if e.status != 404:
+                                failed.append(e)
+
+                params = {
+                    "prefix": full_file_path,
+                    "fields": "items(name),nextPageToken",
+                }
+                async with asyncio.TaskGroup() as task_group:
+                    while True:
+                        objects = await _list_objects(client, self.bucket_name, params)
+                        for blob in objects.get("items", []):
+                            task_group.create_task(_delete(blob["name"]))
+                        if "nextPageToken" not in objects:
+                            break
+                        params["pageToken"] = objects["nextPageToken"]
+
+        if failed:
+            raise ExceptionGroup(f"removing {file_path} failed", failed)
 
     async def list_all_files(self, folder_path: str):
         prefix = f"{self._relative_path(folder_path)}/"
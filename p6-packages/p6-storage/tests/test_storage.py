@@ -0,0 +1,75 @@
+import os
+import tempfile
+from typing import AsyncIterator, List
+import pytest
+from jugalbandi.storage import tee_write
+from jugalbandi.storage import google_storage
+from storage.google_storage import P6GoogleStorage
+from storage.storage import P6LocalStorage
+
+CHUNK_SIZE = 256 * 1024
+CHUNKS = 16
+
+
+async def _never_joined(*args):
+    raise AssertionError("the upload was collected and written at once")
+
+
+def _upload(sizes: List[int], folder: str) -> AsyncIterator[bytes]:
+    async def _chunks():
+        for i in range(CHUNKS):
+            # bytes already written to disk while the upload is still read
+            sizes.append(
+                sum(
+                    os.path.getsize(os.path.join(folder, name))
+                    for name in os.listdir(folder)
+                )
+                if os.path.isdir(folder)
+                else 0
+            )
+            yield bytes([i]) * CHUNK_SIZE
+
+    return _chunks()
+
+
+@pytest.mark.asyncio
+async def test_upload_is_streamed_into_local_storage(monkeypatch):
+    monkeypatch.setattr(P6LocalStorage, "write_file", _never_joined)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = P6LocalStorage(temp_dir)
+        sizes: List[int] = []
+        await tee_write(
+            _upload(sizes, os.path.join(temp_dir, "doc")), [(store, "doc/file.pdf")]
+        )
+        content = await store.read_file("doc/file.pdf")
+        assert content == b"".join(bytes([i]) * CHUNK_SIZE for i in range(CHUNKS))
+        # no temporary file is left behind
+        assert os.listdir(os.path.join(temp_dir, "doc")) == ["file.pdf"]
+    assert 0 < sizes[-1] < CHUNKS * CHUNK_SIZE
+
+
+@pytest.mark.asyncio
+async def test_upload_is_streamed_into_google_storage(monkeypatch):
+    uploaded: List[int] = []
+
+    async def _start_resumable_upload(self, session, object_name: str) -> str:
+        return f"upload/{object_name}"
+
+    async def _upload_chunk(session, upload_url, chunk, offset, total_size):
+        assert offset == sum(uploaded)
+        uploaded.append(len(chunk))
+        return offset + len(chunk)
+
+    monkeypatch.setattr(P6GoogleStorage, "write_file", _never_joined)
+    monkeypatch.setattr(
+        P6GoogleStorage, "_start_resumable_upload", _start_resumable_upload
+    )
+    monkeypatch.setattr(google_storage, "_upload_chunk", _upload_chunk)
+    monkeypatch.setattr(google_storage, "RESUMABLE_UPLOAD_CHUNK_SIZE", 2 * CHUNK_SIZE)
+
+    store = P6GoogleStorage("bucket", "base")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        await tee_write(_upload([], temp_dir), [(store, "doc/file.pdf")])
+    await store.shutdown()
+    assert sum(uploaded) == CHUNKS * CHUNK_SIZE
+    assert max(uploaded) <= 2 * CHUNK_SIZE
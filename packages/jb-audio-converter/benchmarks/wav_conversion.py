@@ -0,0 +1,67 @@
+"""Per call latency of converting WAV audio with numpy and with ffmpeg.
+
+Run from the package folder:
+
+    python benchmarks/wav_conversion.py [--repeat 20]
+"""
+import argparse
+import asyncio
+import io
+import shutil
+import statistics
+import time
+import wave
+import numpy as np
+from jugalbandi.audio_converter import transcode_bytes_to_wav
+
+# (sample rate, channels, seconds) of typical voice notes and TTS output
+INPUTS = [
+    (16000, 1, 10),
+    (8000, 1, 10),
+    (22050, 1, 10),
+    (44100, 2, 10),
+    (48000, 2, 10),
+    (48000, 2, 60),
+]
+
+
+def wav_bytes(sample_rate: int, channels: int, seconds: int) -> bytes:
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 3000, sample_rate * seconds * channels)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+async def median_ms(audio: bytes, fast_path: bool, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await transcode_bytes_to_wav(audio, fast_path=fast_path)
+        timings.append(time.perf_counter() - start)
+    return 1000 * statistics.median(timings)
+
+
+async def main(repeat: int):
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    print(f"{'input':<24}{'numpy ms':>10}{'ffmpeg ms':>11}")
+    for sample_rate, channels, seconds in INPUTS:
+        audio = wav_bytes(sample_rate, channels, seconds)
+        numpy_ms = await median_ms(audio, True, repeat)
+        ffmpeg_ms = (
+            f"{await median_ms(audio, False, repeat):11.1f}"
+            if has_ffmpeg
+            else f"{'n/a':>11}"
+        )
+        name = f"{sample_rate} Hz x{channels} {seconds} s"
+        print(f"{name:<24}{numpy_ms:10.1f}{ffmpeg_ms}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args().repeat))
@@ -1,3 +1,28 @@
-from .converter import convert_to_wav, convert_to_wav_with_ffmpeg
+from .converter import (
+    convert_to_wav,
+    convert_to_wav_with_ffmpeg,
+    convert_bytes_to_wav_with_ffmpeg,
+)
+from .encoding import (
+    AudioCodec,
+    encode_audio,
+    encode_wav_bytes,
+    shutdown_encoder_pool,
+)
+from .transcoder import pcm_to_wav, transcode_bytes_to_wav, transcode_to_wav
+from .wav import convert_pcm_wav, is_wav
 
-__all__ = ["convert_to_wav", "convert_to_wav_with_ffmpeg"]
+__all__ = [
+    "convert_to_wav",
+    "convert_to_wav_with_ffmpeg",
+    "convert_bytes_to_wav_with_ffmpeg",
+    "AudioCodec",
+    "encode_audio",
+    "encode_wav_bytes",
+    "shutdown_encoder_pool",
+    "pcm_to_wav",
+    "transcode_to_wav",
+    "transcode_bytes_to_wav",
+    "convert_pcm_wav",
+    "is_wav",
+]
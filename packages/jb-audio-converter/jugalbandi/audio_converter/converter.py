@@ -1,13 +1,15 @@
 import tempfile
 from io import BytesIO
-import subprocess
 from typing import Optional
 from urllib.parse import urlparse
 import os
-import aiofiles
-import aiofiles.os
 import httpx
 from pydub import AudioSegment
+from .transcoder import (
+    DEFAULT_TRANSCODE_TIMEOUT,
+    transcode_bytes_to_wav,
+    transcode_to_wav,
+)
 
 
 def _is_url(string) -> bool:
@@ -56,36 +58,20 @@ def convert_to_wav(source_url_or_file: str, source_type: Optional[str] = None) -
 
 
 async def convert_to_wav_with_ffmpeg(
-    source_url_or_file: str, source_type: Optional[str] = None
+    source_url_or_file: str,
+    source_type: Optional[str] = None,
+    timeout: Optional[float] = DEFAULT_TRANSCODE_TIMEOUT,
 ) -> bytes:
-    local_file = None
-    if not source_type:
-        source_type = _get_file_extension(source_url_or_file)
-
-    if _is_url(source_url_or_file):
-        local_file = tempfile.NamedTemporaryFile(suffix="." + source_type)
-        response = httpx.get(source_url_or_file)
-        local_file.write(response.content)
-        local_file.seek(0)
-        local_filename = local_file.name
-    else:
-        local_filename = source_url_or_file
-
-    wav_filename = os.path.basename(os.path.splitext(local_filename)[0] + ".wav")
-    command = (
-        f"ffmpeg -i {local_filename}"
-        f" -acodec pcm_s16le -ar 16000 -ac 1 {wav_filename}"
+    # ffmpeg detects the format from the content, source_type is not needed
+    return await transcode_to_wav(
+        source_url_or_file, _is_url(source_url_or_file), timeout
     )
-    subprocess.run(command, shell=True)
-
-    async with aiofiles.open(wav_filename, "rb") as wav_file:
-        audio_data = await wav_file.read()
 
-    await aiofiles.os.remove(wav_filename)
-    if local_file:
-        local_file.close()
 
-    return audio_data
+async def convert_bytes_to_wav_with_ffmpeg(
+    audio: bytes, timeout: Optional[float] = DEFAULT_TRANSCODE_TIMEOUT
+) -> bytes:
+    return await transcode_bytes_to_wav(audio, timeout)
 
 
 def convert_wav_bytes_to_mp3_bytes(wav_bytes: bytes) -> bytes:
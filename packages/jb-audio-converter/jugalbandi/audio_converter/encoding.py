@@ -0,0 +1,64 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from io import BytesIO
+from typing import Optional
+from pydub import AudioSegment
+
+# encoding is CPU bound, it runs in worker processes to keep it off the
+# event loop and the GIL
+ENCODER_PROCESSES = min(4, os.cpu_count() or 1)
+# speech needs far lower bitrates than music, and is encoded at its own
+# sample rate instead of being upsampled
+BITRATES = {"mp3": "32k", "opus": "24k"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+class AudioCodec(str, Enum):
+    WAV = "wav"
+    FLAC = "flac"
+    OPUS = "opus"
+    MP3 = "mp3"
+
+
+def encode_wav_bytes(wav_bytes: bytes, codec: AudioCodec) -> bytes:
+    """Encodes WAV audio with codec, keeping its sample rate and channels."""
+    if codec == AudioCodec.WAV:
+        return wav_bytes
+    audio = AudioSegment.from_file(BytesIO(wav_bytes), format="wav")
+    output = BytesIO()
+    if codec == AudioCodec.FLAC:
+        audio.export(output, format="flac")
+    elif codec == AudioCodec.OPUS:
+        audio.export(
+            output, format="ogg", codec="libopus", bitrate=BITRATES[codec.value]
+        )
+    else:
+        audio.export(output, format="mp3", bitrate=BITRATES[codec.value])
+    return output.getvalue()
+
+
+def _encoder_pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=ENCODER_PROCESSES)
+    return _executor
+
+
+async def encode_audio(wav_bytes: bytes, codec: AudioCodec) -> bytes:
+    """Encodes WAV audio with codec in a worker process."""
+    if codec == AudioCodec.WAV:
+        return wav_bytes
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _encoder_pool(), encode_wav_bytes, wav_bytes, codec
+    )
+
+
+def shutdown_encoder_pool():
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
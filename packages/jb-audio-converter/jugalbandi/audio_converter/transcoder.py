@@ -0,0 +1,191 @@
+import asyncio
+import io
+import logging
+import os
+import wave
+from typing import AsyncIterator, Awaitable, Callable, Optional
+import aiofiles
+from jugalbandi.core import (
+    HttpClients,
+    IncorrectInputException,
+    ServiceUnavailableException,
+)
+from .wav import WAV_HEADER_SIZE, Buffer, convert_pcm_wav, is_wav
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# ffmpeg processes running at the same time, each takes about a core
+MAX_FFMPEG_PROCESSES = min(8, 2 * (os.cpu_count() or 1))
+DEFAULT_TRANSCODE_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_ffmpeg_slots = asyncio.Semaphore(MAX_FFMPEG_PROCESSES)
+
+
+def pcm_to_wav(pcm: Buffer, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wraps 16 bit mono PCM in a WAV header."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+Feed = Callable[[asyncio.StreamWriter], Awaitable[None]]
+
+
+def _chunks_feed(head: bytes, chunks: AsyncIterator[bytes]) -> Feed:
+    async def _feed(stdin: asyncio.StreamWriter):
+        stdin.write(head)
+        async for chunk in chunks:
+            stdin.write(chunk)
+            await stdin.drain()
+    return _feed
+
+
+def _bytes_feed(audio: bytes) -> Feed:
+    async def _feed(stdin: asyncio.StreamWriter):
+        stdin.write(audio)
+        await stdin.drain()
+    return _feed
+
+
+async def _write_input(feed: Feed, stdin: asyncio.StreamWriter):
+    try:
+        await feed(stdin)
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg stopped reading, its exit status tells why
+        pass
+    finally:
+        stdin.close()
+
+
+async def _run_ffmpeg(input_arg: str, feed: Optional[Feed]) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", input_arg,
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-ac", "1",
+        "pipe:1",
+        stdin=asyncio.subprocess.PIPE if feed else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        assert process.stdout is not None and process.stderr is not None
+        reads = asyncio.gather(process.stdout.read(), process.stderr.read())
+        if feed:
+            assert process.stdin is not None
+            _, (pcm, errors) = await asyncio.gather(
+                _write_input(feed, process.stdin), reads
+            )
+        else:
+            pcm, errors = await reads
+        return_code = await process.wait()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if return_code != 0:
+        raise IncorrectInputException(
+            f"Converting audio failed: {errors.decode('utf-8', 'replace').strip()}"
+        )
+    return pcm
+
+
+async def _transcode(
+    input_arg: str, feed: Optional[Feed], timeout: Optional[float]
+) -> bytes:
+    async with _ffmpeg_slots:
+        try:
+            pcm = await asyncio.wait_for(_run_ffmpeg(input_arg, feed), timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailableException(
+                f"Converting audio took longer than {timeout} seconds"
+            )
+    return pcm_to_wav(pcm)
+
+
+async def _convert_pcm_wav(audio: Buffer) -> Optional[bytes]:
+    # numpy releases the GIL for most of the work, long audio does not hold
+    # up the event loop
+    pcm = await asyncio.to_thread(convert_pcm_wav, audio, SAMPLE_RATE)
+    return None if pcm is None else pcm_to_wav(pcm)
+
+
+async def _transcode_file(
+    file_path: str, timeout: Optional[float], fast_path: bool
+) -> bytes:
+    if fast_path:
+        async with aiofiles.open(file_path, "rb") as file:
+            head = await file.read(WAV_HEADER_SIZE)
+            if is_wav(head):
+                wav = await _convert_pcm_wav(head + await file.read())
+                if wav is not None:
+                    return wav
+    # the file protocol keeps file names from being read as options or other
+    # protocols
+    return await _transcode(f"file:{file_path}", None, timeout)
+
+
+async def _transcode_url(url: str, timeout: Optional[float], fast_path: bool) -> bytes:
+    client = HttpClients().httpx_client("audio-download")
+    async with client.stream("GET", url, follow_redirects=True) as response:
+        if response.status_code != 200:
+            raise IncorrectInputException(
+                f"Downloading audio from {url} failed with status_code: "
+                f"{response.status_code}"
+            )
+        chunks = response.aiter_bytes(DOWNLOAD_CHUNK_SIZE)
+        head = b""
+        async for chunk in chunks:
+            head += chunk
+            if len(head) >= WAV_HEADER_SIZE:
+                break
+        if fast_path and is_wav(head):
+            audio = head + b"".join([chunk async for chunk in chunks])
+            wav = await _convert_pcm_wav(audio)
+            if wav is not None:
+                return wav
+            return await _transcode("pipe:0", _bytes_feed(audio), timeout)
+        return await _transcode("pipe:0", _chunks_feed(head, chunks), timeout)
+
+
+async def transcode_to_wav(
+    source_url_or_file: str,
+    is_url: bool,
+    timeout: Optional[float] = DEFAULT_TRANSCODE_TIMEOUT,
+    fast_path: bool = True,
+) -> bytes:
+    """Converts audio to 16 kHz mono 16 bit PCM WAV.
+
+    Uncompressed WAV audio is converted with numpy. Everything else is
+    decoded by ffmpeg, downloads are streamed into it while it decodes,
+    and the PCM is read from its output, so that nothing is written to
+    disk. At most MAX_FFMPEG_PROCESSES conversions run at a time, each for
+    at most timeout seconds. fast_path=False always uses ffmpeg.
+    """
+    if is_url:
+        return await _transcode_url(source_url_or_file, timeout, fast_path)
+    return await _transcode_file(source_url_or_file, timeout, fast_path)
+
+
+async def transcode_bytes_to_wav(
+    audio: bytes,
+    timeout: Optional[float] = DEFAULT_TRANSCODE_TIMEOUT,
+    fast_path: bool = True,
+) -> bytes:
+    """Converts audio held in memory like transcode_to_wav."""
+    if fast_path and is_wav(audio):
+        wav = await _convert_pcm_wav(audio)
+        if wav is not None:
+            return wav
+    return await _transcode("pipe:0", _bytes_feed(audio), timeout)
@@ -0,0 +1,163 @@
+import struct
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple, Union
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# bytes needed to tell a WAV file from other audio
+WAV_HEADER_SIZE = 12
+# the low-pass filter applied before downsampling, its cutoff is kept a
+# little below the new Nyquist frequency
+LOWPASS_TAPS = 31
+LOWPASS_CUTOFF = 0.45
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class WavFormat(NamedTuple):
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    block_align: int
+
+
+def is_wav(header: Buffer) -> bool:
+    view = memoryview(header)
+    return (
+        len(view) >= WAV_HEADER_SIZE
+        and view[0:4] == b"RIFF"
+        and view[8:12] == b"WAVE"
+    )
+
+
+def parse_wav(data: Buffer) -> Optional[Tuple[WavFormat, memoryview]]:
+    """Reads the format of a WAV file and finds its frames without copying.
+
+    Returns None for data that is not an uncompressed PCM or float WAV
+    file. Streamed WAV files, whose data size is not filled in, are read
+    to the end.
+    """
+    view = memoryview(data).cast("B")
+    if not is_wav(view):
+        return None
+    wav_format = None
+    offset = WAV_HEADER_SIZE
+    try:
+        while offset + 8 <= len(view):
+            chunk_id = bytes(view[offset:offset + 4])
+            (size,) = struct.unpack_from("<I", view, offset + 4)
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                tag, channels, sample_rate, _, block_align, bits = struct.unpack_from(
+                    "<HHIIHH", view, body
+                )
+                if tag == WAVE_FORMAT_EXTENSIBLE and size >= 40:
+                    # the sub format GUID starts with the actual format tag
+                    (tag,) = struct.unpack_from("<H", view, body + 24)
+                wav_format = WavFormat(tag, channels, sample_rate, bits, block_align)
+            elif chunk_id == b"data":
+                if wav_format is None or not _is_supported(wav_format):
+                    return None
+                end = body + size
+                if size in (0, 0xFFFFFFFF) or end > len(view):
+                    end = len(view)
+                end -= (end - body) % wav_format.block_align
+                return wav_format, view[body:end]
+            offset = body + size + (size & 1)
+    except struct.error:
+        return None
+    return None
+
+
+def _is_supported(wav_format: WavFormat) -> bool:
+    if wav_format.channels < 1 or wav_format.sample_rate < 1:
+        return False
+    if wav_format.block_align != wav_format.channels * wav_format.bits_per_sample // 8:
+        return False
+    if wav_format.format_tag == WAVE_FORMAT_PCM:
+        return wav_format.bits_per_sample in (8, 16, 24, 32)
+    if wav_format.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        return wav_format.bits_per_sample in (32, 64)
+    return False
+
+
+def _samples(wav_format: WavFormat, frames: memoryview) -> np.ndarray:
+    """Decodes frames to float32 samples on the 16 bit scale, one column
+    per channel."""
+    bits = wav_format.bits_per_sample
+    if wav_format.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        dtype = "<f4" if bits == 32 else "<f8"
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32) * 32768
+    elif bits == 8:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) * 256
+    elif bits == 16:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32)
+    elif bits == 24:
+        triplets = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        # the sample goes to the upper three bytes, the shift keeps its sign
+        packed = np.zeros((len(triplets), 4), dtype=np.uint8)
+        packed[:, 1:] = triplets
+        samples = (packed.view("<i4")[:, 0] >> 8).astype(np.float32) / 256
+    else:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 65536
+    return samples.reshape(-1, wav_format.channels)
+
+
+@lru_cache(maxsize=32)
+def _lowpass(cutoff: float) -> np.ndarray:
+    """Windowed sinc filter, cutoff is a fraction of the sample rate."""
+    n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+    taps = np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Resamples mono audio by linear interpolation.
+
+    When downsampling, the audio is low-pass filtered first so that it does
+    not alias. If from_rate is a multiple of to_rate, the filter is only
+    evaluated at the samples that are kept, on strided views of the input.
+    """
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    length = len(samples) * to_rate // from_rate
+    if to_rate < from_rate:
+        taps = _lowpass(LOWPASS_CUTOFF * to_rate / from_rate)
+        if from_rate % to_rate == 0:
+            step = from_rate // to_rate
+            half = LOWPASS_TAPS // 2
+            padded = np.pad(samples, (half, half))
+            output = np.zeros(length, dtype=np.float32)
+            for k, tap in enumerate(taps):
+                output += tap * padded[k:k + step * length:step]
+            return output
+        samples = np.convolve(samples, taps, mode="same")
+    positions = np.arange(length, dtype=np.float64) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def convert_pcm_wav(data: Buffer, sample_rate: int) -> Optional[Buffer]:
+    """Converts an uncompressed WAV file to mono 16 bit PCM at sample_rate.
+
+    Returns the raw PCM, or None when data is not a WAV file that can be
+    converted without a decoder. Mono 16 bit audio at sample_rate is
+    passed through as a view of data, without copying.
+    """
+    parsed = parse_wav(data)
+    if parsed is None:
+        return None
+    wav_format, frames = parsed
+    if (
+        wav_format.format_tag == WAVE_FORMAT_PCM
+        and wav_format.bits_per_sample == 16
+        and wav_format.channels == 1
+        and wav_format.sample_rate == sample_rate
+    ):
+        return frames
+    samples = _samples(wav_format, frames)
+    mono = samples[:, 0] if wav_format.channels == 1 else samples.mean(axis=1)
+    mono = resample(mono, wav_format.sample_rate, sample_rate)
+    return np.clip(np.rint(mono), -32768, 32767).astype("<i2").tobytes()
@@ -0,0 +1,35 @@
+import io
+import wave
+import pytest
+from pydub import AudioSegment
+from jugalbandi.audio_converter import AudioCodec, encode_audio, encode_wav_bytes
+
+
+def wav_bytes(seconds: float = 0.5, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x10" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+def test_wav_is_not_encoded():
+    wav_data = wav_bytes()
+    assert encode_wav_bytes(wav_data, AudioCodec.WAV) is wav_data
+
+
+@pytest.mark.asyncio
+async def test_flac_encoding():
+    wav_data = wav_bytes()
+    flac_data = await encode_audio(wav_data, AudioCodec.FLAC)
+    assert flac_data.startswith(b"fLaC")
+    assert len(flac_data) < len(wav_data)
+
+
+@pytest.mark.asyncio
+async def test_mp3_encoding_keeps_sample_rate():
+    mp3_data = await encode_audio(wav_bytes(sample_rate=8000), AudioCodec.MP3)
+    audio = AudioSegment.from_file(io.BytesIO(mp3_data), format="mp3")
+    assert audio.frame_rate == 8000
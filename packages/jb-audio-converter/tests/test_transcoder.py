@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+import wave
+import pytest
+from jugalbandi.audio_converter import (
+    convert_bytes_to_wav_with_ffmpeg,
+    convert_to_wav_with_ffmpeg,
+    pcm_to_wav,
+)
+from jugalbandi.core import IncorrectInputException
+
+
+def test_pcm_to_wav():
+    with wave.open(io.BytesIO(pcm_to_wav(b"\x00\x10" * 160))) as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (
+            1,
+            2,
+            16000,
+        )
+        assert wav.getnframes() == 160
+
+
+@pytest.mark.asyncio
+async def test_conversion_to_16khz_mono():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "stereo.wav")
+        with wave.open(file_path, "wb") as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)
+            wav.setframerate(44100)
+            wav.writeframes(b"\x00\x10" * 2 * 44100)
+        wav_data = await convert_to_wav_with_ffmpeg(file_path)
+        # nothing is written next to the input
+        assert os.listdir(temp_dir) == ["stereo.wav"]
+
+    with wave.open(io.BytesIO(wav_data)) as wav:
+        assert (wav.getnchannels(), wav.getframerate()) == (1, 16000)
+        assert abs(wav.getnframes() - 16000) < 160
+
+
+@pytest.mark.asyncio
+async def test_conversion_of_invalid_audio_fails():
+    with tempfile.NamedTemporaryFile(suffix=".mp3") as file:
+        file.write(b"not audio")
+        file.flush()
+        with pytest.raises(IncorrectInputException):
+            await convert_to_wav_with_ffmpeg(file.name)
+
+
+@pytest.mark.asyncio
+async def test_conversion_of_bytes():
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\x00\x10" * 8000)
+    wav_data = await convert_bytes_to_wav_with_ffmpeg(buffer.getvalue())
+    with wave.open(io.BytesIO(wav_data)) as wav:
+        assert wav.getframerate() == 16000
@@ -0,0 +1,99 @@
+import io
+import wave
+import numpy as np
+import pytest
+from jugalbandi.audio_converter import (
+    convert_bytes_to_wav_with_ffmpeg,
+    convert_pcm_wav,
+    is_wav,
+)
+from jugalbandi.audio_converter import transcoder
+from jugalbandi.audio_converter.wav import parse_wav, resample
+
+
+def tone(frequency: float, sample_rate: int, seconds: float = 1) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return 8000 * np.sin(2 * np.pi * frequency * t)
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int, sample_width: int = 2) -> bytes:
+    """samples holds one column per channel, on the 16 bit scale."""
+    samples = samples.reshape(len(samples), -1)
+    if sample_width == 1:
+        frames = (samples / 256 + 128).astype(np.uint8).tobytes()
+    elif sample_width == 3:
+        values = (samples * 256).astype("<i4")
+        frames = values.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    else:
+        frames = samples.astype("<i2").tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def dominant_frequency(pcm, sample_rate: int) -> float:
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.argmax(spectrum) * sample_rate / len(samples)
+
+
+def test_is_wav():
+    assert is_wav(wav_bytes(tone(440, 16000), 16000))
+    assert not is_wav(b"ID3\x04" + bytes(20))
+    assert not is_wav(b"RIFF")
+
+
+def test_16khz_mono_is_passed_through():
+    data = wav_bytes(tone(440, 16000), 16000)
+    pcm = convert_pcm_wav(data, 16000)
+    assert isinstance(pcm, memoryview)
+    assert pcm.obj is data
+    assert bytes(pcm) == data[44:]
+
+
+@pytest.mark.parametrize("sample_rate", [8000, 22050, 44100, 48000])
+@pytest.mark.parametrize("sample_width", [1, 2, 3])
+def test_conversion_keeps_pitch_and_duration(sample_rate: int, sample_width: int):
+    stereo = np.stack([tone(440, sample_rate), tone(440, sample_rate)], axis=1)
+    pcm = convert_pcm_wav(wav_bytes(stereo, sample_rate, sample_width), 16000)
+    assert pcm is not None
+    assert abs(len(pcm) // 2 - 16000) <= 1
+    assert abs(dominant_frequency(pcm, 16000) - 440) <= 2
+
+
+def test_downsampling_removes_frequencies_above_nyquist():
+    # 12 kHz would fold back to 4 kHz without the low-pass filter
+    samples = resample(tone(12000, 48000).astype(np.float32), 48000, 16000)
+    assert np.abs(samples[100:-100]).max() < 800
+
+
+def test_streamed_wav_with_unknown_data_size():
+    data = bytearray(wav_bytes(tone(440, 16000), 16000))
+    data[40:44] = b"\xff\xff\xff\xff"
+    parsed = parse_wav(data)
+    assert parsed is not None
+    assert len(parsed[1]) == 32000
+
+
+def test_compressed_wav_is_not_converted():
+    data = bytearray(wav_bytes(tone(440, 16000), 16000))
+    # mu-law needs a decoder
+    data[20:22] = (7).to_bytes(2, "little")
+    assert convert_pcm_wav(data, 16000) is None
+    assert convert_pcm_wav(b"RIFF\x00\x00\x00\x00WAVEfmt ", 16000) is None
+
+
+@pytest.mark.asyncio
+async def test_wav_conversion_does_not_start_ffmpeg(monkeypatch):
+    async def _run_ffmpeg(*args):
+        raise AssertionError("ffmpeg was started")
+
+    monkeypatch.setattr(transcoder, "_run_ffmpeg", _run_ffmpeg)
+    wav_data = await convert_bytes_to_wav_with_ffmpeg(wav_bytes(tone(440, 8000), 8000))
+    with wave.open(io.BytesIO(wav_data)) as wav:
+        assert (wav.getnchannels(), wav.getframerate()) == (1, 16000)
+        assert wav.getnframes() == 16000
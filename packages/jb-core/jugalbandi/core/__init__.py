@@ -1,6 +1,7 @@
 from .media_format import MediaFormat
-from .caching import aiocached, aiocachedmethod
+from .caching import aiocached, aiocachedmethod, SingleFlight
 from .language import Language
+from .language_detection import detect_language, is_language
 from .errors import (
     BusinessException,
     UnAuthorisedException,
@@ -10,13 +11,18 @@ from .errors import (
 )
 from .speech_processor import SpeechProcessor
 from .singleton import SingletonMeta
+from .http_clients import HttpClients
+from .routing import ProviderHealth, ProviderRouter, ProviderStats
 
 
 __all__ = [
     "MediaFormat",
     "Language",
+    "detect_language",
+    "is_language",
     "aiocached",
     "aiocachedmethod",
+    "SingleFlight",
     "BusinessException",
     "UnAuthorisedException",
     "IncorrectInputException",
@@ -24,4 +30,8 @@ __all__ = [
     "ServiceUnavailableException",
     "SpeechProcessor",
     "SingletonMeta",
+    "HttpClients",
+    "ProviderHealth",
+    "ProviderRouter",
+    "ProviderStats",
 ]
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import httpx
+from .caching import SingleFlight
+from .errors import InternalServerException
+from .http_clients import HttpClients
+from .singleton import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+BHASHINI_CONFIG_URL = (
+    "https://meity-auth.ulcacontrib.org/ulca/apis/v0/model/getModelsPipeline"
+)
+BHASHINI_SPEECH_PIPELINE_ID = "64392f96daac500b55c543cd"
+BHASHINI_CONFIG_TTL = 3600
+# configs older than this are refreshed in the background while still in use
+BHASHINI_CONFIG_REFRESH_AFTER = 2700
+# inference responses that mean the service id or the inference key are stale
+STALE_CONFIG_STATUS_CODES = (401, 403, 404)
+
+ConfigKey = Tuple[str, str, Optional[str]]
+
+
+class BhashiniPipelineConfig:
+    """The parts of a ULCA getModelsPipeline response needed for inference."""
+
+    def __init__(self, response: Dict[str, Any]):
+        self.response = response
+        self.fetched_at = time.monotonic()
+
+    @property
+    def source_language(self) -> str:
+        return self.response["languages"][0]["sourceLanguage"]
+
+    @property
+    def target_language(self) -> str:
+        return self.response["languages"][0]["targetLanguageList"][0]
+
+    @property
+    def service_id(self) -> str:
+        return self.response["pipelineResponseConfig"][0]["config"][0]["serviceId"]
+
+    def inference_headers(self) -> Dict[str, str]:
+        api_key = self.response["pipelineInferenceAPIEndPoint"]["inferenceApiKey"]
+        return {api_key["name"]: api_key["value"]}
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+def _is_stale_config_response(response: httpx.Response) -> bool:
+    if response.status_code in STALE_CONFIG_STATUS_CODES:
+        return True
+    return response.status_code == 400 and "serviceid" in response.text.lower()
+
+
+class BhashiniPipelineConfigCache(metaclass=SingletonMeta):
+    """Pipeline configurations shared by all Bhashini (Dhruva) clients.
+
+    Configurations are keyed by task and language pair. Concurrent loads of
+    the same configuration share one request, configurations close to expiry
+    are refreshed in the background and a configuration rejected by the
+    inference endpoint is dropped and loaded again.
+    """
+
+    def __init__(
+        self,
+        ttl: float = BHASHINI_CONFIG_TTL,
+        refresh_after: float = BHASHINI_CONFIG_REFRESH_AFTER,
+    ):
+        self.bhashini_user_id = os.getenv("BHASHINI_USER_ID")
+        self.bhashini_api_key = os.getenv("BHASHINI_API_KEY")
+        self.bhashini_pipeline_id = os.getenv("BHASHINI_PIPELINE_ID")
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+        self._configs: Dict[ConfigKey, BhashiniPipelineConfig] = {}
+        self._loads = SingleFlight()
+        self._refreshes: Set[asyncio.Task] = set()
+
+    def _payload(
+        self, task: str, source_language: str, target_language: Optional[str]
+    ) -> str:
+        language = {"sourceLanguage": source_language}
+        if task in ["asr", "tts"]:
+            pipeline_id = BHASHINI_SPEECH_PIPELINE_ID
+        else:
+            language["targetLanguage"] = target_language
+            pipeline_id = self.bhashini_pipeline_id
+        return json.dumps({
+            "pipelineTasks": [{"taskType": task, "config": {"language": language}}],
+            "pipelineRequestConfig": {"pipelineId": pipeline_id},
+        })
+
+    async def _load(self, key: ConfigKey) -> BhashiniPipelineConfig:
+        headers = {
+            "userID": self.bhashini_user_id,
+            "ulcaApiKey": self.bhashini_api_key,
+            "Content-Type": "application/json",
+        }
+        client = HttpClients().httpx_client("bhashini-config")
+        response = await client.post(
+            BHASHINI_CONFIG_URL, headers=headers, data=self._payload(*key)
+        )  # type: ignore
+        if response.status_code != 200:
+            raise InternalServerException(
+                f"Bhashini pipeline config request failed with response.text: "
+                f"{response.text} and status_code: {response.status_code}"
+            )
+        config = BhashiniPipelineConfig(response.json())
+        self._configs[key] = config
+        return config
+
+    async def _refresh(self, key: ConfigKey):
+        try:
+            await self._loads.do(key, lambda: self._load(key))
+        except Exception:
+            # the current config stays in use until it expires
+            logger.exception("background refresh of bhashini config %s failed", key)
+
+    async def get(
+        self, task: str, source_language: str, target_language: Optional[str] = None
+    ) -> BhashiniPipelineConfig:
+        key = (task, source_language, target_language)
+        config = self._configs.get(key)
+        if config is None or config.age() >= self.ttl:
+            return await self._loads.do(key, lambda: self._load(key))
+        if config.age() >= self.refresh_after and not self._loads.in_flight(key):
+            refresh = asyncio.create_task(self._refresh(key))
+            self._refreshes.add(refresh)
+            refresh.add_done_callback(self._refreshes.discard)
+        return config
+
+    def invalidate(
+        self,
+        task: str,
+        source_language: str,
+        target_language: Optional[str] = None,
+        config: Optional[BhashiniPipelineConfig] = None,
+    ):
+        """Drops a configuration, or only the given one if it is still cached,
+        so that a config loaded in the meantime is kept."""
+        key = (task, source_language, target_language)
+        if config is None or self._configs.get(key) is config:
+            self._configs.pop(key, None)
+
+    async def infer(
+        self,
+        task: str,
+        source_language: str,
+        target_language: Optional[str],
+        request: Callable[[BhashiniPipelineConfig], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        """Makes an inference request with the cached configuration, retrying
+        once with a fresh configuration if the cached one was rejected."""
+        config = await self.get(task, source_language, target_language)
+        response = await request(config)
+        if _is_stale_config_response(response):
+            logger.info(
+                "bhashini rejected %s config for %s-%s with status %d, reloading",
+                task,
+                source_language,
+                target_language,
+                response.status_code,
+            )
+            self.invalidate(task, source_language, target_language, config)
+            config = await self.get(task, source_language, target_language)
+            response = await request(config)
+        return response
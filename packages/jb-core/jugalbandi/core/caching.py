@@ -1,12 +1,16 @@
+import asyncio
 import functools
 import inspect
 import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
 
 from cachetools.keys import hashkey, methodkey
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class NullContext(object):
     """A class for noop context managers."""
@@ -147,3 +151,48 @@ def aiocachedmethod(cache, key=methodkey, lock=None):
         return functools.update_wrapper(wrapper, method)
 
     return decorator
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution.
+
+    The first caller for a key starts ``func``; callers arriving while it
+    is still running await the same result (or exception) instead of
+    starting their own. Nothing is cached once the call completes.
+
+    Example:
+    >>> import asyncio
+    >>> from jugalbandi.core import SingleFlight
+    >>> calls = 0
+    >>> async def load():
+    ...     global calls
+    ...     calls += 1
+    ...     await asyncio.sleep(0.01)
+    ...     return calls
+    >>> async def main():
+    ...     flight = SingleFlight()
+    ...     print(await asyncio.gather(*(flight.do("k", load) for _ in range(3))))
+    >>> asyncio.run(main())
+    [1, 1, 1]
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+
+            def _done(completed: asyncio.Future):
+                if self._inflight.get(key) is completed:
+                    del self._inflight[key]
+
+            future.add_done_callback(_done)
+
+        # shield so that a cancelled caller does not cancel the shared call
+        return await asyncio.shield(future)
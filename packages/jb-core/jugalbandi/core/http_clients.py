@@ -0,0 +1,161 @@
+import importlib.util
+import logging
+from typing import Any, Callable, Dict, Optional, TypeVar
+import aiohttp
+import httpx
+from .singleton import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP/2 needs the optional h2 package, without it clients use HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+DNS_CACHE_TTL = 300
+KEEPALIVE_EXPIRY = 60
+
+
+class ProviderSettings:
+    def __init__(
+        self,
+        timeout: float = 30,
+        connect_timeout: float = 5,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+    ):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+
+
+PROVIDER_SETTINGS: Dict[str, ProviderSettings] = {
+    "bhashini-config": ProviderSettings(timeout=10),
+    "bhashini": ProviderSettings(timeout=60),
+    "azure-translator": ProviderSettings(timeout=10),
+}
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.connections, 0)
+
+
+class HttpClients(metaclass=SingletonMeta):
+    """Registry of the long lived HTTP clients used to call external providers.
+
+    Clients are created on first use and kept for the lifetime of the
+    application, so that connections, TLS sessions and DNS lookups are reused
+    across requests. Applications call close on shutdown; clients used after
+    that are created again.
+    """
+
+    def __init__(self):
+        self._httpx_clients: Dict[str, httpx.AsyncClient] = {}
+        self._aiohttp_sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._clients: Dict[str, Any] = {}
+        self.stats: Dict[str, ConnectionStats] = {}
+
+    @staticmethod
+    def settings(provider: str) -> ProviderSettings:
+        return PROVIDER_SETTINGS.get(provider, ProviderSettings())
+
+    def _stats(self, provider: str) -> ConnectionStats:
+        return self.stats.setdefault(provider, ConnectionStats())
+
+    def httpx_client(self, provider: str) -> httpx.AsyncClient:
+        client = self._httpx_clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._httpx_clients[provider] = self._new_httpx_client(provider)
+        return client
+
+    def _new_httpx_client(self, provider: str) -> httpx.AsyncClient:
+        settings = self.settings(provider)
+        stats = self._stats(provider)
+
+        async def _trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                stats.connections += 1
+
+        async def _on_request(request: httpx.Request):
+            stats.requests += 1
+            request.extensions["trace"] = _trace
+
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [_on_request]},
+        )
+
+    def aiohttp_session(self, provider: str, ssl: bool = True) -> aiohttp.ClientSession:
+        session = self._aiohttp_sessions.get(provider)
+        if session is None or session.closed:
+            session = self._new_aiohttp_session(provider, ssl)
+            self._aiohttp_sessions[provider] = session
+        return session
+
+    def _new_aiohttp_session(self, provider: str, ssl: bool) -> aiohttp.ClientSession:
+        settings = self.settings(provider)
+        stats = self._stats(provider)
+
+        async def _on_request_start(session, context, params):
+            stats.requests += 1
+
+        async def _on_connection_create_end(session, context, params):
+            stats.connections += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(_on_request_start)
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                ssl=ssl,
+                limit=settings.max_connections,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_EXPIRY,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=settings.timeout, connect=settings.connect_timeout
+            ),
+            trace_configs=[trace_config],
+        )
+
+    def client(self, name: str, factory: Callable[[], T]) -> T:
+        """Returns a long lived SDK client (e.g. a Google Cloud async client),
+        creating it with factory on first use."""
+        client = self._clients.get(name)
+        if client is None:
+            client = self._clients[name] = factory()
+        return client
+
+    async def close(self):
+        httpx_clients, self._httpx_clients = self._httpx_clients, {}
+        aiohttp_sessions, self._aiohttp_sessions = self._aiohttp_sessions, {}
+        clients, self._clients = self._clients, {}
+        for provider, client in httpx_clients.items():
+            try:
+                await client.aclose()
+            except Exception:
+                logger.exception("error closing %s client", provider)
+        for provider, session in aiohttp_sessions.items():
+            try:
+                await session.close()
+            except Exception:
+                logger.exception("error closing %s session", provider)
+        for name, sdk_client in clients.items():
+            transport: Optional[Any] = getattr(sdk_client, "transport", None)
+            try:
+                if transport is not None and hasattr(transport, "close"):
+                    await transport.close()
+            except Exception:
+                logger.exception("error closing %s client", name)
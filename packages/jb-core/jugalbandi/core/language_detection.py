@@ -0,0 +1,195 @@
+import string
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from .language import Language
+
+# share of the letters of a text that must be in one script for the text to
+# be considered written in that script
+MIN_SCRIPT_SHARE = 0.6
+# latin script texts need at least this many words to tell languages apart
+MIN_LATIN_WORDS = 2
+
+SCRIPT_RANGES: List[Tuple[int, int, str]] = [
+    (0x0041, 0x024F, "Latin"),
+    (0x0400, 0x04FF, "Cyrillic"),
+    (0x0600, 0x06FF, "Arabic"),
+    (0x0900, 0x097F, "Devanagari"),
+    (0x0980, 0x09FF, "Bengali"),
+    (0x0A00, 0x0A7F, "Gurmukhi"),
+    (0x0A80, 0x0AFF, "Gujarati"),
+    (0x0B00, 0x0B7F, "Oriya"),
+    (0x0B80, 0x0BFF, "Tamil"),
+    (0x0C00, 0x0C7F, "Telugu"),
+    (0x0C80, 0x0CFF, "Kannada"),
+    (0x0D00, 0x0D7F, "Malayalam"),
+    (0x1100, 0x11FF, "Hangul"),
+    (0x3040, 0x30FF, "Kana"),
+    (0x3400, 0x4DBF, "Han"),
+    (0x4E00, 0x9FFF, "Han"),
+    (0xAC00, 0xD7AF, "Hangul"),
+]
+
+SCRIPT_LANGUAGES: Dict[str, Language] = {
+    "Cyrillic": Language.RU,
+    "Arabic": Language.AR,
+    "Bengali": Language.BN,
+    "Gurmukhi": Language.PA,
+    "Gujarati": Language.GU,
+    "Oriya": Language.OR,
+    "Tamil": Language.TA,
+    "Telugu": Language.TE,
+    "Kannada": Language.KN,
+    "Malayalam": Language.ML,
+    "Hangul": Language.KO,
+    "Kana": Language.JA,
+    "Han": Language.ZH,
+}
+
+# the most frequent function words of the languages that share a script,
+# romanized hindi is the hindi written in latin script common in chat
+FUNCTION_WORDS: Dict[str, Dict[Language, frozenset]] = {
+    "Latin": {
+        Language.EN: frozenset(
+            "the is are was were be been of and to in for on with what how who "
+            "when where which why can could do does did i my me you your it "
+            "this that these a an not under should would have has had will from "
+            "by or if about there any get"
+            .split()
+        ),
+        Language.HI: frozenset(
+            "hai hain kya kaise kaisa kaun kab kahan kyun kyon mein mujhe mera "
+            "meri mere nahi nahin aur ka ki ke ko se bhi ye yeh wo woh aap apna "
+            "apni tum hum kar karna karein karu sakta sakte sakti chahiye tha "
+            "thi liye agar toh ho hota hoti gaya gayi raha rahi"
+            .split()
+        ),
+        Language.FR: frozenset(
+            "le la les des est et une un pour dans que qui pas sur avec ce du au "
+            "je vous il elle sont"
+            .split()
+        ),
+        Language.DE: frozenset(
+            "der die das und ist nicht ein eine ich zu mit den von wie was auf "
+            "für sie es im sind"
+            .split()
+        ),
+        Language.ES: frozenset(
+            "el la los las es y que en un una por con para no qué cómo se del al "
+            "lo mi"
+            .split()
+        ),
+        Language.PT: frozenset(
+            "o os as é e que em um uma por com para não do da como se no na meu "
+            "são"
+            .split()
+        ),
+        Language.IT: frozenset(
+            "il la le è e di che un una per con non come sono del della si lo "
+            "gli mio"
+            .split()
+        ),
+        Language.ID: frozenset(
+            "yang dan di ke dari ini itu untuk dengan tidak apa bagaimana saya "
+            "adalah ada akan pada bisa atau juga"
+            .split()
+        ),
+        Language.TR: frozenset(
+            "ve bir bu için ne nasıl mi mı değil ile da de ben çok var yok gibi "
+            "olarak daha ama"
+            .split()
+        ),
+        Language.AF: frozenset(
+            "die en is van het nie wat hoe ek vir met op om te sy ons hulle dit "
+            "was kan"
+            .split()
+        ),
+    },
+    "Devanagari": {
+        Language.HI: frozenset(
+            "है हैं और का की के को में से नहीं क्या कैसे कौन यह वह मेरा मेरी मुझे "
+            "आप हम था थी भी लिए कर सकता चाहिए"
+            .split()
+        ),
+        Language.MR: frozenset(
+            "आहे आहेत आणि च्या ची चा चे ला मध्ये नाही काय कसे कोण हे ते माझा "
+            "माझी मला तुम्ही आम्ही होता होती पण साठी करू शकतो पाहिजे"
+            .split()
+        ),
+    },
+}
+
+# stripped from words, which are split on whitespace
+_PUNCTUATION = string.punctuation + "।॥¿¡“”‘’«»"
+
+
+def _script(char: str) -> Optional[str]:
+    code = ord(char)
+    for start, end, script in SCRIPT_RANGES:
+        if start <= code <= end:
+            return script
+    return None
+
+
+def _script_counts(text: str) -> Counter:
+    counts: Counter = Counter()
+    for char in text:
+        if char.isalpha() or unicodedata.category(char) in ("Mn", "Mc"):
+            script = _script(char)
+            counts[script or "Other"] += 1
+    return counts
+
+
+def detect_script(text: str) -> Optional[str]:
+    """Returns the script most of the letters of text are written in, or None
+    if there are no letters or no script dominates."""
+    counts = _script_counts(text)
+    total = sum(counts.values())
+    if total == 0:
+        return None
+    script, count = counts.most_common(1)[0]
+    if script == "Other" or count < MIN_SCRIPT_SHARE * total:
+        return None
+    if script == "Han" and counts["Kana"]:
+        # japanese mixes kanji with kana
+        return "Kana"
+    return script
+
+
+def _function_word_scores(words: List[str], script: str) -> Counter:
+    scores: Counter = Counter()
+    for language, function_words in FUNCTION_WORDS[script].items():
+        scores[language] = sum(1 for word in words if word in function_words)
+    return scores
+
+
+def detect_language(text: str) -> Optional[Language]:
+    """Detects the language of text locally, without calling a service.
+
+    The script of the text identifies most languages. Languages that share a
+    script (english and other latin script languages, romanized hindi, hindi
+    and marathi) are told apart by counting their most frequent function
+    words. Returns None when the language can not be told with confidence,
+    e.g. for a single latin script word.
+    """
+    script = detect_script(text)
+    if script is None:
+        return None
+    if script not in FUNCTION_WORDS:
+        return SCRIPT_LANGUAGES.get(script)
+
+    words = [word.strip(_PUNCTUATION).lower() for word in text.split()]
+    words = [word for word in words if word and not word.isdigit()]
+    if script == "Latin" and len(words) < MIN_LATIN_WORDS:
+        return None
+    scores = _function_word_scores(words, script).most_common(2)
+    (best, best_score), (_, second_score) = scores[0], scores[1]
+    if best_score == 0 or best_score == second_score:
+        # devanagari text is most likely hindi
+        return Language.HI if script == "Devanagari" else None
+    return best
+
+
+def is_language(text: str, language: Language) -> bool:
+    """Returns True if text is confidently detected to be in language."""
+    return detect_language(text) == language
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 100
+# consecutive failures that open the circuit of a provider
+FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_SECONDS = 30
+# the 95th percentile latency is only known after this many requests
+MIN_HEDGE_SAMPLES = 20
+# never rank a provider as if it fails less than this often
+MIN_SUCCESS_RATE = 0.05
+
+# the provider followed by what it is asked for, e.g. a language pair
+RouteKey = Tuple[str, ...]
+
+
+class ProviderHealth:
+    """Latency and errors of one provider for one route, and the state of
+    its circuit breaker."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+    def is_open(self, now: float) -> bool:
+        """Open circuits reject requests until CIRCUIT_OPEN_SECONDS have
+        passed, then let a single trial request through (half open)."""
+        if self.opened_at is None:
+            return False
+        return now - self.opened_at < CIRCUIT_OPEN_SECONDS or self.trial_in_flight
+
+    def expected_latency(self) -> float:
+        # providers without measurements rank first, so each gets measured
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(1 - self.error_rate, MIN_SUCCESS_RATE)
+
+    def _observe(self, latency: float):
+        self.latencies.append(latency)
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += EWMA_ALPHA * (latency - self.latency)
+
+    def record_success(self, latency: float):
+        self._observe(latency)
+        self.error_rate -= EWMA_ALPHA * self.error_rate
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now: float) -> bool:
+        """Returns True if the failure opened the circuit."""
+        self.error_rate += EWMA_ALPHA * (1 - self.error_rate)
+        self.consecutive_failures += 1
+        if self.opened_at is not None:
+            # failed trial request, stay open for another period
+            self.opened_at = now
+            return False
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.opened_at = now
+            return True
+        return False
+
+    def record_cancelled(self, latency: float):
+        # the provider lost a race, it took at least this long
+        self._observe(latency)
+
+
+class ProviderStats:
+    def __init__(self):
+        self.routed = 0
+        self.circuit_opens = 0
+
+
+S = TypeVar("S", bound=ProviderStats)
+
+
+class ProviderRouter(Generic[S]):
+    """Orders providers by their measured latency and error rate per route,
+    and keeps failing providers out of rotation with circuit breakers.
+
+    A route is what a provider is asked for, e.g. a language pair for
+    translators or a task and language for speech processors. Subclasses
+    decide how requests are sent, through _call.
+    """
+
+    def __init__(self, stats_class: Type[S]):
+        self.health: Dict[RouteKey, ProviderHealth] = {}
+        self.stats: Dict[str, S] = {}
+        self._stats_class = stats_class
+
+    def _health(self, provider: str, *route: str) -> ProviderHealth:
+        return self.health.setdefault((provider, *route), ProviderHealth())
+
+    def _stats(self, provider: str) -> S:
+        return self.stats.setdefault(provider, self._stats_class())
+
+    def rank(self, providers: List[str], *route: str) -> List[str]:
+        """Returns the providers fastest first; providers with an open circuit
+        come last, in their given order, as a last resort."""
+        now = time.monotonic()
+        healths = {provider: self._health(provider, *route) for provider in providers}
+        closed = [p for p in providers if not healths[p].is_open(now)]
+        opened = [p for p in providers if healths[p].is_open(now)]
+        closed.sort(key=lambda p: healths[p].expected_latency())
+        return closed + opened
+
+    def available(self, provider: str, *route: str) -> bool:
+        return not self._health(provider, *route).is_open(time.monotonic())
+
+    async def _call(
+        self, provider: str, route: Tuple[str, ...], call: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Calls a provider, recording its latency or failure."""
+        health = self._health(provider, *route)
+        trial = health.opened_at is not None
+        if trial:
+            health.trial_in_flight = True
+        start = time.monotonic()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            health.record_cancelled(time.monotonic() - start)
+            raise
+        except Exception:
+            if health.record_failure(time.monotonic()):
+                self._stats(provider).circuit_opens += 1
+                logger.warning(
+                    "opened circuit of %s for %s", provider, " ".join(route)
+                )
+            raise
+        finally:
+            if trial:
+                health.trial_in_flight = False
+        health.record_success(time.monotonic() - start)
+        return result
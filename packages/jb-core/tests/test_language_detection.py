@@ -0,0 +1,31 @@
+import pytest
+from jugalbandi.core import Language, detect_language, is_language
+
+
+@pytest.mark.parametrize(
+    "text, language",
+    [
+        ("What is the punishment for theft?", Language.EN),
+        ("How to file FIR under Section 154 CrPC", Language.EN),
+        ("mera case kya hai", Language.HI),
+        ("FIR kaise file kare", Language.HI),
+        ("चोरी की सजा क्या है?", Language.HI),
+        ("माझा प्रश्न काय आहे?", Language.MR),
+        ("ಕಳ್ಳತನಕ್ಕೆ ಶಿಕ್ಷೆ ಏನು", Language.KN),
+        ("চুরির শাস্তি কী?", Language.BN),
+        ("Quelle est la peine pour le vol?", Language.FR),
+        ("日本語のテキスト", Language.JA),
+    ],
+)
+def test_detect_language(text, language):
+    assert detect_language(text) == language
+
+
+@pytest.mark.parametrize("text", ["", "123", "bail", "FIR 154"])
+def test_detect_language_unsure(text):
+    assert detect_language(text) is None
+
+
+def test_is_language():
+    assert is_language("What is bail?", Language.EN)
+    assert not is_language("bail kya hai", Language.EN)
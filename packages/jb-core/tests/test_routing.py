@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from jugalbandi.core import ProviderRouter, ProviderStats
+from jugalbandi.core import routing
+
+
+async def _succeed(delay: float = 0) -> str:
+    await asyncio.sleep(delay)
+    return "ok"
+
+
+async def _fail() -> str:
+    raise ValueError("provider unavailable")
+
+
+@pytest.mark.asyncio
+async def test_rank_prefers_fastest_provider_per_route():
+    router = ProviderRouter(ProviderStats)
+    await router._call("slow", ("en", "hi"), lambda: _succeed(0.02))
+    await router._call("fast", ("en", "hi"), _succeed)
+
+    assert router.rank(["slow", "fast"], "en", "hi") == ["fast", "slow"]
+    # unmeasured routes keep the given order
+    assert router.rank(["slow", "fast"], "hi", "en") == ["slow", "fast"]
+
+
+@pytest.mark.asyncio
+async def test_failures_open_and_trial_closes_circuit(monkeypatch):
+    router = ProviderRouter(ProviderStats)
+    for _ in range(routing.FAILURE_THRESHOLD):
+        with pytest.raises(ValueError):
+            await router._call("broken", ("hi",), _fail)
+
+    assert not router.available("broken", "hi")
+    assert router.available("broken", "en")
+    assert router.rank(["broken", "other"], "hi") == ["other", "broken"]
+    assert router.stats["broken"].circuit_opens == 1
+
+    monkeypatch.setattr(routing, "CIRCUIT_OPEN_SECONDS", 0)
+    assert await router._call("broken", ("hi",), _succeed) == "ok"
+    assert router.available("broken", "hi")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_is_not_a_failure():
+    router = ProviderRouter(ProviderStats)
+    task = asyncio.ensure_future(router._call("slow", ("hi",), lambda: _succeed(1)))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    health = router.health[("slow", "hi")]
+    assert health.error_rate == 0
+    assert health.latency is not None
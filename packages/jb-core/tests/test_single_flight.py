@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from jugalbandi.core import SingleFlight
+
+
+class Loader:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ValueError("load failed")
+        return self.calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_run_the_loader_once():
+    flight = SingleFlight()
+    load = Loader()
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(5)))
+    assert results == [1] * 5
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    load = Loader(fail=True)
+    results = await asyncio.gather(
+        *(flight.do("key", load) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_key_is_released_after_success():
+    flight = SingleFlight()
+    load = Loader()
+    assert await flight.do("key", load) == 1
+    assert not flight.in_flight("key")
+    assert await flight.do("key", load) == 2
+
+
+@pytest.mark.asyncio
+async def test_key_is_released_after_failure():
+    flight = SingleFlight()
+    load = Loader(fail=True)
+    with pytest.raises(ValueError):
+        await flight.do("key", load)
+    assert not flight.in_flight("key")
+    load.fail = False
+    assert await flight.do("key", load) == 2
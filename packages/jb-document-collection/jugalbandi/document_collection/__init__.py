@@ -6,6 +6,8 @@ from .repository import (
     WrapSyncReader,
     DocumentFormat,
 )
+from .manifest import CollectionManifest
+from .index_materializer import IndexIntegrityError
 
 from jugalbandi.storage import Storage, NullStorage, LocalStorage, GoogleStorage
 
@@ -20,4 +22,6 @@ __all__ = [
     "LocalStorage",
     "NullStorage",
     "DocumentFormat",
+    "CollectionManifest",
+    "IndexIntegrityError",
 ]
@@ -0,0 +1,230 @@
+import asyncio
+import os
+import shutil
+import uuid
+import logging
+from typing import Dict, List, Optional, Tuple
+from jugalbandi.storage import (
+    DEFAULT_BULK_CONCURRENCY,
+    Storage,
+    StorageBulkOperationError,
+)
+from .manifest import FileInfo, IndexInfo
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_FILE_NAME = ".index-version.json"
+VERSIONS_FOLDER_SUFFIX = ".versions"
+STAGING_SUFFIX = ".tmp"
+
+
+class IndexIntegrityError(Exception):
+    """Raised when downloaded index files do not match the index build they
+    are expected to belong to."""
+
+
+def _read_local_version(local_folder: str) -> Optional[IndexInfo]:
+    try:
+        return IndexInfo.parse_file(os.path.join(local_folder, INDEX_VERSION_FILE_NAME))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class IndexMaterializer:
+    """Materializes one build of an index from remote storage into a local
+    folder.
+
+    Files of the build are downloaded concurrently into a staging folder and
+    verified against the md5 digests of the build, files that are already
+    present locally with the same digest are reused instead of downloaded,
+    and the staging folder is published by atomically swapping the symlink
+    at the local index folder. Readers therefore always see a complete set
+    of files from a single build.
+    """
+
+    def __init__(
+        self,
+        remote_store: Storage,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ):
+        self.remote_store = remote_store
+        self.concurrency = concurrency
+
+    @staticmethod
+    def _is_current(
+        local_folder: str, current: Optional[IndexInfo], expected: IndexInfo
+    ) -> bool:
+        if not all(
+            os.path.exists(os.path.join(local_folder, filename))
+            for filename in expected.files
+        ):
+            return False
+        if not expected.version:
+            # build is unknown, files downloaded before are the best we have
+            return True
+        return current is not None and current.version == expected.version
+
+    async def _read_remote(
+        self, remote_paths: Dict[str, List[str]]
+    ) -> Dict[str, Tuple[str, bytes]]:
+        # remote_paths maps each file to its candidate remote paths, which
+        # are tried in order until one exists
+        contents: Dict[str, Tuple[str, bytes]] = {}
+        pending = {filename: list(paths) for filename, paths in remote_paths.items()}
+        while pending:
+            attempt = {paths.pop(0): filename for filename, paths in pending.items()}
+            try:
+                results = await self.remote_store.read_files(
+                    attempt, self.concurrency
+                )
+                failed: Dict[str, Exception] = {}
+            except StorageBulkOperationError as e:
+                if not all(
+                    isinstance(exc, FileNotFoundError) for exc in e.failed.values()
+                ):
+                    raise
+                results, failed = e.succeeded, e.failed
+
+            for path, content in results.items():
+                contents[attempt[path]] = (path, content)
+            next_pending = {}
+            for path in failed:
+                filename = attempt[path]
+                if not pending[filename]:
+                    raise FileNotFoundError(f"index file {filename} not found")
+                next_pending[filename] = pending[filename]
+            pending = next_pending
+        return contents
+
+    async def _verify(
+        self, filename: str, path: str, content: bytes, expected: Optional[FileInfo]
+    ) -> FileInfo:
+        file_info = await asyncio.to_thread(FileInfo.from_content, content)
+        expected_md5 = expected.md5_hash if expected is not None else None
+        if expected_md5 is None:
+            # not recorded in the manifest, verify against the remote object
+            expected_md5 = await self.remote_store.md5_hash(path)
+        if expected_md5 is not None and expected_md5 != file_info.md5_hash:
+            raise IndexIntegrityError(
+                f"index file {filename} does not match the index build: "
+                f"md5 {file_info.md5_hash}, expected {expected_md5}"
+            )
+        return file_info
+
+    async def materialize(
+        self,
+        local_folder: str,
+        expected: IndexInfo,
+        remote_paths: Dict[str, List[str]],
+    ) -> bool:
+        """Makes local_folder hold the files of the expected build.
+
+        Returns False if the local folder was already current.
+        """
+        current = await asyncio.to_thread(_read_local_version, local_folder)
+        if await asyncio.to_thread(self._is_current, local_folder, current, expected):
+            return False
+
+        reusable = {}
+        if current is not None:
+            for filename, file_info in expected.files.items():
+                local_info = current.files.get(filename)
+                if (
+                    file_info.md5_hash is not None
+                    and local_info is not None
+                    and local_info.md5_hash == file_info.md5_hash
+                ):
+                    reusable[filename] = local_info
+
+        contents = await self._read_remote(
+            {
+                filename: paths
+                for filename, paths in remote_paths.items()
+                if filename not in reusable
+            }
+        )
+        verified = await asyncio.gather(
+            *(
+                self._verify(filename, path, content, expected.files.get(filename))
+                for filename, (path, content) in contents.items()
+            )
+        )
+        file_infos = dict(zip(contents, verified))
+        file_infos.update(reusable)
+
+        build = IndexInfo(version=expected.version, files=file_infos)
+        await asyncio.to_thread(
+            self._publish,
+            local_folder,
+            build,
+            {filename: content for filename, (_, content) in contents.items()},
+            list(reusable),
+        )
+        logger.info(
+            "materialized index %s version %s (%d downloaded, %d reused)",
+            local_folder,
+            expected.version,
+            len(contents),
+            len(reusable),
+        )
+        return True
+
+    @staticmethod
+    def _publish(
+        local_folder: str,
+        build: IndexInfo,
+        contents: Dict[str, bytes],
+        reused: List[str],
+    ):
+        versions_folder = f"{local_folder}{VERSIONS_FOLDER_SUFFIX}"
+        build_name = f"{build.version or 'unversioned'}-{uuid.uuid4().hex}"
+        staging_folder = os.path.join(versions_folder, f"{build_name}{STAGING_SUFFIX}")
+        build_folder = os.path.join(versions_folder, build_name)
+        os.makedirs(staging_folder)
+        try:
+            for filename in reused:
+                _link_or_copy(
+                    os.path.join(local_folder, filename),
+                    os.path.join(staging_folder, filename),
+                )
+            for filename, content in contents.items():
+                with open(os.path.join(staging_folder, filename), "wb") as f:
+                    f.write(content)
+            with open(os.path.join(staging_folder, INDEX_VERSION_FILE_NAME), "w") as f:
+                f.write(build.json())
+            os.rename(staging_folder, build_folder)
+        except BaseException:
+            shutil.rmtree(staging_folder, ignore_errors=True)
+            raise
+
+        previous_folder = None
+        if os.path.islink(local_folder):
+            previous_folder = os.path.join(
+                os.path.dirname(local_folder), os.readlink(local_folder)
+            )
+        elif os.path.isdir(local_folder):
+            # folder downloaded before index builds were versioned
+            shutil.rmtree(local_folder)
+
+        link = f"{local_folder}.{uuid.uuid4().hex}{STAGING_SUFFIX}"
+        os.symlink(os.path.relpath(build_folder, os.path.dirname(local_folder)), link)
+        os.replace(link, local_folder)
+
+        # keep the previous build for readers that are still loading it;
+        # staging folders of concurrent materializations are left alone
+        keep = {os.path.normpath(build_folder)}
+        if previous_folder is not None:
+            keep.add(os.path.normpath(previous_folder))
+        for entry in os.scandir(versions_folder):
+            if entry.name.endswith(STAGING_SUFFIX):
+                continue
+            if os.path.normpath(entry.path) in keep:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
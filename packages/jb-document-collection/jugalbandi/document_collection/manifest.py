@@ -0,0 +1,64 @@
+import base64
+import hashlib
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+class FileInfo(BaseModel):
+    size: Optional[int] = None
+    # base64 encoded md5 digest, same encoding as the md5Hash of GCS objects
+    md5_hash: Optional[str] = None
+
+    @classmethod
+    def from_content(cls, content: bytes) -> "FileInfo":
+        return cls(
+            size=len(content),
+            md5_hash=base64.b64encode(hashlib.md5(content).digest()).decode("ascii"),
+        )
+
+
+class FileHasher:
+    """Computes the FileInfo of content that is processed in chunks."""
+
+    def __init__(self):
+        self._md5 = hashlib.md5()
+        self._size = 0
+
+    def update(self, chunk: bytes):
+        self._md5.update(chunk)
+        self._size += len(chunk)
+
+    def file_info(self) -> FileInfo:
+        return FileInfo(
+            size=self._size,
+            md5_hash=base64.b64encode(self._md5.digest()).decode("ascii"),
+        )
+
+
+class DataFileInfo(FileInfo):
+    # derived formats of the data file (e.g. "txt"), keyed by format value
+    formats: Dict[str, FileInfo] = {}
+
+
+class IndexInfo(BaseModel):
+    version: str = ""
+    # files of versioned builds are stored in a folder named after the version
+    versioned: bool = False
+    # build replaced by this one, removed once this one is replaced in turn
+    previous_version: str = ""
+    files: Dict[str, FileInfo] = {}
+
+
+class CollectionManifest(BaseModel):
+    files: Dict[str, DataFileInfo] = {}
+    indexes: Dict[str, IndexInfo] = {}
+
+    def index_info(self, indexer: str) -> Optional[IndexInfo]:
+        return self.indexes.get(indexer)
+
+    def has_index_file(self, indexer: str, filename: str) -> bool:
+        index_info = self.indexes.get(indexer)
+        return index_info is not None and filename in index_info.files
@@ -1,20 +1,40 @@
 import asyncio
+import contextlib
 from enum import Enum
-from io import BytesIO
-from typing import Any, AsyncIterator, Dict, List, Protocol
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Protocol
 import os
 import uuid
 import re
+import tempfile
 import logging
-from pydantic import BaseModel
-from zipfile import ZipFile, ZipInfo
-from jugalbandi.storage import Storage
+from zipfile import BadZipFile, ZipFile, ZipInfo
+from aiofiles import os as aiofiles_os
+from cachetools import TTLCache
+from jugalbandi.core import SingleFlight
+from jugalbandi.core.errors import IncorrectInputException
+from jugalbandi.storage import LocalStorageJanitor, Storage, tee_write
+from .index_materializer import IndexIntegrityError, IndexMaterializer
+from .zip_guard import ZipEntryReader, check_zip_entries
+from .manifest import (
+    MANIFEST_FILE_NAME,
+    CollectionManifest,
+    DataFileInfo,
+    FileHasher,
+    FileInfo,
+    IndexInfo,
+)
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1024 * 1024
+
+# shared by all collections, so that concurrent queries on a cold collection
+# download its index files only once
+_index_downloads = SingleFlight()
+
 
 class AsyncReader(Protocol):
-    async def read(self) -> bytes:
+    async def read(self, size: int = -1) -> bytes:
         pass
 
 
@@ -22,8 +42,8 @@ class WrapSyncReader:
     def __init__(self, file_like: Any):
         self.file_like = file_like
 
-    async def read(self) -> bytes:
-        return self.file_like.read()
+    async def read(self, size: int = -1) -> bytes:
+        return self.file_like.read(size)
 
 
 class DocumentSourceFile:
@@ -37,14 +57,21 @@ class DocumentSourceFile:
     async def read_content(self):
         return await self.reader.read()
 
+    async def read_chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        while chunk := await self.reader.read(chunk_size):
+            yield chunk
+
 
 class ZipFileReader:
     def __init__(self, zf: ZipFile, fileinfo: ZipInfo):
-        self.zf = zf
-        self.fileinfo = fileinfo
+        self._reader = ZipEntryReader(zf, fileinfo)
 
-    async def read(self) -> bytes:
-        return self.zf.read(self.fileinfo)
+    async def read(self, size: int = -1) -> bytes:
+        # entries are decompressed chunk by chunk, in a worker thread
+        return await asyncio.to_thread(self._reader.read, size)
+
+    async def close(self):
+        await asyncio.to_thread(self._reader.close)
 
 
 class DocumentFormat(Enum):
@@ -52,12 +79,19 @@ class DocumentFormat(Enum):
     TEXT = "txt"
 
 
-class DataFileInfo(BaseModel):
-    default_file_name: str
-    extensions: List[str]
+INDEX_FILE_REGEX = re.compile(r"^index\..*")
+# number of zip entries decompressed and uploaded at the same time
+ZIP_INGEST_CONCURRENCY = 4
+DEFAULT_MAX_COLLECTIONS = 1024
+DEFAULT_COLLECTION_TTL = 300
 
 
-INDEX_FILE_REGEX = re.compile(r"^index\..*")
+def _version_time(index_info: IndexInfo) -> int:
+    # versions are time based uuids, builds without one are the oldest
+    try:
+        return uuid.UUID(index_info.version).time
+    except ValueError:
+        return 0
 
 
 class DocumentCollection:
@@ -66,21 +100,63 @@ class DocumentCollection:
         collection_id: str,
         local_store: Storage,
         remote_store: Storage,
+        manifest: Optional[CollectionManifest] = None,
+        janitor: Optional[LocalStorageJanitor] = None,
     ):
         self._id = collection_id
         self.local_store = local_store
         self.remote_store = remote_store
-        self.data_files: Dict[str, DataFileInfo] = {}
-        self.index_files: Dict[str, List[str]] = {}
-        self.dir: List[str] = []
+        self.janitor = janitor
+        self._manifest = manifest
+        self._manifest_lock = asyncio.Lock()
+        # manifest entries changed here and not saved yet, with the number of
+        # the change that last touched them
+        self._changes = 0
+        self._changed_files: Dict[str, int] = {}
+        self._changed_indexes: Dict[str, int] = {}
+        # index versions known to be materialized locally, by indexer
+        self._local_index_versions: Dict[str, str] = {}
 
     @property
     def id(self):
         return self._id
 
+    @property
+    def _manifest_dirty(self) -> bool:
+        return bool(self._changed_files or self._changed_indexes)
+
+    def _file_changed(self, filename: str):
+        self._changes += 1
+        self._changed_files[filename] = self._changes
+
+    def _index_changed(self, indexer: str):
+        self._changes += 1
+        self._changed_indexes[indexer] = self._changes
+
+    def _forget_changes(self, upto: Optional[int] = None):
+        """Forgets the changes up to the given number, or all of them."""
+        for changed in (self._changed_files, self._changed_indexes):
+            for key, change in list(changed.items()):
+                if upto is None or change <= upto:
+                    del changed[key]
+
     def _collection_path(self):
         return self.local_store.path(self._id)
 
+    def _touch_local(self):
+        if self.janitor is not None:
+            self.janitor.touch(self._collection_path())
+
+    @contextlib.contextmanager
+    def in_use(self) -> Iterator[None]:
+        """Keeps the local copy of the collection from being evicted, e.g.
+        while a query downloads and loads its index files."""
+        if self.janitor is None:
+            yield
+        else:
+            with self.janitor.in_use(self._collection_path()):
+                yield
+
     @staticmethod
     def _is_index_file(file_path: str):
         basename = os.path.basename(file_path)
@@ -95,56 +171,168 @@ class DocumentCollection:
             file_suffix = f"{os.path.splitext(file_suffix)[0]}.{format.value}"
             return f"{self._id}/{file_suffix}"
 
-    async def _load_directory(self):
+    async def _load_directory(self) -> CollectionManifest:
+        # builds the manifest of collections created before manifests existed
+        manifest = CollectionManifest()
+        default_file_names: Dict[str, str] = {}
         async for file in self.remote_store.list_files(self.id):
+            if file == MANIFEST_FILE_NAME:
+                continue
             if self._is_index_file(file):
                 index_name = os.path.dirname(file)
                 base = os.path.basename(file)
-                if index_name not in self.index_files:
-                    self.index_files[index_name] = [base]
-                else:
-                    self.index_files[index_name].append(base)
+                index_info = manifest.indexes.setdefault(index_name, IndexInfo())
+                index_info.files[base] = FileInfo()
+                continue
+
+            base, ext = os.path.splitext(file)
+            default_file_name = default_file_names.get(base)
+            if default_file_name is None:
+                default_file_names[base] = file
+                manifest.files[file] = DataFileInfo()
+            elif default_file_name.endswith(".txt"):
+                default_file_names[base] = file
+                dfi = manifest.files.pop(default_file_name)
+                dfi.formats["txt"] = FileInfo()
+                manifest.files[file] = dfi
             else:
-                parts = os.path.splitext(file)
-                base = parts[0]
-                ext = parts[1]
-
-                if base not in self.data_files:
-                    self.data_files[base] = DataFileInfo(
-                        default_file_name=file, extensions=[ext]
-                    )
-                else:
-                    dfi = self.data_files[base]
-                    if dfi.default_file_name.endswith(".txt"):
-                        dfi.default_file_name = file
-                    else:
-                        dfi.extensions.append(ext)
-
-            self.dir = [
-                file_info.default_file_name for file_info in self.data_files.values()
-            ]
+                manifest.files[default_file_name].formats[ext[1:]] = FileInfo()
+
+        return manifest
+
+    async def _read_manifest(self) -> Optional[CollectionManifest]:
+        try:
+            content = await self.remote_store.read_file(
+                self._filename(MANIFEST_FILE_NAME)
+            )
+        except FileNotFoundError:
+            return None
+        return CollectionManifest.parse_raw(content) if content else None
+
+    async def _load_manifest(self) -> CollectionManifest:
+        manifest = await self._read_manifest()
+        if manifest is not None:
+            return manifest
+
+        manifest = await self._load_directory()
+        if manifest.files or manifest.indexes:
+            await self.remote_store.write_file(
+                self._filename(MANIFEST_FILE_NAME), bytes(manifest.json(), "utf-8")
+            )
+        return manifest
+
+    async def manifest(self) -> CollectionManifest:
+        if self._manifest is None:
+            async with self._manifest_lock:
+                if self._manifest is None:
+                    self._manifest = await self._load_manifest()
+        return self._manifest
+
+    def _merge_manifest(self, remote: CollectionManifest):
+        """Applies the changes made here on top of the remote manifest, so
+        that saving does not undo what other workers saved in the meantime."""
+        assert self._manifest is not None
+        for filename in self._changed_files:
+            file_info = self._manifest.files.get(filename)
+            if file_info is None:
+                continue
+            remote_file_info = remote.files.get(filename)
+            if remote_file_info is not None:
+                file_info.formats = {**remote_file_info.formats, **file_info.formats}
+            remote.files[filename] = file_info
+        for indexer in self._changed_indexes:
+            index_info = self._manifest.indexes.get(indexer)
+            if index_info is None:
+                continue
+            remote_index_info = remote.indexes.get(indexer)
+            if remote_index_info is None:
+                remote.indexes[indexer] = index_info
+                continue
+            # never go back to an older build than another worker published
+            newer, older = index_info, remote_index_info
+            if _version_time(remote_index_info) > _version_time(index_info):
+                newer, older = older, newer
+            if not newer.versioned and not older.versioned:
+                newer.files = {**older.files, **newer.files}
+            remote.indexes[indexer] = newer
+        self._manifest.files = remote.files
+        self._manifest.indexes = remote.indexes
+
+    async def _save_manifest(self):
+        # changes made while another save is in progress are picked up by
+        # the next save, so concurrent writers share manifest uploads
+        async with self._manifest_lock:
+            if not self._manifest_dirty or self._manifest is None:
+                return
+            remote = await self._read_manifest()
+            saved = self._changes
+            if remote is not None:
+                self._merge_manifest(remote)
+            content = bytes(self._manifest.json(), "utf-8")
+            await self.remote_store.write_file(
+                self._filename(MANIFEST_FILE_NAME), content
+            )
+            # a failed save leaves the changes to be saved by the next one
+            self._forget_changes(saved)
 
     async def _add_data_file(self, file: DocumentSourceFile):
-        content = await file.read_content()
+        manifest = await self.manifest()
+        self._touch_local()
         target_file_name = self._filename(file.filename())
-        await self.local_store.write_file(target_file_name, content)
-        await self.remote_store.write_file(target_file_name, content)
+        hasher = FileHasher()
+
+        async def _hashed_chunks() -> AsyncIterator[bytes]:
+            async for chunk in file.read_chunks():
+                hasher.update(chunk)
+                yield chunk
+
+        # stream the file to both stores at once, instead of reading it whole
+        await tee_write(
+            _hashed_chunks(),
+            [
+                (self.local_store, target_file_name),
+                (self.remote_store, target_file_name),
+            ],
+        )
+        manifest.files[file.filename()] = DataFileInfo(**hasher.file_info().dict())
+        self._file_changed(file.filename())
 
     async def _init_from_zip(self, zip_src_file: DocumentSourceFile):
-        zip_contents = await zip_src_file.read_content()
-        with ZipFile(BytesIO(zip_contents), "r") as zf:
-            async with asyncio.TaskGroup() as task_group:
-                for file_info in zf.infolist():
-                    filename = file_info.filename
-                    if filename.startswith("__MACOSX/") or filename.endswith(
-                            ".DS_Store"):
-                        continue
-
-                    zip_source_file = DocumentSourceFile(
-                        filename, ZipFileReader(zf, file_info)
-                    )
-
-                    task_group.create_task(self._add_data_file(zip_source_file))
+        # spool the archive to disk instead of holding it in memory, zip
+        # files need random access to their central directory
+        with tempfile.TemporaryFile() as spool:
+            async for chunk in zip_src_file.read_chunks():
+                await asyncio.to_thread(spool.write, chunk)
+            try:
+                zf = await asyncio.to_thread(ZipFile, spool)
+            except BadZipFile as e:
+                raise IncorrectInputException(f"invalid zip file: {e}")
+
+            with zf:
+                entries = [
+                    file_info
+                    for file_info in zf.infolist()
+                    if not file_info.is_dir()
+                    and not file_info.filename.startswith("__MACOSX/")
+                    and not file_info.filename.endswith(".DS_Store")
+                ]
+                check_zip_entries(entries)
+
+                semaphore = asyncio.Semaphore(ZIP_INGEST_CONCURRENCY)
+
+                async def _add_entry(file_info: ZipInfo):
+                    async with semaphore:
+                        reader = ZipFileReader(zf, file_info)
+                        try:
+                            await self._add_data_file(
+                                DocumentSourceFile(file_info.filename, reader)
+                            )
+                        finally:
+                            await reader.close()
+
+                async with asyncio.TaskGroup() as task_group:
+                    for file_info in entries:
+                        task_group.create_task(_add_entry(file_info))
 
     async def init_from_files(self, files: List[DocumentSourceFile]):
         async with asyncio.TaskGroup() as task_group:
@@ -154,9 +342,11 @@ class DocumentCollection:
                 else:
                     task_group.create_task(self._add_data_file(file))
 
+        await self._save_manifest()
+
     async def list_files(self) -> AsyncIterator[str]:
-        await self._load_directory()
-        for file in self.dir:
+        manifest = await self.manifest()
+        for file in sorted(manifest.files):
             yield file
 
     async def read_file(
@@ -173,10 +363,26 @@ class DocumentCollection:
         content: bytes,
         format: DocumentFormat = DocumentFormat.DEFAULT,
     ) -> bytes:
-        return await self.remote_store.write_file(
+        manifest = await self.manifest()
+        result = await self.remote_store.write_file(
             self._filename(filename, format), content
         )
 
+        file_info = FileInfo.from_content(content)
+        if format != DocumentFormat.DEFAULT:
+            if filename in manifest.files:
+                manifest.files[filename].formats[format.value] = file_info
+                self._file_changed(filename)
+        elif self._is_index_file(filename):
+            index_info = manifest.indexes.setdefault("", IndexInfo())
+            index_info.files[filename] = file_info
+            self._index_changed("")
+        else:
+            manifest.files[filename] = DataFileInfo(**file_info.dict())
+            self._file_changed(filename)
+        await self._save_manifest()
+        return result
+
     async def write_audio_file(
         self,
         filename: str,
@@ -208,18 +414,97 @@ class DocumentCollection:
     def _index_filename_fallback(self, indexer: str, file_suffix: str) -> str:
         return self._filename(file_suffix)
 
+    def _index_build_filename(self, indexer: str, version: str, file_suffix: str):
+        return f"{self._index_folder(indexer)}/{version}/{file_suffix}"
+
+    def _remote_index_filename(
+        self, manifest: CollectionManifest, indexer: str, filename: str
+    ) -> Optional[str]:
+        index_info = manifest.index_info(indexer)
+        if index_info is not None and filename in index_info.files:
+            if index_info.versioned:
+                return self._index_build_filename(
+                    indexer, index_info.version, filename
+                )
+            return self._index_filename(indexer, filename)
+        elif manifest.has_index_file("", filename):
+            return self._index_filename_fallback(indexer, filename)
+        return None
+
+    async def _reload_manifest(self):
+        async with self._manifest_lock:
+            if not self._manifest_dirty:
+                self._manifest = None
+                self._local_index_versions.clear()
+
     async def download_index_files(self, indexer: str, *filenames: str) -> str:
-        for filename in filenames:
-            index_file_name = self._index_filename(indexer, filename)
-            content = await self.read_index_file(indexer, filename)
-            await self.local_store.write_file(index_file_name, content)
+        self._touch_local()
+        local_index_folder = self.local_store.path(self._index_folder(indexer))
+        return await _index_downloads.do(
+            (local_index_folder, filenames),
+            lambda: self._download_index_files(indexer, *filenames),
+        )
+
+    async def _download_index_files(self, indexer: str, *filenames: str) -> str:
+        local_index_folder = self.local_store.path(self._index_folder(indexer))
+        manifest = await self.manifest()
+        index_info = manifest.index_info(indexer) or IndexInfo()
+        if (
+            index_info.version
+            and self._local_index_versions.get(indexer) == index_info.version
+            and all(filename in index_info.files for filename in filenames)
+            and await aiofiles_os.path.exists(local_index_folder)
+        ):
+            return self._index_folder(indexer)
+
+        materializer = IndexMaterializer(self.remote_store)
+        for attempt in range(2):
+            manifest = await self.manifest()
+            index_info = manifest.index_info(indexer) or IndexInfo()
+            fallback_info = manifest.index_info("") or IndexInfo()
+            expected = IndexInfo(version=index_info.version)
+            remote_paths = {}
+            for filename in filenames:
+                file_info = index_info.files.get(filename) or fallback_info.files.get(
+                    filename
+                )
+                expected.files[filename] = file_info or FileInfo()
+                remote_file_name = self._remote_index_filename(
+                    manifest, indexer, filename
+                )
+                remote_paths[filename] = (
+                    [remote_file_name]
+                    if remote_file_name is not None
+                    else [
+                        self._index_filename(indexer, filename),
+                        self._index_filename_fallback(indexer, filename),
+                    ]
+                )
+            try:
+                await materializer.materialize(
+                    local_index_folder, expected, remote_paths
+                )
+                if all(filename in index_info.files for filename in filenames):
+                    self._local_index_versions[indexer] = index_info.version
+                break
+            except (IndexIntegrityError, FileNotFoundError):
+                if attempt > 0:
+                    raise
+                # the index was rebuilt after the manifest was loaded
+                await self._reload_manifest()
         return self._index_folder(indexer)
 
     async def read_index_file(self, indexer: str, filename: str) -> bytes:
+        self._touch_local()
         index_file_name = self._index_filename(indexer, filename)
         index_file_name_fallback = self._index_filename_fallback(indexer, filename)
+        remote_file_name = self._remote_index_filename(
+            await self.manifest(), indexer, filename
+        )
         if not await self.local_store.file_exists(index_file_name):
-            if await self.remote_store.file_exists(index_file_name):
+            if remote_file_name is not None:
+                content = await self.remote_store.read_file(remote_file_name)
+            elif await self.remote_store.file_exists(index_file_name):
                 content = await self.remote_store.read_file(index_file_name)
             elif await self.remote_store.file_exists(index_file_name_fallback):
                 content = await self.remote_store.read_file(index_file_name_fallback)
@@ -233,9 +518,59 @@ class DocumentCollection:
     async def write_index_file(
         self, indexer: str, filename: str, content: bytes
     ) -> bytes:
-        return await self.remote_store.write_file(
+        manifest = await self.manifest()
+        result = await self.remote_store.write_file(
             self._index_filename(indexer, filename), content
         )
+        index_info = manifest.indexes.get(indexer)
+        if index_info is None or index_info.versioned:
+            index_info = manifest.indexes[indexer] = IndexInfo()
+        index_info.files[filename] = FileInfo.from_content(content)
+        index_info.version = str(uuid.uuid1())
+        self._index_changed(indexer)
+        await self._save_manifest()
+        return result
+
+    async def write_index_files(self, indexer: str, files: Dict[str, bytes]):
+        """Writes all files of an index build as one version.
+
+        The files are uploaded to a folder of their own and become visible
+        to readers only once the manifest points at them, so readers never
+        mix files of different builds. The previous build is kept until the
+        next one is published, for readers that are still downloading it.
+        """
+        manifest = await self.manifest()
+        version = str(uuid.uuid1())
+        await self.remote_store.write_files(
+            {
+                self._index_build_filename(indexer, version, filename): content
+                for filename, content in files.items()
+            }
+        )
+        previous = manifest.indexes.get(indexer)
+        manifest.indexes[indexer] = IndexInfo(
+            version=version,
+            versioned=True,
+            previous_version=(
+                previous.version if previous is not None and previous.versioned else ""
+            ),
+            files={
+                filename: FileInfo.from_content(content)
+                for filename, content in files.items()
+            },
+        )
+        self._index_changed(indexer)
+        await self._save_manifest()
+        published = manifest.indexes[indexer]
+        if published.version != version:
+            # another worker published a newer build in the meantime
+            await self.remote_store.remove_folder(
+                f"{self._index_folder(indexer)}/{version}"
+            )
+        elif previous is not None and previous.previous_version:
+            await self.remote_store.remove_folder(
+                f"{self._index_folder(indexer)}/{previous.previous_version}"
+            )
 
     def local_index_folder(self, indexer: str) -> str:
         return os.path.join(
@@ -246,26 +581,64 @@ class DocumentCollection:
         target_file_name = self._index_filename(indexer, filename)
         return self.local_store.path(target_file_name)
 
+    async def delete(self):
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(self.remote_store.remove_folder(self._id))
+            task_group.create_task(self.local_store.remove_folder(self._id))
+        self._manifest = CollectionManifest()
+        self._forget_changes()
+        self._local_index_versions.clear()
+
 
 class DocumentRepository:
+    """Hands out collections by id.
+
+    Collections are kept in an LRU identity map, so that requests for the same
+    collection share one warm object with its manifest and index state. The
+    TTL bounds how long changes made by other workers can go unnoticed by
+    readers; a sequence of writes should start with invalidate_collection, so
+    that it builds on the latest manifest.
+    """
+
     def __init__(
         self,
         local_store: Storage,
         remote_store: Storage,
+        max_collections: int = DEFAULT_MAX_COLLECTIONS,
+        collection_ttl: float = DEFAULT_COLLECTION_TTL,
+        janitor: Optional[LocalStorageJanitor] = None,
     ):
         self.local_store = local_store
         self.remote_store = remote_store
+        self.janitor = janitor
+        self._collections: TTLCache = TTLCache(
+            maxsize=max_collections, ttl=collection_ttl
+        )
+
+    def _make_collection(
+        self, doc_id: str, manifest: Optional[CollectionManifest] = None
+    ) -> DocumentCollection:
+        return DocumentCollection(
+            doc_id, self.local_store, self.remote_store, manifest, self.janitor
+        )
 
     def new_collection(self) -> DocumentCollection:
         uuid_number = str(uuid.uuid1())
-        new_collection = DocumentCollection(
-            uuid_number, self.local_store, self.remote_store
-        )
+        new_collection = self._make_collection(uuid_number, CollectionManifest())
+        self._collections[uuid_number] = new_collection
         return new_collection
 
     def get_collection(self, doc_id: str) -> DocumentCollection:
-        return DocumentCollection(doc_id, self.local_store, self.remote_store)
+        collection = self._collections.get(doc_id)
+        if collection is None:
+            collection = self._make_collection(doc_id)
+            self._collections[doc_id] = collection
+        return collection
+
+    def invalidate_collection(self, doc_id: str):
+        self._collections.pop(doc_id, None)
 
     async def shutdown(self):
+        self._collections.clear()
         await self.remote_store.shutdown()
         await self.local_store.shutdown()
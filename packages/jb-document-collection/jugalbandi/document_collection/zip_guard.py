@@ -0,0 +1,77 @@
+from typing import IO, List, Optional
+from zipfile import BadZipFile, ZipFile, ZipInfo
+from jugalbandi.core.errors import IncorrectInputException
+
+MAX_ZIP_ENTRIES = 10_000
+MAX_ZIP_ENTRY_SIZE = 512 * 1024 * 1024
+MAX_ZIP_UNCOMPRESSED_SIZE = 2 * 1024 * 1024 * 1024
+MAX_ZIP_COMPRESSION_RATIO = 100
+# small entries can compress well without being a threat
+MIN_ZIP_RATIO_CHECKED_SIZE = 1024 * 1024
+ZIP_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class ZipBombError(IncorrectInputException):
+    pass
+
+
+def check_zip_entries(entries: List[ZipInfo]):
+    """Rejects archives whose central directory declares too many entries,
+    too much data or a suspicious compression ratio."""
+    if len(entries) > MAX_ZIP_ENTRIES:
+        raise ZipBombError(
+            f"zip file has {len(entries)} entries, at most {MAX_ZIP_ENTRIES} allowed"
+        )
+    total_size = 0
+    for entry in entries:
+        if entry.file_size > MAX_ZIP_ENTRY_SIZE:
+            raise ZipBombError(f"{entry.filename} in zip file is too large")
+        if (
+            entry.file_size > MIN_ZIP_RATIO_CHECKED_SIZE
+            and entry.file_size > MAX_ZIP_COMPRESSION_RATIO * entry.compress_size
+        ):
+            raise ZipBombError(f"{entry.filename} in zip file is compressed too much")
+        total_size += entry.file_size
+    if total_size > MAX_ZIP_UNCOMPRESSED_SIZE:
+        raise ZipBombError("zip file is too large when uncompressed")
+
+
+class ZipEntryReader:
+    """Decompresses an entry chunk by chunk, refusing to produce more data
+    than its declared size, since the declared sizes can not be trusted.
+
+    Reads block, they are meant to be run in a worker thread.
+    """
+
+    def __init__(self, zf: ZipFile, entry: ZipInfo):
+        self.zf = zf
+        self.entry = entry
+        self._file: Optional[IO[bytes]] = None
+        self._size = 0
+
+    def _read_chunk(self, size: int) -> bytes:
+        try:
+            if self._file is None:
+                self._file = self.zf.open(self.entry)
+            chunk = self._file.read(size)
+        except BadZipFile as e:
+            raise IncorrectInputException(f"invalid zip file: {e}")
+        self._size += len(chunk)
+        if self._size > self.entry.file_size:
+            raise ZipBombError(
+                f"{self.entry.filename} in zip file is larger than declared"
+            )
+        return chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size >= 0:
+            return self._read_chunk(size)
+        chunks = []
+        while chunk := self._read_chunk(ZIP_READ_CHUNK_SIZE):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
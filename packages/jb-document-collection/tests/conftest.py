@@ -4,7 +4,6 @@ from typing import Dict
 from zipfile import ZipFile
 from jugalbandi.document_collection.repository import DocumentSourceFile, WrapSyncReader
 import pytest
-import asyncio
 import pytest_asyncio
 import tempfile
 
@@ -45,9 +44,7 @@ async def doc_repo():
         repo = DocumentRepository(local_store, remote_store)
         yield repo
 
-    async with asyncio.TaskGroup() as task_group:
-        async for f in remote_store.list_all_files(""):
-            task_group.create_task(remote_store.remove_file(f))
+    await remote_store.remove_folder("")
 
     await repo.shutdown()
 
@@ -60,6 +57,16 @@ async def local_only_repo():
         )
 
 
+@pytest_asyncio.fixture()
+async def local_repo():
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as remote_dir:
+            yield DocumentRepository(
+                local_store=LocalStorage(local_dir),
+                remote_store=LocalStorage(remote_dir),
+            )
+
+
 @pytest_asyncio.fixture()
 async def zip_source_random():
     zip_contents = fake.zip(num_files=fake.pyint(min_value=1, max_value=5))
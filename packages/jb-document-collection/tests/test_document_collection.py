@@ -1,8 +1,18 @@
 import logging
+from io import BytesIO
 from typing import Dict, Tuple
-from jugalbandi.document_collection.repository import DocumentSourceFile
+from zipfile import ZIP_DEFLATED, ZipFile
+from jugalbandi.document_collection.repository import (
+    CHUNK_SIZE,
+    DocumentSourceFile,
+    WrapSyncReader,
+)
+from jugalbandi.document_collection.manifest import FileInfo
+from jugalbandi.document_collection.zip_guard import ZipBombError, ZipEntryReader
 import os
-from jugalbandi.document_collection import DocumentRepository
+import pytest
+from jugalbandi.document_collection import DocumentRepository, IndexIntegrityError
+from jugalbandi.storage import LocalStorageJanitor
 
 test_dir = os.path.dirname(__file__)
 
@@ -93,3 +103,246 @@ async def test_index_download(
     ) as f:
         content = f.read()
         assert content == exp_content
+
+
+async def test_manifest(
+    local_repo: DocumentRepository,
+    zip_source_random: Tuple[Dict[str, bytes], DocumentSourceFile],
+):
+    exp_values, zip_src_file = zip_source_random
+    doc_collection = local_repo.new_collection()
+    await doc_collection.init_from_files([zip_src_file])
+    await doc_collection.write_index_file("langchain", "index.faiss", b"faiss")
+
+    # a fresh collection object reads the persisted manifest, not the listing
+    reloaded = local_repo.get_collection(doc_collection.id)
+    manifest = await reloaded.manifest()
+    assert sorted(manifest.files) == sorted(exp_values)
+    for filename, content in exp_values.items():
+        assert manifest.files[filename].size == len(content)
+    assert manifest.has_index_file("langchain", "index.faiss")
+    assert [f async for f in reloaded.list_files()] == sorted(exp_values)
+
+
+async def test_manifest_from_directory(local_repo: DocumentRepository):
+    doc_id = "legacy"
+    for filename in ["a.pdf", "a.txt", "b.txt", "c.docx", "index.faiss"]:
+        await local_repo.remote_store.write_file(f"{doc_id}/{filename}", b"x")
+
+    doc_collection = local_repo.get_collection(doc_id)
+
+    assert [f async for f in doc_collection.list_files()] == [
+        "a.pdf",
+        "b.txt",
+        "c.docx",
+    ]
+    manifest = await doc_collection.manifest()
+    assert "txt" in manifest.files["a.pdf"].formats
+    assert manifest.has_index_file("", "index.faiss")
+    assert await local_repo.remote_store.file_exists(f"{doc_id}/manifest.json")
+
+
+async def test_download_index_build(local_repo: DocumentRepository):
+    doc_collection = local_repo.new_collection()
+    await doc_collection.write_index_files(
+        "langchain", {"index.faiss": b"faiss-1", "index.pkl": b"pkl-1"}
+    )
+    await doc_collection.download_index_files("langchain", "index.faiss", "index.pkl")
+    index_folder = doc_collection.local_index_file_path("langchain", "")
+    assert os.path.islink(index_folder.rstrip("/"))
+    assert await doc_collection.read_index_file("langchain", "index.pkl") == b"pkl-1"
+
+    # a new build with an unchanged index.pkl replaces the local folder
+    await doc_collection.write_index_files(
+        "langchain", {"index.faiss": b"faiss-2", "index.pkl": b"pkl-1"}
+    )
+    await doc_collection.download_index_files("langchain", "index.faiss", "index.pkl")
+    content = await doc_collection.read_index_file("langchain", "index.faiss")
+    assert content == b"faiss-2"
+    assert await doc_collection.read_index_file("langchain", "index.pkl") == b"pkl-1"
+
+
+async def test_download_index_build_corrupted(local_repo: DocumentRepository):
+    doc_collection = local_repo.new_collection()
+    await doc_collection.write_index_files(
+        "langchain", {"index.faiss": b"faiss-1", "index.pkl": b"pkl-1"}
+    )
+    version = (await doc_collection.manifest()).indexes["langchain"].version
+    await local_repo.remote_store.write_file(
+        f"{doc_collection.id}/langchain/{version}/index.pkl", b"pkl-2"
+    )
+
+    with pytest.raises(IndexIntegrityError):
+        await doc_collection.download_index_files(
+            "langchain", "index.faiss", "index.pkl"
+        )
+    assert not await doc_collection.local_store.file_exists(
+        f"{doc_collection.id}/langchain/index.faiss"
+    )
+
+
+async def test_upload_zip_local(
+    local_repo: DocumentRepository,
+    zip_source_random: Tuple[Dict[str, bytes], DocumentSourceFile],
+):
+    exp_values, zip_src_file = zip_source_random
+    doc_collection = local_repo.new_collection()
+    await doc_collection.init_from_files([zip_src_file])
+
+    assert [f async for f in doc_collection.list_files()] == sorted(exp_values)
+    for filename, content in exp_values.items():
+        assert await doc_collection.read_file(filename) == content
+        assert await local_repo.local_store.read_file(
+            f"{doc_collection.id}/{filename}"
+        ) == content
+    manifest = await doc_collection.manifest()
+    for filename, content in exp_values.items():
+        assert manifest.files[filename].md5_hash == (
+            FileInfo.from_content(content).md5_hash
+        )
+
+
+async def test_upload_zip_bomb(local_repo: DocumentRepository):
+    zip_contents = BytesIO()
+    with ZipFile(zip_contents, "w", compression=ZIP_DEFLATED) as zf:
+        zf.writestr("bomb.txt", bytes(16 * 1024 * 1024))
+    zip_src_file = DocumentSourceFile(
+        "bomb.zip", WrapSyncReader(BytesIO(zip_contents.getvalue()))
+    )
+    doc_collection = local_repo.new_collection()
+
+    with pytest.raises(ExceptionGroup) as e:
+        await doc_collection.init_from_files([zip_src_file])
+    assert e.value.subgroup(ZipBombError) is not None
+    assert [f async for f in doc_collection.list_files()] == []
+
+
+async def test_upload_zip_streams_entries(
+    local_repo: DocumentRepository, monkeypatch
+):
+    content = os.urandom(CHUNK_SIZE) * 3 + b"tail"
+    zip_contents = BytesIO()
+    with ZipFile(zip_contents, "w", compression=ZIP_DEFLATED) as zf:
+        zf.writestr("large.bin", content)
+    zip_src_file = DocumentSourceFile(
+        "large.zip", WrapSyncReader(BytesIO(zip_contents.getvalue()))
+    )
+    read_sizes = []
+    read = ZipEntryReader.read
+
+    def _read(self, size: int = -1) -> bytes:
+        chunk = read(self, size)
+        read_sizes.append((size, len(chunk)))
+        return chunk
+
+    monkeypatch.setattr(ZipEntryReader, "read", _read)
+    doc_collection = local_repo.new_collection()
+    await doc_collection.init_from_files([zip_src_file])
+
+    assert await doc_collection.read_file("large.bin") == content
+    # the entry is never decompressed whole
+    assert all(0 < size <= CHUNK_SIZE for size, _ in read_sizes)
+    assert sum(length for _, length in read_sizes) == len(content)
+
+
+async def test_collection_identity_map(local_repo: DocumentRepository):
+    doc_collection = local_repo.new_collection()
+    await doc_collection.write_file("a.txt", b"a")
+
+    assert local_repo.get_collection(doc_collection.id) is doc_collection
+
+    local_repo.invalidate_collection(doc_collection.id)
+    reloaded = local_repo.get_collection(doc_collection.id)
+    assert reloaded is not doc_collection
+    assert [f async for f in reloaded.list_files()] == ["a.txt"]
+
+
+async def test_collection_in_use_is_not_evicted(local_repo: DocumentRepository):
+    janitor = LocalStorageJanitor(
+        [local_repo.local_store.base_dir], max_bytes=0, min_idle=0
+    )
+    local_repo.janitor = janitor
+    busy, idle = local_repo.new_collection(), local_repo.new_collection()
+    for doc_collection in (busy, idle):
+        await doc_collection.write_index_files(
+            "langchain", {"index.faiss": b"faiss", "index.pkl": b"pkl"}
+        )
+
+    with busy.in_use():
+        await busy.download_index_files("langchain", "index.faiss", "index.pkl")
+        await janitor.collect()
+        assert os.path.exists(busy.local_index_file_path("langchain", "index.faiss"))
+    assert not os.path.exists(local_repo.local_store.path(idle.id))
+
+
+async def test_workers_keep_each_others_manifest_changes(
+    local_repo: DocumentRepository,
+):
+    other_repo = DocumentRepository(local_repo.local_store, local_repo.remote_store)
+    doc_collection = local_repo.new_collection()
+    await doc_collection.write_file("a.txt", b"a")
+    other_collection = other_repo.get_collection(doc_collection.id)
+    assert [f async for f in other_collection.list_files()] == ["a.txt"]
+
+    await doc_collection.write_file("b.txt", b"b")
+    await doc_collection.write_index_files("langchain", {"index.pkl": b"pkl"})
+    # the other worker still has the manifest it loaded before
+    await other_collection.write_file("c.txt", b"c")
+
+    assert [f async for f in other_collection.list_files()] == [
+        "a.txt",
+        "b.txt",
+        "c.txt",
+    ]
+    reloaded = DocumentRepository(
+        local_repo.local_store, local_repo.remote_store
+    ).get_collection(doc_collection.id)
+    manifest = await reloaded.manifest()
+    assert sorted(manifest.files) == ["a.txt", "b.txt", "c.txt"]
+    assert manifest.indexes["langchain"] == (
+        (await doc_collection.manifest()).indexes["langchain"]
+    )
+
+
+async def test_failed_manifest_save_is_retried(
+    local_repo: DocumentRepository, monkeypatch
+):
+    doc_collection = local_repo.new_collection()
+    write_file = local_repo.remote_store.write_file
+
+    async def _failing_write_file(file_path: str, content: bytes):
+        if file_path.endswith("manifest.json"):
+            raise OSError("upload failed")
+        return await write_file(file_path, content)
+
+    monkeypatch.setattr(local_repo.remote_store, "write_file", _failing_write_file)
+    with pytest.raises(OSError):
+        await doc_collection.write_index_file("gpt-index", "index.json", b"{}")
+
+    monkeypatch.setattr(local_repo.remote_store, "write_file", write_file)
+    # the next save writes the change, even without changes of its own
+    await doc_collection.init_from_files([])
+    reloaded = DocumentRepository(
+        local_repo.local_store, local_repo.remote_store
+    ).get_collection(doc_collection.id)
+    manifest = await reloaded.manifest()
+    assert manifest.has_index_file("gpt-index", "index.json")
+
+
+async def test_previous_index_build_is_kept(local_repo: DocumentRepository):
+    doc_collection = local_repo.new_collection()
+    versions = []
+    for build in range(3):
+        await doc_collection.write_index_files(
+            "langchain", {"index.pkl": f"pkl-{build}".encode()}
+        )
+        versions.append((await doc_collection.manifest()).indexes["langchain"].version)
+
+    def _exists(version: str):
+        return local_repo.remote_store.file_exists(
+            f"{doc_collection.id}/langchain/{version}/index.pkl"
+        )
+
+    assert not await _exists(versions[0])
+    assert await _exists(versions[1])
+    assert await _exists(versions[2])
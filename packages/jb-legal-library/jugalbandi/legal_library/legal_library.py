@@ -4,7 +4,7 @@ from typing import Dict, List, Optional
 from datetime import date
 from pydantic import BaseModel
 from jugalbandi.library import DocumentMetaData, Library, DocumentSection
-from jugalbandi.storage import Storage
+from jugalbandi.storage import LocalStorageJanitor, Storage
 from cachetools import TTLCache
 from jugalbandi.core import aiocachedmethod
 from jugalbandi.core.errors import (
@@ -111,8 +111,10 @@ class ActMetaData(BaseModel):
 
 
 class LegalLibrary(Library):
-    def __init__(self, id: str, store: Storage):
-        super(LegalLibrary, self).__init__(id, store)
+    def __init__(
+        self, id: str, store: Storage, janitor: Optional[LocalStorageJanitor] = None
+    ):
+        super(LegalLibrary, self).__init__(id, store, janitor)
         self._act_cache: TTLCache = TTLCache(2, 900)
         self.jiva_repository = JivaRepository()
 
@@ -300,11 +302,16 @@ class LegalLibrary(Library):
         else:
             raise IncorrectInputException("Incorrect input query format")
 
+    async def _load_vector_db(self) -> FAISS:
+        # the index must not be evicted between the download and the load
+        with self.in_use():
+            await self.download_index_files("index.faiss", "index.pkl")
+            return FAISS.load_local("indexes", OpenAIEmbeddings())
+
     async def test_response(self, query: str):
         processed_query = await self._preprocess_query(query)
         processed_query = processed_query.strip()
-        await self.download_index_files("index.faiss", "index.pkl")
-        vector_db = FAISS.load_local("indexes", OpenAIEmbeddings())
+        vector_db = await self._load_vector_db()
         docs = vector_db.similarity_search(query=query, k=10)
 
         contexts = []
@@ -352,8 +359,7 @@ class LegalLibrary(Library):
     async def general_search(self, query: str, email_id: str):
         processed_query = await self._preprocess_query(query)
         processed_query = processed_query.strip()
-        await self.download_index_files("index.faiss", "index.pkl")
-        vector_db = FAISS.load_local("indexes", OpenAIEmbeddings())
+        vector_db = await self._load_vector_db()
         docs = vector_db.similarity_search(query=query, k=10)
         return await self._generate_response(docs=docs, query=processed_query,
                                              email_id=email_id,
@@ -1,4 +1,3 @@
-import asyncio
 import inspect
 import logging
 import pytest
@@ -21,9 +20,7 @@ async def jiva_library():
     library = LegalLibrary("lib", remote_store)
     yield library
 
-    async with asyncio.TaskGroup() as task_group:
-        async for f in remote_store.list_all_files(""):
-            task_group.create_task(remote_store.remove_file(f))
+    await remote_store.remove_folder("")
 
     await library.shutdown()
 
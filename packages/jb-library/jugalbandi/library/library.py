@@ -1,13 +1,14 @@
 import asyncio
+import contextlib
 from enum import Enum
 import operator
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional
 import uuid
 import aiofiles
 from pydantic import BaseModel
 from datetime import date, datetime
-from jugalbandi.storage import Storage
-from jugalbandi.core import aiocachedmethod
+from jugalbandi.storage import LocalStorageJanitor, Storage
+from jugalbandi.core import aiocachedmethod, SingleFlight
 from cachetools import TTLCache, cachedmethod
 import logging
 from aiofiles import os as aiofiles_os
@@ -15,6 +16,11 @@ from aiofiles import os as aiofiles_os
 
 logger = logging.getLogger(__name__)
 
+# index files are downloaded to a process wide "indexes" folder, so concurrent
+# downloads are coalesced across all libraries
+_index_downloads = SingleFlight()
+LOCAL_INDEX_FOLDER = "indexes"
+
 
 class DocumentFormat(str, Enum):
     DEFAULT = ""
@@ -63,9 +69,12 @@ class DocumentSection(BaseModel):
 
 
 class Library:
-    def __init__(self, id: str, store: Storage):
+    def __init__(
+        self, id: str, store: Storage, janitor: Optional[LocalStorageJanitor] = None
+    ):
         self.id = id
         self.store = store
+        self.janitor = janitor
         self._directory_cache: TTLCache = TTLCache(maxsize=2, ttl=900)
         self._task_manager_store_cache: TTLCache = TTLCache(maxsize=2, ttl=900)
 
@@ -83,18 +92,16 @@ class Library:
 
     @aiocachedmethod(operator.attrgetter("_directory_cache"))
     async def catalog(self):
-        cat: Dict[str, DocumentMetaData] = {}  # type: ignore
+        metadata_files: Dict[str, str] = {}
+        async for doc_id in self.store.list_subfolders(self.id):
+            if not doc_id.startswith("__") and doc_id != "indexes":
+                metadata_files[self._file_path(f"{doc_id}/metadata.json")] = doc_id
 
-        async def _add_metadata(doc_id):
-            if doc_id != "indexes":
-                document = self.get_document(doc_id)
-                metadata = await document.read_metadata()
-                cat[doc_id] = metadata
-
-        async with asyncio.TaskGroup() as taskgroup:
-            async for doc_id in self.store.list_subfolders(self.id):
-                if not doc_id.startswith("__"):
-                    taskgroup.create_task(_add_metadata(doc_id))
+        contents = await self.store.read_files(metadata_files)
+        cat: Dict[str, DocumentMetaData] = {  # type: ignore
+            metadata_files[file_path]: DocumentMetaData.parse_raw(content)
+            for file_path, content in contents.items()
+        }
 
         return cat
 
@@ -107,23 +114,52 @@ class Library:
             metadata.id = str(uuid.uuid1())
         metadata.create_ts = datetime.now().timestamp()
         document = Document(self, metadata.id)
-        await document.write_metadata(metadata)
-        await document.write_document(content)
+        await self.store.write_files(document.files(metadata, content))
         return document
 
     async def remove_document(self, document_id: str):
-        return await self.store.remove_file(self._file_path(document_id))
+        return await self.store.remove_folder(self._file_path(document_id))
+
+    @contextlib.contextmanager
+    def in_use(self) -> Iterator[None]:
+        """Keeps the local index files from being evicted, e.g. while a query
+        downloads and loads them."""
+        if self.janitor is None:
+            yield
+        else:
+            with self.janitor.in_use(LOCAL_INDEX_FOLDER):
+                yield
 
     async def download_index_files(self, *filenames: str):
-        if not await aiofiles_os.path.exists("indexes"):
-            await aiofiles_os.makedirs("indexes", exist_ok=True)
+        if self.janitor is not None:
+            self.janitor.touch(LOCAL_INDEX_FOLDER)
+        await _index_downloads.do(
+            filenames, lambda: self._download_index_files(*filenames)
+        )
+
+    async def _download_index_files(self, *filenames: str):
+        if not await aiofiles_os.path.exists(LOCAL_INDEX_FOLDER):
+            await aiofiles_os.makedirs(LOCAL_INDEX_FOLDER, exist_ok=True)
+
+        index_file_names: Dict[str, str] = {}
         for filename in filenames:
-            temp_file_path = "indexes/" + filename
+            temp_file_path = f"{LOCAL_INDEX_FOLDER}/{filename}"
             if not await aiofiles_os.path.exists(temp_file_path):
-                index_file_name = self._file_path(temp_file_path)
-                file_content = await self._download(index_file_name)
-                async with aiofiles.open(temp_file_path, "wb") as f:
-                    await f.write(file_content)
+                index_file_names[self._file_path(temp_file_path)] = temp_file_path
+
+        contents = await self.store.read_files(index_file_names)
+
+        async def _write_local(index_file_name: str):
+            # rename into place so readers never load a half written index
+            local_file_path = index_file_names[index_file_name]
+            temp_file_path = f"{local_file_path}.{uuid.uuid4().hex}.tmp"
+            async with aiofiles.open(temp_file_path, "wb") as f:
+                await f.write(contents[index_file_name])
+            await aiofiles_os.replace(temp_file_path, local_file_path)
+
+        async with asyncio.TaskGroup() as task_group:
+            for index_file_name in contents:
+                task_group.create_task(_write_local(index_file_name))
 
     def get_document(self, document_id: str):
         return Document(self, document_id)
@@ -157,12 +193,18 @@ class Document:
         suffix = "/".join(file_suffix)
         return self._library._file_path(f"{self.id}/{suffix}")
 
+    def _document_file_path(self, format: DocumentFormat) -> str:
+        return self._file_path(f"{self.id}.{format.value}")
+
+    def _metadata_file_path(self) -> str:
+        return self._file_path("metadata.json")
+
     async def _default_file_path(self, format: Optional[DocumentFormat] = None) -> str:
         if format is None or format == DocumentFormat.DEFAULT:
             metadata = await self.read_metadata()
             format = metadata.original_format
 
-        return self._file_path(f"{self.id}.{format.value}")  # type: ignore
+        return self._document_file_path(format)  # type: ignore
 
     async def _file_path_by_type_format(
         self,
@@ -178,7 +220,7 @@ class Document:
             else:
                 return self._file_path(file_path)
         if file_type == LibraryFileType.METADATA:
-            return self._file_path("metadata.json")
+            return self._metadata_file_path()
         elif file_type == LibraryFileType.SECTIONS:
             return self._file_path("sections.json")
         elif file_type == LibraryFileType.SUPPORTING:
@@ -237,6 +279,14 @@ class Document:
     def get_task_manager_store(self, task_manager_name: str):
         return self._library.get_task_manager_store(task_manager_name)
 
+    def files(self, metadata: DocumentMetaData, content: bytes) -> Dict[str, bytes]:
+        """Returns the metadata and content of the document by their paths in
+        the library store, to be written together with write_files."""
+        return {
+            self._metadata_file_path(): bytes(metadata.json(), "utf-8"),
+            self._document_file_path(metadata.original_format): content,
+        }
+
     async def write_metadata(self, metadata: DocumentMetaData):
         await self._write(
             bytes(metadata.json(), "utf-8"),
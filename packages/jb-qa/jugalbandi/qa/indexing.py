@@ -93,12 +93,9 @@ class LangchainIndexer(Indexer):
             # save in temporary directory
             search_index.save_local(temp_dir)
 
-            async with aiofiles.open(f"{temp_dir}/index.pkl", "rb") as f:
-                content = await f.read()
-                await doc_collection.write_index_file("langchain", "index.pkl",
-                                                      content)
-
-            async with aiofiles.open(f"{temp_dir}/index.faiss", "rb") as f:
-                content = await f.read()
-                await doc_collection.write_index_file("langchain", "index.faiss",
-                                                      content)
+            files = {}
+            for filename in ("index.pkl", "index.faiss"):
+                async with aiofiles.open(f"{temp_dir}/{filename}", "rb") as f:
+                    files[filename] = await f.read()
+            # both files are published together as one version of the index
+            await doc_collection.write_index_files("langchain", files)
@@ -1,13 +1,19 @@
-import time
 from enum import Enum
 from abc import ABC, abstractmethod
-from typing import List, Any
+from typing import Any, AsyncIterator, List, Optional, Tuple
 from pydantic import BaseModel
 from jugalbandi.document_collection import DocumentCollection
-from jugalbandi.speech_processor import SpeechProcessor
+from jugalbandi.speech_processor import (
+    SpeechProcessor,
+    StreamingTTS,
+    TTSCache,
+)
+from jugalbandi.speech_processor.streaming_tts import DEFAULT_SEGMENT_CHARS
 from jugalbandi.translator import Translator
-from jugalbandi.audio_converter import convert_to_wav_with_ffmpeg
+from jugalbandi.translator.segmentation import split_segments
+from jugalbandi.audio_converter import AudioCodec, convert_to_wav_with_ffmpeg
 from jugalbandi.core.language import Language
+from jugalbandi.core.language_detection import is_language
 from jugalbandi.core.media_format import MediaFormat
 from jugalbandi.core.errors import IncorrectInputException
 from .query_with_gptindex import querying_with_gptindex
@@ -33,6 +39,41 @@ class LangchainQAModel(Enum):
     GPT4 = "gpt-4"
 
 
+def _output_language(query: str, input_language: Language) -> Language:
+    if input_language == Language.EN or is_language(query, Language.EN):
+        return Language.EN
+    return input_language
+
+
+async def _translate_answer(
+    translator: Translator, answer: str, output_language: Language
+) -> str:
+    # the model sometimes answers in the language of the query
+    if is_language(answer, output_language):
+        return answer
+    return await translator.translate_text(answer, Language.EN, output_language)
+
+
+async def _answer_audio_url(
+    speech_processor: SpeechProcessor,
+    tts_cache: TTSCache,
+    answer: str,
+    output_language: Language,
+    audio_codec: AudioCodec,
+) -> str:
+    return await tts_cache.audio_url(
+        answer,
+        output_language,
+        lambda: speech_processor.text_to_speech(
+            answer, output_language, codec=audio_codec),
+        codec=audio_codec,
+    )
+
+
+def _default_tts_cache(document_collection: DocumentCollection) -> TTSCache:
+    return TTSCache(document_collection.remote_store.new_store("output_audio_files"))
+
+
 class QAEngine(ABC):
     @abstractmethod
     async def query(
@@ -41,6 +82,7 @@ class QAEngine(ABC):
         speech_query_url: str = "",
         input_language: Language = Language.EN,
         output_format: MediaFormat = MediaFormat.TEXT,
+        audio_codec: AudioCodec = AudioCodec.MP3,
     ) -> QueryResponse:
         pass
 
@@ -50,11 +92,13 @@ class GPTIndexQAEngine:
         self,
         document_collection: DocumentCollection,
         speech_processor: SpeechProcessor,
-        translator: Translator
+        translator: Translator,
+        tts_cache: Optional[TTSCache] = None,
     ):
         self.document_collection = document_collection
         self.speech_processor = speech_processor
         self.translator = translator
+        self.tts_cache = tts_cache or _default_tts_cache(document_collection)
 
     async def query(
         self,
@@ -62,6 +106,7 @@ class GPTIndexQAEngine:
         speech_query_url: str = "",
         input_language: Language = Language.EN,
         output_format: MediaFormat = MediaFormat.TEXT,
+        audio_codec: AudioCodec = AudioCodec.MP3,
     ) -> QueryResponse:
         is_voice = False
         answer = ""
@@ -73,33 +118,31 @@ class GPTIndexQAEngine:
             raise IncorrectInputException("Query input is missing")
 
         if query != "":
-            if input_language.value == "English":
-                answer, source_text = await querying_with_gptindex(
-                    self.document_collection, query)
             if output_format.name == "VOICE":
                 is_voice = True
-
         else:
             wav_data = await convert_to_wav_with_ffmpeg(speech_query_url)
             query = await self.speech_processor.speech_to_text(wav_data, input_language)
             is_voice = True
 
-        if answer == "":
+        # queries already in english are answered in english without
+        # translating them in and the answer back out
+        output_language = _output_language(query, input_language)
+        if output_language == Language.EN:
+            answer, source_text = await querying_with_gptindex(
+                self.document_collection, query)
+        else:
             query_in_english = await self.translator.translate_text(
                 query, input_language, Language.EN)
             answer, source_text = await querying_with_gptindex(
                 self.document_collection, query_in_english)
-            answer_in_english = await self.translator.translate_text(
-                    answer, Language.EN, input_language)
+            answer_in_english = await _translate_answer(
+                self.translator, answer, output_language)
 
         if is_voice:
-            audio_content = await self.speech_processor.text_to_speech(
-                answer, input_language)
-            time_stamp = time.strftime("%Y%m%d-%H%M%S")
-            filename = "output_audio_files/audio-output-" + time_stamp + ".mp3"
-            await self.document_collection.write_audio_file(filename, audio_content)
-            audio_output_url = await self.document_collection.audio_file_public_url(
-                filename)
+            audio_output_url = await _answer_audio_url(
+                self.speech_processor, self.tts_cache, answer, output_language,
+                audio_codec)
 
         return QueryResponse(query=query, query_in_english=query_in_english,
                              answer=answer,
@@ -115,11 +158,14 @@ class LangchainQAEngine:
         speech_processor: SpeechProcessor,
         translator: Translator,
         model: LangchainQAModel,
+        tts_cache: Optional[TTSCache] = None,
     ):
         self.document_collection = document_collection
         self.speech_processor = speech_processor
         self.translator = translator
         self.model = model
+        self.tts_cache = tts_cache or _default_tts_cache(document_collection)
+        self.streaming_tts = StreamingTTS(speech_processor, self.tts_cache)
         self.models_dict = {
             LangchainQAModel.GPT3: lambda a, b, c, d, e:
             querying_with_langchain(a, b),
@@ -129,58 +175,96 @@ class LangchainQAEngine:
             querying_with_langchain_gpt4(a, b, c),
         }
 
-    async def query(
+    async def _answer(
         self,
-        query: str = "",
-        speech_query_url: str = "",
-        prompt: str = "",
-        source_text_filtering: bool = True,
-        model_size: str = "4k",
-        input_language: Language = Language.EN,
-        output_format: MediaFormat = MediaFormat.TEXT,
-    ) -> QueryResponse:
+        query: str,
+        speech_query_url: str,
+        prompt: str,
+        source_text_filtering: bool,
+        model_size: str,
+        input_language: Language,
+        output_format: MediaFormat,
+    ) -> Tuple[QueryResponse, Language, bool]:
+        """Returns the response without audio, the language of the answer
+        and whether the answer is to be spoken."""
         is_voice = False
         answer = ""
         answer_in_english = ""
         query_in_english = ""
-        audio_output_url = ""
         source_text = []
         if query == "" and speech_query_url == "":
             raise IncorrectInputException("Query input is missing")
 
         if query != "":
-            if input_language.value == "English":
-                answer, source_text = await self.models_dict[self.model](
-                    self.document_collection, query, prompt,
-                    source_text_filtering, model_size)
             if output_format.name == "VOICE":
                 is_voice = True
-
         else:
             wav_data = await convert_to_wav_with_ffmpeg(speech_query_url)
             query = await self.speech_processor.speech_to_text(wav_data, input_language)
             is_voice = True
 
-        if answer == "":
+        # queries already in english are answered in english without
+        # translating them in and the answer back out
+        output_language = _output_language(query, input_language)
+        if output_language == Language.EN:
+            answer, source_text = await self.models_dict[self.model](
+                self.document_collection, query, prompt,
+                source_text_filtering, model_size)
+        else:
             query_in_english = await self.translator.translate_text(
                 query, input_language, Language.EN)
             answer_in_english, source_text = await self.models_dict[self.model](
                 self.document_collection, query_in_english, prompt,
                 source_text_filtering, model_size)
-            answer = await self.translator.translate_text(
-                    answer_in_english, Language.EN, input_language)
+            answer = await _translate_answer(
+                self.translator, answer_in_english, output_language)
+
+        response = QueryResponse(query=query, query_in_english=query_in_english,
+                                 answer=answer,
+                                 answer_in_english=answer_in_english,
+                                 source_text=source_text)
+        return response, output_language, is_voice
 
+    async def query(
+        self,
+        query: str = "",
+        speech_query_url: str = "",
+        prompt: str = "",
+        source_text_filtering: bool = True,
+        model_size: str = "4k",
+        input_language: Language = Language.EN,
+        output_format: MediaFormat = MediaFormat.TEXT,
+        audio_codec: AudioCodec = AudioCodec.MP3,
+    ) -> QueryResponse:
+        response, output_language, is_voice = await self._answer(
+            query, speech_query_url, prompt, source_text_filtering, model_size,
+            input_language, output_format)
         if is_voice:
-            audio_content = await self.speech_processor.text_to_speech(
-                answer, input_language)
-            time_stamp = time.strftime("%Y%m%d-%H%M%S")
-            filename = "output_audio_files/audio-output-" + time_stamp + ".mp3"
-            await self.document_collection.write_audio_file(filename, audio_content)
-            audio_output_url = await self.document_collection.audio_file_public_url(
-                filename)
+            response.audio_output_url = await _answer_audio_url(
+                self.speech_processor, self.tts_cache, response.answer,
+                output_language, audio_codec)
+        return response
 
-        return QueryResponse(query=query, query_in_english=query_in_english,
-                             answer=answer,
-                             answer_in_english=answer_in_english,
-                             audio_output_url=audio_output_url,
-                             source_text=source_text)
+    async def query_with_audio_stream(
+        self,
+        query: str = "",
+        speech_query_url: str = "",
+        prompt: str = "",
+        source_text_filtering: bool = True,
+        model_size: str = "4k",
+        input_language: Language = Language.EN,
+        audio_codec: AudioCodec = AudioCodec.MP3,
+    ) -> Tuple[QueryResponse, AsyncIterator[str]]:
+        """Returns the response as soon as the answer is known, together with
+        the URLs of the audio of the answer, sentence by sentence, in order,
+        as they are synthesized."""
+        response, output_language, _ = await self._answer(
+            query, speech_query_url, prompt, source_text_filtering, model_size,
+            input_language, MediaFormat.VOICE)
+        sentences = [
+            sentence
+            for sentence, _ in split_segments(
+                response.answer, output_language, DEFAULT_SEGMENT_CHARS)
+        ]
+        return response, self.streaming_tts.audio_urls(
+            sentences, output_language, audio_codec)
@@ -6,11 +6,13 @@ from jugalbandi.document_collection import DocumentCollection
 
 
 async def querying_with_gptindex(document_collection: DocumentCollection, query: str):
-    index_content = await document_collection.read_index_file("gpt-index", "index.json")
-    index_content = index_content.decode('utf-8')
-    index_dict = json.loads(index_content)
-    storage_context = StorageContext.from_dict(index_dict)
-    index = load_index_from_storage(storage_context=storage_context)
+    with document_collection.in_use():
+        index_content = await document_collection.read_index_file("gpt-index",
+                                                                  "index.json")
+        index_content = index_content.decode('utf-8')
+        index_dict = json.loads(index_content)
+        storage_context = StorageContext.from_dict(index_dict)
+        index = load_index_from_storage(storage_context=storage_context)
     query_engine = index.as_query_engine()
     try:
         response = query_engine.query(query)
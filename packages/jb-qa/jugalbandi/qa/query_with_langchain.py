@@ -62,13 +62,22 @@ async def latent_semantic_analysis(response: str, documents: List):
     return similarity_scores
 
 
+async def load_search_index(document_collection: DocumentCollection) -> FAISS:
+    # the collection must not be evicted between the download and the load
+    with document_collection.in_use():
+        await document_collection.download_index_files("langchain", "index.faiss",
+                                                       "index.pkl")
+        index_folder_path = document_collection.local_index_folder("langchain")
+        try:
+            return FAISS.load_local(index_folder_path,
+                                    OpenAIEmbeddings())  # type: ignore
+        except Exception as e:
+            raise InternalServerException(e.__str__())
+
+
 async def querying_with_langchain(document_collection: DocumentCollection, query: str):
-    await document_collection.download_index_files("langchain", "index.faiss",
-                                                   "index.pkl")
-    index_folder_path = document_collection.local_index_folder("langchain")
+    search_index = await load_search_index(document_collection)
     try:
-        search_index = FAISS.load_local(index_folder_path,
-                                        OpenAIEmbeddings())  # type: ignore
         chain = load_qa_with_sources_chain(
             OpenAI(temperature=0), chain_type="map_reduce"  # type: ignore
         )
@@ -103,12 +112,8 @@ async def querying_with_langchain(document_collection: DocumentCollection, query
 async def querying_with_langchain_gpt4(document_collection: DocumentCollection,
                                        query: str,
                                        prompt: str):
-    await document_collection.download_index_files("langchain", "index.faiss",
-                                                   "index.pkl")
-    index_folder_path = document_collection.local_index_folder("langchain")
+    search_index = await load_search_index(document_collection)
     try:
-        search_index = FAISS.load_local(index_folder_path,
-                                        OpenAIEmbeddings())  # type: ignore
         documents = search_index.similarity_search(query, k=5)
         contexts = [document.page_content for document in documents]
         augmented_query = augmented_query = (
@@ -152,9 +157,7 @@ async def querying_with_langchain_gpt3_5(document_collection: DocumentCollection
                                          prompt: str,
                                          source_text_filtering: bool,
                                          model_size: str):
-    await document_collection.download_index_files("langchain", "index.faiss",
-                                                   "index.pkl")
-    index_folder_path = document_collection.local_index_folder("langchain")
+    search_index = await load_search_index(document_collection)
 
     if model_size == "16k":
         model_name = "gpt-3.5-turbo-16k"
@@ -162,8 +165,6 @@ async def querying_with_langchain_gpt3_5(document_collection: DocumentCollection
         model_name = "gpt-3.5-turbo"
 
     try:
-        search_index = FAISS.load_local(index_folder_path,
-                                        OpenAIEmbeddings())  # type: ignore
         documents = search_index.similarity_search(query, k=5)
         if prompt != "":
             system_rules = prompt
@@ -2,7 +2,6 @@ import pytest
 import pytest_asyncio
 import os
 import aiofiles
-import asyncio
 import tempfile
 from jugalbandi.document_collection import (
     DocumentRepository,
@@ -26,9 +25,7 @@ async def doc_repo():
         repo = DocumentRepository(local_store, remote_store)
         yield repo
 
-    async with asyncio.TaskGroup() as task_group:
-        async for f in remote_store.list_all_files(""):
-            task_group.create_task(remote_store.remove_file(f))
+    await remote_store.remove_folder("")
 
     await repo.shutdown()
 
@@ -5,6 +5,12 @@ from .speech_processor import (
     AzureSpeechProcessor,
     CompositeSpeechProcessor,
 )
+from .azure_speech import AsyncAzureSpeech
+from .routing import SpeechRouter
+from .tts_cache import DEFAULT_CODEC, DEFAULT_VOICE, TTSCache, tts_cache_key
+from .streaming_tts import StreamingTTS, group_sentences
+from .long_audio import LongAudioSpeechProcessor
+from .payloads import PayloadStats, SpeechPayloadEncoder
 
 __all__ = [
     "SpeechProcessor",
@@ -12,4 +18,15 @@ __all__ = [
     "GoogleSpeechProcessor",
     "AzureSpeechProcessor",
     "CompositeSpeechProcessor",
+    "AsyncAzureSpeech",
+    "SpeechRouter",
+    "TTSCache",
+    "tts_cache_key",
+    "DEFAULT_VOICE",
+    "DEFAULT_CODEC",
+    "StreamingTTS",
+    "group_sentences",
+    "LongAudioSpeechProcessor",
+    "PayloadStats",
+    "SpeechPayloadEncoder",
 ]
@@ -0,0 +1,141 @@
+import asyncio
+import io
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from xml.sax.saxutils import escape, quoteattr
+import azure.cognitiveservices.speech as speechsdk
+from jugalbandi.audio_converter import AudioCodec, encode_audio
+from jugalbandi.core import InternalServerException
+
+# the speech SDK blocks a thread per call until Azure responds, this bounds
+# the number of concurrent Azure speech calls of a process
+AZURE_SPEECH_MAX_WORKERS = 8
+
+# synthesized at 16 kHz and low bitrates, which is plenty for speech
+SYNTHESIS_OUTPUT_FORMATS = {
+    AudioCodec.MP3: speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3,
+    AudioCodec.OPUS: speechsdk.SpeechSynthesisOutputFormat.Ogg16Khz16BitMonoOpus,
+    AudioCodec.WAV: speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm,
+}
+
+
+class AsyncAzureSpeech:
+    """Runs Azure speech recognition and synthesis without blocking the
+    event loop.
+
+    The blocking SDK calls run on a dedicated, bounded executor, audio is
+    passed in memory instead of through files, and the language and voice
+    are chosen per call, so that one instance can serve concurrent requests.
+    The output format of synthesis is part of the speech config, there is a
+    config per output codec. The executor is shared by all instances.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    def __init__(self, subscription: Optional[str], region: Optional[str]):
+        self.subscription = subscription
+        self.region = region
+        self.speech_config = self._new_speech_config()
+        self._synthesis_configs: Dict[AudioCodec, speechsdk.SpeechConfig] = {}
+
+    def _new_speech_config(self) -> speechsdk.SpeechConfig:
+        return speechsdk.SpeechConfig(subscription=self.subscription, region=self.region)
+
+    def _synthesis_config(self, codec: AudioCodec) -> speechsdk.SpeechConfig:
+        config = self._synthesis_configs.get(codec)
+        if config is None:
+            config = self._new_speech_config()
+            config.set_speech_synthesis_output_format(SYNTHESIS_OUTPUT_FORMATS[codec])
+            self._synthesis_configs[codec] = config
+        return config
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=AZURE_SPEECH_MAX_WORKERS, thread_name_prefix="azure-speech"
+            )
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls):
+        executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(), func, *args)
+
+    def _recognize(self, wav_data: bytes, language_code: str) -> str:
+        with wave.open(io.BytesIO(wav_data)) as wav:
+            stream_format = speechsdk.audio.AudioStreamFormat(
+                samples_per_second=wav.getframerate(),
+                bits_per_sample=8 * wav.getsampwidth(),
+                channels=wav.getnchannels(),
+            )
+            pcm = wav.readframes(wav.getnframes())
+        stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        stream.write(pcm)
+        stream.close()
+        recognizer = speechsdk.SpeechRecognizer(
+            speech_config=self.speech_config,
+            audio_config=speechsdk.audio.AudioConfig(stream=stream),
+            language=language_code,
+        )
+        result = recognizer.recognize_once_async().get()
+        if result.reason == speechsdk.ResultReason.Canceled:
+            details = result.cancellation_details
+            raise InternalServerException(
+                f"Azure speech recognition canceled: {details.reason} "
+                f"{details.error_details}"
+            )
+        return result.text
+
+    def _synthesize(
+        self,
+        text: str,
+        language_code: str,
+        voice: str,
+        speech_config: speechsdk.SpeechConfig,
+    ) -> bytes:
+        ssml = (
+            f"<speak version='1.0' xml:lang={quoteattr(language_code)} "
+            "xmlns='http://www.w3.org/2001/10/synthesis'>"
+            f"<voice name={quoteattr(voice)}>{escape(text)}</voice></speak>"
+        )
+        # without an audio config the synthesized audio is only returned in
+        # the result
+        synthesizer = speechsdk.SpeechSynthesizer(
+            speech_config=speech_config, audio_config=None
+        )
+        result = synthesizer.speak_ssml_async(ssml).get()
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            details = result.cancellation_details
+            raise InternalServerException(
+                f"Azure speech synthesis failed: {details.reason} "
+                f"{details.error_details}"
+            )
+        return result.audio_data
+
+    async def recognize(self, wav_data: bytes, language_code: str) -> str:
+        return await self._run(self._recognize, wav_data, language_code)
+
+    async def synthesize(
+        self,
+        text: str,
+        language_code: str,
+        voice: str,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> bytes:
+        # codecs Azure does not synthesize are encoded from WAV
+        output_codec = codec if codec in SYNTHESIS_OUTPUT_FORMATS else AudioCodec.WAV
+        audio = await self._run(
+            self._synthesize,
+            text,
+            language_code,
+            voice,
+            self._synthesis_config(output_codec),
+        )
+        return await encode_audio(audio, codec) if output_codec != codec else audio
@@ -0,0 +1,62 @@
+import asyncio
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core import Language
+from .speech_processor import SpeechProcessor
+from .vad import read_wav, split_at_silences, write_wav
+
+# short enough for all providers, Google recognize handles up to a minute
+DEFAULT_MAX_SEGMENT_SECONDS = 30
+DEFAULT_STT_CONCURRENCY = 4
+
+
+class LongAudioSpeechProcessor(SpeechProcessor):
+    """Recognizes long voice notes in segments.
+
+    Silence at the start and end of the audio is trimmed. Audio longer than
+    max_segment_seconds is split at pauses, the segments are recognized
+    concurrently and their transcripts joined in order. Text to speech is
+    left to the wrapped speech processor.
+    """
+
+    def __init__(
+        self,
+        speech_processor: SpeechProcessor,
+        max_segment_seconds: float = DEFAULT_MAX_SEGMENT_SECONDS,
+        concurrency: int = DEFAULT_STT_CONCURRENCY,
+    ):
+        self.speech_processor = speech_processor
+        self.max_segment_seconds = max_segment_seconds
+        self.concurrency = concurrency
+
+    async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
+        try:
+            samples, sample_rate = read_wav(wav_data)
+        except ValueError:
+            return await self.speech_processor.speech_to_text(wav_data, input_language)
+        segments = split_at_silences(samples, sample_rate, self.max_segment_seconds)
+        if not segments:
+            return ""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _recognize(start: int, end: int) -> str:
+            async with semaphore:
+                return await self.speech_processor.speech_to_text(
+                    write_wav(samples[start:end], sample_rate), input_language
+                )
+
+        transcripts = await asyncio.gather(
+            *(_recognize(start, end) for start, end in segments)
+        )
+        return " ".join(
+            transcript.strip() for transcript in transcripts if transcript.strip()
+        )
+
+    async def text_to_speech(
+        self,
+        text: str,
+        input_language: Language,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> bytes:
+        return await self.speech_processor.text_to_speech(
+            text, input_language, codec=codec
+        )
@@ -0,0 +1,53 @@
+import logging
+import time
+from typing import Dict, List, Tuple
+from jugalbandi.audio_converter import AudioCodec, encode_audio
+from jugalbandi.core import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadStats:
+    def __init__(self):
+        self.requests = 0
+        self.wav_bytes = 0
+        self.sent_bytes = 0
+        self.encode_seconds = 0.0
+        self.encode_failures = 0
+
+
+class SpeechPayloadEncoder(metaclass=SingletonMeta):
+    """Encodes the audio sent to speech to text providers with the most
+    compact codec each provider accepts, and counts the bytes sent and the
+    time spent encoding per provider."""
+
+    def __init__(self):
+        self.stats: Dict[str, PayloadStats] = {}
+
+    def _stats(self, provider: str) -> PayloadStats:
+        return self.stats.setdefault(provider, PayloadStats())
+
+    async def encode(
+        self, provider: str, wav_data: bytes, codecs: List[AudioCodec]
+    ) -> Tuple[bytes, AudioCodec]:
+        """Returns wav_data encoded with the first of codecs that succeeds,
+        and that codec. WAV is the fallback when all codecs fail."""
+        stats = self._stats(provider)
+        stats.requests += 1
+        stats.wav_bytes += len(wav_data)
+        for codec in codecs:
+            if codec == AudioCodec.WAV:
+                break
+            start = time.monotonic()
+            try:
+                payload = await encode_audio(wav_data, codec)
+            except Exception:
+                stats.encode_failures += 1
+                logger.exception("encoding audio for %s as %s failed", provider, codec)
+                continue
+            finally:
+                stats.encode_seconds += time.monotonic() - start
+            stats.sent_bytes += len(payload)
+            return payload, codec
+        stats.sent_bytes += len(wav_data)
+        return wav_data, AudioCodec.WAV
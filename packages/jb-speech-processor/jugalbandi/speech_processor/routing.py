@@ -0,0 +1,41 @@
+from typing import Awaitable, Callable, TypeVar
+from jugalbandi.core.routing import ProviderRouter, ProviderStats
+
+T = TypeVar("T")
+
+SPEECH_TO_TEXT = "speech_to_text"
+TEXT_TO_SPEECH = "text_to_speech"
+
+
+class SpeechRoutingStats(ProviderStats):
+    def __init__(self):
+        super().__init__()
+        self.failovers = 0
+
+
+class SpeechRouter(ProviderRouter[SpeechRoutingStats]):
+    """Orders speech providers by their measured latency and error rate per
+    task and language, and keeps failing providers out of rotation with
+    circuit breakers.
+
+    A router is meant to be shared by all requests of an application.
+    """
+
+    def __init__(self):
+        super().__init__(SpeechRoutingStats)
+
+    async def call(
+        self,
+        provider: str,
+        task: str,
+        language: str,
+        call: Callable[[], Awaitable[T]],
+        failover: bool = False,
+    ) -> T:
+        """Calls a provider, recording its latency or failure."""
+        stats = self._stats(provider)
+        if failover:
+            stats.failovers += 1
+        else:
+            stats.routed += 1
+        return await self._call(provider, (task, language), call)
@@ -1,182 +1,162 @@
 import base64
 import httpx
 import os
-import tempfile
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional, TypeVar
 from jugalbandi.core import (
     Language,
     InternalServerException,
+    HttpClients,
 )
-from jugalbandi.audio_converter.converter import convert_wav_bytes_to_mp3_bytes
+from jugalbandi.core.bhashini import (
+    BhashiniPipelineConfig,
+    BhashiniPipelineConfigCache,
+)
+from jugalbandi.audio_converter import AudioCodec, encode_audio
 from google.cloud import texttospeech, speech
-import azure.cognitiveservices.speech as speechsdk
 from abc import ABC, abstractmethod
+from .azure_speech import AsyncAzureSpeech
+from .payloads import SpeechPayloadEncoder
+from .routing import SPEECH_TO_TEXT, TEXT_TO_SPEECH, SpeechRouter
 import json
 
+T = TypeVar("T")
+
 
 class SpeechProcessor(ABC):
+    # languages the provider can neither recognize nor synthesize
+    unsupported_languages: FrozenSet[Language] = frozenset()
+
     @abstractmethod
     async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
         pass
 
     @abstractmethod
-    async def text_to_speech(self, text: str, input_language: Language) -> bytes:
+    async def text_to_speech(
+        self,
+        text: str,
+        input_language: Language,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> bytes:
         pass
 
 
 class DhruvaSpeechProcessor(SpeechProcessor):
+    # audio formats accepted for speech to text, most compact first
+    stt_codecs = [AudioCodec.FLAC, AudioCodec.WAV]
+    unsupported_languages = frozenset({
+        Language.EN, Language.AF, Language.AR, Language.ZH, Language.FR,
+        Language.DE, Language.ID, Language.IT, Language.JA, Language.KO,
+        Language.PT, Language.RU, Language.ES, Language.TR,
+    })
+
     def __init__(self):
-        self.bhashini_user_id = os.getenv('BHASHINI_USER_ID')
-        self.bhashini_api_key = os.getenv('BHASHINI_API_KEY')
-        self.bhashini_pipleline_id = os.getenv('BHASHINI_PIPELINE_ID')
+        self.bhashini_configs = BhashiniPipelineConfigCache()
         self.bhashini_inference_url = "https://dhruva-api.bhashini.gov.in/services/inference/pipeline"
 
-    async def perform_bhashini_config_call(self,
-                                           task: str,
-                                           source_language: str,
-                                           target_language: str | None = None):
-        url = "https://meity-auth.ulcacontrib.org/ulca/apis/v0/model/getModelsPipeline"
-        if task in ['asr', 'tts']:
+    async def _infer(self,
+                     task: str,
+                     source_language: str,
+                     pipeline_config: Callable[[BhashiniPipelineConfig], Dict],
+                     input_data: Dict) -> httpx.Response:
+        async def _request(config: BhashiniPipelineConfig) -> httpx.Response:
             payload = json.dumps({
                 "pipelineTasks": [
                     {
                         "taskType": task,
-                        "config": {
-                            "language": {
-                                "sourceLanguage": source_language
-                            }
-                        }
+                        "config": pipeline_config(config)
                     }
                 ],
-                "pipelineRequestConfig": {
-                    "pipelineId": "64392f96daac500b55c543cd"
-                }
+                "inputData": input_data
             })
-        else:
-            payload = json.dumps({
-                "pipelineTasks": [
-                    {
-                        "taskType": "translation",
-                        "config": {
-                            "language": {
-                                "sourceLanguage": source_language,
-                                "targetLanguage": target_language
-                            }
-                        }
-                    }
-                ],
-                "pipelineRequestConfig": {
-                    "pipelineId": self.bhashini_pipleline_id
-                }
-            })
-        headers = {
-            'userID': self.bhashini_user_id,
-            'ulcaApiKey': self.bhashini_api_key,
-            'Content-Type': 'application/json'
-        }
+            headers = {
+                'Accept': '*/*',
+                'User-Agent': 'Thunder Client (https://www.thunderclient.com)',
+                **config.inference_headers(),
+                'Content-Type': 'application/json'
+            }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, data=payload)  # type: ignore
+            client = HttpClients().httpx_client("bhashini")
+            return await client.post(url=self.bhashini_inference_url,
+                                     headers=headers,
+                                     data=payload)  # type: ignore
 
-        return response.json()
+        response = await self.bhashini_configs.infer(
+            task, source_language, None, _request)
+        if response.status_code != 200:
+            raise InternalServerException(
+                f"Request failed with response.text: {response.text} and "
+                  f"status_code: {response.status_code}")
+        return response
 
     async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
-        bhashini_asr_config = await self.perform_bhashini_config_call(
-            task='asr', source_language=input_language.name.lower())
-        encoded_string = base64.b64encode(wav_data).decode("ascii", "ignore")
-
-        payload = json.dumps({
-            "pipelineTasks": [
-                {
-                    "taskType": "asr",
-                    "config": {
-                        "language": {
-                            "sourceLanguage": bhashini_asr_config['languages'][0]['sourceLanguage'],
-                        },
-                        "serviceId": bhashini_asr_config['pipelineResponseConfig'][0]['config'][0]['serviceId'],
-                        "audioFormat": "wav",
-                        "samplingRate": 16000
-                    }
-                }
-            ],
-            "inputData": {
+        audio_data, codec = await SpeechPayloadEncoder().encode(
+            "dhruva", wav_data, self.stt_codecs)
+        encoded_string = base64.b64encode(audio_data).decode("ascii", "ignore")
+
+        response = await self._infer(
+            'asr',
+            input_language.name.lower(),
+            lambda config: {
+                "language": {
+                    "sourceLanguage": config.source_language,
+                },
+                "serviceId": config.service_id,
+                "audioFormat": codec.value,
+                "samplingRate": 16000
+            },
+            {
                 "audio": [
                     {
                         "audioContent": encoded_string}
                 ]
-            }
-        })
-        headers = {
-            'Accept': '*/*',
-            'User-Agent': 'Thunder Client (https://www.thunderclient.com)',
-            bhashini_asr_config['pipelineInferenceAPIEndPoint']['inferenceApiKey']['name']:
-                bhashini_asr_config['pipelineInferenceAPIEndPoint']['inferenceApiKey']['value'],
-            'Content-Type': 'application/json'
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url=self.bhashini_inference_url,
-                                         headers=headers,
-                                         data=payload)  # type: ignore
-        if response.status_code != 200:
-            raise InternalServerException(
-                f"Request failed with response.text: {response.text} and "
-                  f"status_code: {response.status_code}")
+            })
 
         return response.json()['pipelineResponse'][0]['output'][0]['source']
 
     async def text_to_speech(self,
                              text: str,
                              input_language: Language,
+                             codec: AudioCodec = AudioCodec.MP3,
                              gender='female') -> bytes:
-        bhashini_tts_config = await self.perform_bhashini_config_call(
-            task='tts', source_language=input_language.name.lower())
-
-        payload = json.dumps({
-            "pipelineTasks": [
-                {
-                    "taskType": "tts",
-                    "config": {
-                        "language": {
-                            "sourceLanguage": bhashini_tts_config['languages'][0]['sourceLanguage']
-                        },
-                        "serviceId": bhashini_tts_config['pipelineResponseConfig'][0]['config'][0]['serviceId'],
-                        "gender": gender,
-                        "samplingRate": 8000
-                    }
-                }
-            ],
-            "inputData": {
+        response = await self._infer(
+            'tts',
+            input_language.name.lower(),
+            lambda config: {
+                "language": {
+                    "sourceLanguage": config.source_language
+                },
+                "serviceId": config.service_id,
+                "gender": gender,
+                "samplingRate": 8000
+            },
+            {
                 "input": [
                     {
                         "source": text
                     }
                 ]
-            }
-        })
-        headers = {
-            'Accept': '*/*',
-            'User-Agent': 'Thunder Client (https://www.thunderclient.com)',
-            bhashini_tts_config['pipelineInferenceAPIEndPoint']['inferenceApiKey']['name']:
-                bhashini_tts_config['pipelineInferenceAPIEndPoint']['inferenceApiKey']['value'],
-            'Content-Type': 'application/json'
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url=self.bhashini_inference_url,
-                                         headers=headers,
-                                         data=payload)  # type: ignore
-        if response.status_code != 200:
-            raise InternalServerException(
-                f"Request failed with response.text: {response.text} and "
-                  f"status_code: {response.status_code}")
+            })
 
         audio_content = response.json()['pipelineResponse'][0]['audio'][0]['audioContent']
         audio_content = base64.b64decode(audio_content)
-        new_audio_content = convert_wav_bytes_to_mp3_bytes(audio_content)
-        return new_audio_content
+        # encoded at the 8 kHz the audio is synthesized at
+        return await encode_audio(audio_content, codec)
 
 
 class GoogleSpeechProcessor(SpeechProcessor):
+    stt_codecs = [AudioCodec.OPUS, AudioCodec.FLAC, AudioCodec.WAV]
+    stt_encodings = {
+        AudioCodec.OPUS: speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
+        AudioCodec.FLAC: speech.RecognitionConfig.AudioEncoding.FLAC,
+        AudioCodec.WAV: speech.RecognitionConfig.AudioEncoding.LINEAR16,
+    }
+    # Google synthesizes all output codecs but FLAC itself
+    tts_encodings = {
+        AudioCodec.OPUS: texttospeech.AudioEncoding.OGG_OPUS,
+        AudioCodec.MP3: texttospeech.AudioEncoding.MP3,
+        AudioCodec.WAV: texttospeech.AudioEncoding.LINEAR16,
+    }
+
     def __init__(self):
         self.language_dict = {
             "EN" : "en-US",
@@ -209,37 +189,50 @@ class GoogleSpeechProcessor(SpeechProcessor):
         language_code = self.language_dict[input_language.name]
         if isinstance(language_code, list):
             language_code = language_code[0]
-        client = speech.SpeechAsyncClient()
-        audio = speech.RecognitionAudio(content=wav_data)
+        client = HttpClients().client("google-speech", speech.SpeechAsyncClient)
+        audio_data, codec = await SpeechPayloadEncoder().encode(
+            "google", wav_data, self.stt_codecs)
+        audio = speech.RecognitionAudio(content=audio_data)
         config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            encoding=self.stt_encodings[codec],
             sample_rate_hertz=16000,
             language_code=language_code,
         )
         response = await client.recognize(config=config, audio=audio)
         return response.results[0].alternatives[0].transcript
 
-    async def text_to_speech(self, text: str, input_language: Language) -> bytes:
+    async def text_to_speech(
+        self,
+        text: str,
+        input_language: Language,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> bytes:
         language_code = self.language_dict[input_language.name]
         if isinstance(language_code, list):
             language_code = language_code[1]
-        client = texttospeech.TextToSpeechAsyncClient()
+        client = HttpClients().client("google-tts",
+                                      texttospeech.TextToSpeechAsyncClient)
         input_text = texttospeech.SynthesisInput(text=text)
         voice = texttospeech.VoiceSelectionParams(
             language_code=language_code,
             ssml_gender=texttospeech.SsmlVoiceGender.FEMALE,
         )
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
-        )
+        encoding = self.tts_encodings.get(codec, texttospeech.AudioEncoding.LINEAR16)
+        audio_config = texttospeech.AudioConfig(audio_encoding=encoding)
         response = await client.synthesize_speech(
             request={"input": input_text, "voice": voice, "audio_config": audio_config}
         )
         audio_content = response.audio_content
+        if codec not in self.tts_encodings:
+            audio_content = await encode_audio(audio_content, codec)
         return audio_content
 
 
 class AzureSpeechProcessor(SpeechProcessor):
+    # the speech SDK decodes compressed input only with GStreamer installed
+    stt_codecs = [AudioCodec.WAV]
+    unsupported_languages = frozenset({Language.OR, Language.PA})
+
     def __init__(self):
         self.language_dict = {
             "EN" : ["en-US", "en-US-JennyNeural"],
@@ -264,77 +257,115 @@ class AzureSpeechProcessor(SpeechProcessor):
             "KO" : ["ko-KR", "ko-KR-SunHiNeural"],
             "PT" : ["pt-PT", "pt-PT-RaquelNeural"],
             "RU" : ["ru-RU", "ru-RU-SvetlanaNeural"],
-            "ES" : ["es-ES", "	es-ES-ElviraNeural"],
+            "ES" : ["es-ES", "es-ES-ElviraNeural"],
             "TR" : ["tr-TR", "tr-TR-EmelNeural"]
         }
-        self.speech_config = speechsdk.SpeechConfig(subscription=os.getenv('AZURE_SPEECH_KEY'),
-                                                    region=os.getenv('AZURE_SPEECH_REGION'))
+        self.speech = AsyncAzureSpeech(os.getenv('AZURE_SPEECH_KEY'),
+                                       os.getenv('AZURE_SPEECH_REGION'))
+        self.speech_config = self.speech.speech_config
 
     async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
         language_code = self.language_dict[input_language.name][0]
-        temp_wav_file = tempfile.NamedTemporaryFile()
-        temp_wav_file.write(wav_data)
-        audio_config = speechsdk.AudioConfig(filename=temp_wav_file.name)
-        speech_recognizer = speechsdk.SpeechRecognizer(speech_config=self.speech_config,
-                                                       audio_config=audio_config,
-                                                       language=language_code)
-        result = speech_recognizer.recognize_once_async().get()
-        if temp_wav_file:
-            temp_wav_file.close()
-
-        return result.text
-
-    async def text_to_speech(self, text: str, input_language: Language) -> bytes:
-        voice_language_code = self.language_dict[input_language.name][1]
-        temp_output_file = tempfile.NamedTemporaryFile()
-        audio_config = speechsdk.audio.AudioOutputConfig(filename=temp_output_file.name)
-        self.speech_config.speech_synthesis_voice_name = voice_language_code
-        speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config,
-                                                         audio_config=audio_config)
-        speech_synthesis_result = speech_synthesizer.speak_text_async(text).get()
-        if temp_output_file:
-            temp_output_file.close()
-
-        return speech_synthesis_result.audio_data
+        wav_data, _ = await SpeechPayloadEncoder().encode(
+            "azure", wav_data, self.stt_codecs)
+        return await self.speech.recognize(wav_data, language_code)
+
+    async def text_to_speech(
+        self,
+        text: str,
+        input_language: Language,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> bytes:
+        language_code, voice = self.language_dict[input_language.name]
+        return await self.speech.synthesize(text, language_code, voice, codec)
+
+
+def provider_name(speech_processor: SpeechProcessor) -> str:
+    return type(speech_processor).__name__
 
 
 class CompositeSpeechProcessor(SpeechProcessor):
-    def __init__(self, *speech_processors: SpeechProcessor):
+    """Tries speech processors until one succeeds, skipping those that do
+    not support the language.
+
+    The processors for each language are listed once, when the composite is
+    created. They are tried in the given order, or with a router, in the
+    order of their measured latency and error rate for the language.
+    """
+
+    def __init__(
+        self,
+        *speech_processors: SpeechProcessor,
+        router: Optional[SpeechRouter] = None,
+    ):
         self.speech_processors = speech_processors
-        self.european_language_codes = ["EN", "AF", "AR", "ZH", "FR", "DE", "ID",
-                                        "IT", "JA", "KO", "PT", "RU", "ES", "TR"]
-        self.azure_not_supported_language_codes = ["OR", "PA"]
+        self.router = router
+        self.providers: Dict[str, SpeechProcessor] = {}
+        for speech_processor in speech_processors:
+            name = provider_name(speech_processor)
+            label, n = name, 1
+            while label in self.providers:
+                n += 1
+                label = f"{name}-{n}"
+            self.providers[label] = speech_processor
+        self.routes: Dict[Language, List[str]] = {
+            language: [
+                label
+                for label, speech_processor in self.providers.items()
+                if language not in speech_processor.unsupported_languages
+            ]
+            for language in Language
+        }
 
-    async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
-        excs = []
-        for speech_processor in self.speech_processors:
+    async def _route(
+        self,
+        task: str,
+        language: Language,
+        call: Callable[[SpeechProcessor], Awaitable[T]],
+    ) -> T:
+        providers = self.routes[language]
+        language_name = language.name.lower()
+        if self.router is not None:
+            providers = self.router.rank(providers, task, language_name)
+
+        excs: List[Exception] = []
+        for provider in providers:
+            speech_processor = self.providers[provider]
             try:
-                if (input_language.name in self.european_language_codes and
-                        isinstance(speech_processor, DhruvaSpeechProcessor)):
-                    pass
-                elif (input_language.name in self.azure_not_supported_language_codes and
-                      isinstance(speech_processor, AzureSpeechProcessor)):
-                    pass
-                else:
-                    return await speech_processor.speech_to_text(wav_data, input_language)
+                if self.router is None:
+                    return await call(speech_processor)
+                return await self.router.call(
+                    provider,
+                    task,
+                    language_name,
+                    lambda: call(speech_processor),
+                    failover=bool(excs),
+                )
             except Exception as exc:
                 excs.append(exc)
+        if not excs:
+            excs.append(InternalServerException(
+                f"No speech processor supports {language.value}"))
+        raise ExceptionGroup(
+            f"CompositeSpeechProcessor {task.replace('_', ' ')} failed", excs)
 
-        raise ExceptionGroup("CompositeSpeechProcessor speech to text failed", excs)
-
-    async def text_to_speech(self, text: str, input_language: Language) -> bytes:
-        excs = []
-        for speech_processor in self.speech_processors:
-            try:
-                if (input_language.name in self.european_language_codes and
-                        isinstance(speech_processor, DhruvaSpeechProcessor)):
-                    pass
-                elif (input_language.name in self.azure_not_supported_language_codes and
-                      isinstance(speech_processor, AzureSpeechProcessor)):
-                    pass
-                else:
-                    return await speech_processor.text_to_speech(text, input_language)
-            except Exception as exc:
-                excs.append(exc)
+    async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
+        return await self._route(
+            SPEECH_TO_TEXT,
+            input_language,
+            lambda speech_processor: speech_processor.speech_to_text(
+                wav_data, input_language),
+        )
 
-        raise ExceptionGroup("CompositeSpeechProcessor text to speech failed", excs)
+    async def text_to_speech(
+        self,
+        text: str,
+        input_language: Language,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> bytes:
+        return await self._route(
+            TEXT_TO_SPEECH,
+            input_language,
+            lambda speech_processor: speech_processor.text_to_speech(
+                text, input_language, codec=codec),
+        )
@@ -0,0 +1,86 @@
+import asyncio
+from typing import AsyncIterator, List
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core import Language
+from .speech_processor import SpeechProcessor
+from .tts_cache import TTSCache
+
+# segments synthesized at the same time for one answer
+DEFAULT_TTS_CONCURRENCY = 4
+# sentences are grouped into segments of about this length, so that short
+# sentences do not each cost a synthesis request
+DEFAULT_SEGMENT_CHARS = 300
+
+
+def group_sentences(sentences: List[str], max_chars: int) -> List[str]:
+    """Groups sentences into segments of at most max_chars, except for
+    sentences longer than that. The first sentence is always a segment of
+    its own, so that it is synthesized as fast as possible."""
+    sentences = [sentence.strip() for sentence in sentences if sentence.strip()]
+    if not sentences:
+        return []
+    segments = [sentences[0]]
+    current = ""
+    for sentence in sentences[1:]:
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+
+class StreamingTTS:
+    """Synthesizes an answer segment by segment, so that clients can start
+    playing the first segment while later ones are synthesized.
+
+    Segments are synthesized concurrently, at most concurrency at a time,
+    stored through the TTS cache and published in order of the answer.
+    """
+
+    def __init__(
+        self,
+        speech_processor: SpeechProcessor,
+        tts_cache: TTSCache,
+        concurrency: int = DEFAULT_TTS_CONCURRENCY,
+        segment_chars: int = DEFAULT_SEGMENT_CHARS,
+    ):
+        self.speech_processor = speech_processor
+        self.tts_cache = tts_cache
+        self.concurrency = concurrency
+        self.segment_chars = segment_chars
+
+    async def audio_urls(
+        self,
+        sentences: List[str],
+        language: Language,
+        codec: AudioCodec = AudioCodec.MP3,
+    ) -> AsyncIterator[str]:
+        """Yields the public URLs of the audio of the segments, in order."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _synthesize(segment: str) -> str:
+            async with semaphore:
+                return await self.tts_cache.audio_url(
+                    segment,
+                    language,
+                    lambda: self.speech_processor.text_to_speech(
+                        segment, language, codec=codec
+                    ),
+                    codec=codec,
+                )
+
+        # tasks are created in order, so that earlier segments get the
+        # semaphore first
+        tasks = [
+            asyncio.ensure_future(_synthesize(segment))
+            for segment in group_sentences(sentences, self.segment_chars)
+        ]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
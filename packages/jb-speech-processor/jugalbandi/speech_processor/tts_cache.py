@@ -0,0 +1,73 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Awaitable, Callable
+from cachetools import LRUCache
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core import Language, SingleFlight
+from jugalbandi.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTS_CACHE_SIZE = 10_000
+# all speech processors synthesize a female voice unless asked otherwise
+DEFAULT_VOICE = "female"
+DEFAULT_CODEC = AudioCodec.MP3
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def tts_cache_key(
+    text: str, language: Language, voice: str, codec: AudioCodec
+) -> str:
+    normalized = _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+    content = "\n".join([language.name.lower(), voice, codec.value, normalized])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Synthesized audio, stored once per text, language, voice and codec.
+
+    Audio files are named by the hash of what they say, so that answers
+    that were spoken before are served from the store by their public URL
+    without synthesizing them again, and concurrent requests never
+    overwrite each other's files. Public URLs of recent audio are kept in
+    memory.
+    """
+
+    def __init__(self, store: Storage, maxsize: int = DEFAULT_TTS_CACHE_SIZE):
+        self.store = store
+        self._urls: LRUCache = LRUCache(maxsize=maxsize)
+        self._lookups = SingleFlight()
+
+    async def audio_url(
+        self,
+        text: str,
+        language: Language,
+        synthesize: Callable[[], Awaitable[bytes]],
+        voice: str = DEFAULT_VOICE,
+        codec: AudioCodec = DEFAULT_CODEC,
+    ) -> str:
+        """Returns the public URL of the audio of text, calling synthesize
+        only if the audio is not in the store yet."""
+        key = tts_cache_key(text, language, voice, codec)
+        url = self._urls.get(key)
+        if url is not None:
+            return url
+
+        async def _lookup() -> str:
+            file_path = f"{key}.{codec.value}"
+            try:
+                exists = await self.store.file_exists(file_path)
+            except Exception:
+                # the store is checked only to save synthesis
+                logger.exception("audio lookup failed for %s", file_path)
+                exists = False
+            if not exists:
+                await self.store.write_file(file_path, await synthesize())
+            return await self.store.make_public(file_path)
+
+        url = await self._lookups.do(key, _lookup)
+        self._urls[key] = url
+        return url
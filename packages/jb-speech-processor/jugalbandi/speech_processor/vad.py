@@ -0,0 +1,122 @@
+import io
+import wave
+from typing import List, Tuple
+import numpy as np
+
+FRAME_MS = 30
+# silence kept around speech, so that words are not clipped
+PADDING_MS = 200
+# pauses shorter than this are part of speech
+MIN_SILENCE_MS = 300
+# frames this much louder than the noise floor are speech
+SPEECH_ABOVE_NOISE_DB = 10.0
+# frames this much quieter than the loudest speech are still speech, which
+# matters for audio with hardly any pauses
+SPEECH_BELOW_PEAK_DB = 25.0
+# frames quieter than this are always silence
+MIN_SPEECH_DBFS = -50.0
+NOISE_FLOOR_PERCENTILE = 10
+PEAK_PERCENTILE = 95
+
+Region = Tuple[int, int]
+
+
+def read_wav(wav_data: bytes) -> Tuple[np.ndarray, int]:
+    """Returns the samples of 16 bit mono PCM WAV data and its sample rate."""
+    with wave.open(io.BytesIO(wav_data)) as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError("expected 16 bit mono PCM audio")
+        sample_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    return np.frombuffer(frames, dtype="<i2"), sample_rate
+
+
+def write_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _frame_levels(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """Returns the level of each frame in dB relative to full scale."""
+    frame_count = -(-len(samples) // frame_length)
+    padded = np.zeros(frame_count * frame_length, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(frame_count, frame_length) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _runs(flags: np.ndarray) -> List[Region]:
+    """Returns the (start, end) indexes of the runs of True in flags."""
+    edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def speech_regions(samples: np.ndarray, sample_rate: int) -> List[Region]:
+    """Detects speech by the energy of short frames, relative to the noise
+    floor and the loudest frames of the audio.
+
+    Returns the (start, end) sample indexes of the regions of speech,
+    including some padding, with pauses shorter than MIN_SILENCE_MS merged
+    into the speech around them.
+    """
+    if len(samples) == 0:
+        return []
+    frame_length = sample_rate * FRAME_MS // 1000
+    levels = _frame_levels(samples, frame_length)
+    noise_floor, peak = np.percentile(levels, [NOISE_FLOOR_PERCENTILE, PEAK_PERCENTILE])
+    threshold = max(
+        min(noise_floor + SPEECH_ABOVE_NOISE_DB, peak - SPEECH_BELOW_PEAK_DB),
+        MIN_SPEECH_DBFS,
+    )
+    runs = _runs(levels > threshold)
+
+    min_silence = MIN_SILENCE_MS // FRAME_MS
+    padding = PADDING_MS * sample_rate // 1000
+    regions: List[Region] = []
+    for start, end in runs:
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return [
+        (
+            max(start * frame_length - padding, 0),
+            min(end * frame_length + padding, len(samples)),
+        )
+        for start, end in regions
+    ]
+
+
+def split_at_silences(
+    samples: np.ndarray, sample_rate: int, max_segment_seconds: float
+) -> List[Region]:
+    """Splits audio into segments of at most max_segment_seconds, cutting at
+    pauses between speech, and leaves out leading and trailing silence.
+
+    Speech without pauses longer than max_segment_seconds is cut at the
+    maximum length. Returns the whole audio as one segment when no speech is
+    detected, so that nothing is lost to a wrong threshold.
+    """
+    regions = speech_regions(samples, sample_rate)
+    if not regions:
+        return [(0, len(samples))] if len(samples) else []
+
+    max_length = int(max_segment_seconds * sample_rate)
+    segments: List[Region] = []
+    for start, end in regions:
+        if segments and end - segments[-1][0] <= max_length:
+            segments[-1] = (segments[-1][0], end)
+            continue
+        while end - start > max_length:
+            segments.append((start, start + max_length))
+            start += max_length
+        segments.append((start, end))
+    return segments
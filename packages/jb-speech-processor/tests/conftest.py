@@ -0,0 +1,65 @@
+import asyncio
+import tempfile
+import pytest
+import pytest_asyncio
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core.language import Language
+from jugalbandi.speech_processor import SpeechProcessor
+from jugalbandi.storage import LocalStorage
+
+
+class PublicLocalStorage(LocalStorage):
+    async def make_public(self, file_path: str) -> str:
+        return f"file://{self.path(file_path)}"
+
+
+@pytest_asyncio.fixture()
+async def store():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield PublicLocalStorage(temp_dir)
+
+
+class SleepingSpeechProcessor(SpeechProcessor):
+    def __init__(self, delay: float, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("provider unavailable")
+        return type(self).__name__
+
+    async def text_to_speech(
+        self, text: str, input_language: Language, codec: AudioCodec = AudioCodec.MP3
+    ) -> bytes:
+        return (await self.speech_to_text(b"", input_language)).encode("utf-8")
+
+
+class SlowSpeechProcessor(SleepingSpeechProcessor):
+    pass
+
+
+class FastSpeechProcessor(SleepingSpeechProcessor):
+    unsupported_languages = frozenset({Language.OR})
+
+
+class BrokenSpeechProcessor(SleepingSpeechProcessor):
+    pass
+
+
+@pytest.fixture()
+def slow_processor() -> SleepingSpeechProcessor:
+    return SlowSpeechProcessor(0.03)
+
+
+@pytest.fixture()
+def fast_processor() -> SleepingSpeechProcessor:
+    return FastSpeechProcessor(0.001)
+
+
+@pytest.fixture()
+def broken_processor() -> SleepingSpeechProcessor:
+    return BrokenSpeechProcessor(0, fail=True)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core.language import Language
+from jugalbandi.speech_processor import LongAudioSpeechProcessor, SpeechProcessor
+from jugalbandi.speech_processor.vad import (
+    read_wav,
+    speech_regions,
+    split_at_silences,
+    write_wav,
+)
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (8000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+
+def silence(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(0, 20, int(seconds * SAMPLE_RATE)).astype(np.int16)
+
+
+class RecordingSpeechProcessor(SpeechProcessor):
+    def __init__(self):
+        self.durations: list = []
+
+    async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
+        samples, sample_rate = read_wav(wav_data)
+        self.durations.append(len(samples) / sample_rate)
+        return f"part{len(self.durations)}"
+
+    async def text_to_speech(
+        self, text: str, input_language: Language, codec: AudioCodec = AudioCodec.MP3
+    ) -> bytes:
+        return b""
+
+
+def test_wav_round_trip():
+    samples = tone(0.1)
+    read_samples, sample_rate = read_wav(write_wav(samples, SAMPLE_RATE))
+    assert sample_rate == SAMPLE_RATE
+    assert np.array_equal(read_samples, samples)
+
+
+def test_speech_regions_trim_silence():
+    samples = np.concatenate([silence(2), tone(1), silence(0.1), tone(1), silence(2)])
+    regions = speech_regions(samples, SAMPLE_RATE)
+    # the short pause is part of the speech, padding is kept around it
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert 1.7 * SAMPLE_RATE <= start <= 2 * SAMPLE_RATE
+    assert 4.1 * SAMPLE_RATE <= end <= 4.4 * SAMPLE_RATE
+
+
+def test_split_at_silences():
+    samples = np.concatenate([tone(4), silence(1), tone(4), silence(1), tone(4)])
+    segments = split_at_silences(samples, SAMPLE_RATE, max_segment_seconds=10)
+    assert len(segments) == 2
+    # the cut is in the pause between the second and third tone
+    assert 9 * SAMPLE_RATE < segments[0][1] < segments[1][0] + 0.5 * SAMPLE_RATE
+    assert all(end - start <= 10 * SAMPLE_RATE for start, end in segments)
+
+
+def test_split_at_silences_cuts_long_speech():
+    segments = split_at_silences(tone(25), SAMPLE_RATE, max_segment_seconds=10)
+    assert [round((end - start) / SAMPLE_RATE) for start, end in segments] == [
+        10,
+        10,
+        5,
+    ]
+
+
+def test_split_at_silences_keeps_audio_without_speech():
+    samples = silence(1)
+    assert split_at_silences(samples, SAMPLE_RATE, 10) == [(0, len(samples))]
+
+
+@pytest.mark.asyncio
+async def test_long_audio_speech_to_text():
+    speech_processor = RecordingSpeechProcessor()
+    long_audio = LongAudioSpeechProcessor(speech_processor, max_segment_seconds=10)
+    samples = np.concatenate(
+        [silence(3), tone(8), silence(1), tone(8), silence(1), tone(8), silence(3)]
+    )
+    text = await long_audio.speech_to_text(
+        write_wav(samples, SAMPLE_RATE), Language.HI
+    )
+    assert text == "part1 part2 part3"
+    assert all(duration <= 10 for duration in speech_processor.durations)
+    # leading and trailing silence is not sent
+    assert sum(speech_processor.durations) < len(samples) / SAMPLE_RATE - 5
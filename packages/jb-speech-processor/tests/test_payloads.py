@@ -0,0 +1,41 @@
+import pytest
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.speech_processor import SpeechPayloadEncoder
+from jugalbandi.speech_processor import payloads
+
+
+@pytest.fixture()
+def encoder(monkeypatch):
+    async def _encode_audio(wav_data: bytes, codec: AudioCodec) -> bytes:
+        if codec == AudioCodec.OPUS:
+            raise RuntimeError("no opus encoder")
+        return wav_data[:len(wav_data) // 2]
+
+    monkeypatch.setattr(payloads, "encode_audio", _encode_audio)
+    encoder = SpeechPayloadEncoder()
+    encoder.stats.clear()
+    return encoder
+
+
+@pytest.mark.asyncio
+async def test_first_codec_that_encodes_is_used(encoder: SpeechPayloadEncoder):
+    payload, codec = await encoder.encode(
+        "google", b"0123456789", [AudioCodec.OPUS, AudioCodec.FLAC, AudioCodec.WAV]
+    )
+    assert (payload, codec) == (b"01234", AudioCodec.FLAC)
+    stats = encoder.stats["google"]
+    assert (stats.requests, stats.wav_bytes, stats.sent_bytes) == (1, 10, 5)
+    assert stats.encode_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_wav_is_the_fallback(encoder: SpeechPayloadEncoder):
+    assert await encoder.encode("azure", b"0123", [AudioCodec.WAV]) == (
+        b"0123",
+        AudioCodec.WAV,
+    )
+    assert await encoder.encode("dhruva", b"0123", [AudioCodec.OPUS]) == (
+        b"0123",
+        AudioCodec.WAV,
+    )
+    assert encoder.stats["dhruva"].sent_bytes == 4
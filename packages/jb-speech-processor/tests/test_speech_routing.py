@@ -0,0 +1,63 @@
+import pytest
+from jugalbandi.core import routing
+from jugalbandi.core.language import Language
+from jugalbandi.speech_processor import (
+    CompositeSpeechProcessor,
+    SpeechRouter,
+)
+
+
+def test_routes_skip_unsupported_languages(fast_processor, slow_processor):
+    speech_processor = CompositeSpeechProcessor(fast_processor, slow_processor)
+    assert speech_processor.routes[Language.HI] == [
+        "FastSpeechProcessor",
+        "SlowSpeechProcessor",
+    ]
+    assert speech_processor.routes[Language.OR] == ["SlowSpeechProcessor"]
+
+
+@pytest.mark.asyncio
+async def test_router_measures_per_task_and_language(fast_processor, slow_processor):
+    router = SpeechRouter()
+    speech_processor = CompositeSpeechProcessor(
+        slow_processor, fast_processor, router=router
+    )
+    await speech_processor.speech_to_text(b"", Language.HI)
+
+    measured = {key for key, health in router.health.items() if health.latency}
+    assert measured == {("SlowSpeechProcessor", "speech_to_text", "hi")}
+    assert router.stats["SlowSpeechProcessor"].routed == 1
+    # providers are never asked for languages they do not support
+    await speech_processor.text_to_speech("", Language.OR)
+    assert ("FastSpeechProcessor", "text_to_speech", "or") not in router.health
+
+
+@pytest.mark.asyncio
+async def test_router_fails_over_and_opens_circuit(broken_processor, fast_processor):
+    router = SpeechRouter()
+    speech_processor = CompositeSpeechProcessor(
+        broken_processor, fast_processor, router=router
+    )
+
+    for _ in range(routing.FAILURE_THRESHOLD + 3):
+        assert await speech_processor.text_to_speech("", Language.HI) == (
+            b"FastSpeechProcessor"
+        )
+    # once its circuit is open, the broken provider is no longer tried
+    assert broken_processor.calls == routing.FAILURE_THRESHOLD
+    assert router.stats["FastSpeechProcessor"].failovers == routing.FAILURE_THRESHOLD
+    assert router.stats["FastSpeechProcessor"].routed == 3
+    assert router.stats["BrokenSpeechProcessor"].circuit_opens == 1
+
+
+@pytest.mark.asyncio
+async def test_all_providers_failing(broken_processor, fast_processor):
+    speech_processor = CompositeSpeechProcessor(
+        broken_processor, router=SpeechRouter()
+    )
+    with pytest.raises(ExceptionGroup):
+        await speech_processor.speech_to_text(b"", Language.HI)
+    with pytest.raises(ExceptionGroup):
+        await CompositeSpeechProcessor(fast_processor).speech_to_text(
+            b"", Language.OR
+        )
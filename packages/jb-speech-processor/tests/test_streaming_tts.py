@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core.language import Language
+from jugalbandi.speech_processor import (
+    SpeechProcessor,
+    StreamingTTS,
+    TTSCache,
+    group_sentences,
+)
+from jugalbandi.storage import Storage
+
+
+class SlowSpeechProcessor(SpeechProcessor):
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.texts: list = []
+
+    async def speech_to_text(self, wav_data: bytes, input_language: Language) -> str:
+        raise NotImplementedError()
+
+    async def text_to_speech(
+        self, text: str, input_language: Language, codec: AudioCodec = AudioCodec.MP3
+    ) -> bytes:
+        self.texts.append(text)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        # later segments finish first
+        await asyncio.sleep(0.05 / len(self.texts))
+        self.active -= 1
+        return text.encode("utf-8")
+
+
+def test_group_sentences():
+    sentences = ["First one.", "Two.", "Three.", "A much longer fourth sentence.", " "]
+    assert group_sentences(sentences, 15) == [
+        "First one.",
+        "Two. Three.",
+        "A much longer fourth sentence.",
+    ]
+    assert group_sentences([], 15) == []
+
+
+@pytest.mark.asyncio
+async def test_audio_urls_are_in_order(store: Storage):
+    speech_processor = SlowSpeechProcessor()
+    streaming_tts = StreamingTTS(
+        speech_processor, TTSCache(store), concurrency=2, segment_chars=1
+    )
+    sentences = [f"Sentence {i}." for i in range(5)]
+    urls = [url async for url in streaming_tts.audio_urls(sentences, Language.EN)]
+    contents = [await store.read_file(url.rsplit("/", 1)[1]) for url in urls]
+    assert contents == [sentence.encode("utf-8") for sentence in sentences]
+    assert speech_processor.max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_cancels_synthesis(store: Storage):
+    speech_processor = SlowSpeechProcessor()
+    streaming_tts = StreamingTTS(
+        speech_processor, TTSCache(store), concurrency=1, segment_chars=1
+    )
+    sentences = [f"Sentence {i}." for i in range(5)]
+    audio_urls = streaming_tts.audio_urls(sentences, Language.EN)
+    await audio_urls.__anext__()
+    await audio_urls.aclose()
+    await asyncio.sleep(0.1)
+    assert len(speech_processor.texts) < len(sentences)
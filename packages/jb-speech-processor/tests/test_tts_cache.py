@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from jugalbandi.audio_converter import AudioCodec
+from jugalbandi.core.language import Language
+from jugalbandi.speech_processor import TTSCache, tts_cache_key
+from jugalbandi.storage import Storage
+
+
+def synthesizer(calls: list):
+    async def _synthesize() -> bytes:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"audio"
+    return _synthesize
+
+
+def test_tts_cache_key_normalizes_whitespace():
+    key = tts_cache_key("a b", Language.HI, "female", AudioCodec.MP3)
+    assert tts_cache_key("a  b\n", Language.HI, "female", AudioCodec.MP3) == key
+    assert tts_cache_key("a b", Language.EN, "female", AudioCodec.MP3) != key
+    assert tts_cache_key("a b", Language.HI, "female", AudioCodec.OPUS) != key
+
+
+@pytest.mark.asyncio
+async def test_audio_is_synthesized_once(store: Storage):
+    calls: list = []
+    cache = TTSCache(store)
+    urls = await asyncio.gather(
+        *(cache.audio_url("answer", Language.HI, synthesizer(calls)) for _ in range(3))
+    )
+    assert len(calls) == 1
+    assert len(set(urls)) == 1
+    assert urls[0].endswith(".mp3")
+    assert await store.read_file(urls[0].rsplit("/", 1)[1]) == b"audio"
+
+
+@pytest.mark.asyncio
+async def test_audio_in_store_is_reused(store: Storage):
+    calls: list = []
+    url = await TTSCache(store).audio_url("answer", Language.HI, synthesizer(calls))
+    # a new cache, e.g. of another worker, finds the audio in the store
+    assert await TTSCache(store).audio_url(
+        "answer", Language.HI, synthesizer(calls)
+    ) == url
+    assert len(calls) == 1
+    await TTSCache(store).audio_url("answer", Language.EN, synthesizer(calls))
+    assert len(calls) == 2
@@ -1,4 +1,22 @@
-from .storage import Storage, NullStorage, LocalStorage
+from .storage import (
+    DEFAULT_BULK_CONCURRENCY,
+    Storage,
+    NullStorage,
+    LocalStorage,
+    StorageBulkOperationError,
+    tee_write,
+)
 from .google_storage import GoogleStorage
+from .janitor import JanitorStats, LocalStorageJanitor
 
-__all__ = ["Storage", "NullStorage", "LocalStorage", "GoogleStorage"]
+__all__ = [
+    "Storage",
+    "NullStorage",
+    "LocalStorage",
+    "GoogleStorage",
+    "StorageBulkOperationError",
+    "DEFAULT_BULK_CONCURRENCY",
+    "tee_write",
+    "JanitorStats",
+    "LocalStorageJanitor",
+]
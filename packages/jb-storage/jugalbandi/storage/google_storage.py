@@ -1,16 +1,37 @@
-from typing import AsyncIterator, Self
+import asyncio
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Self,
+)
 import os
 import logging
+import urllib.parse
+import uuid
 import aiohttp
-from .storage import Storage
+from jugalbandi.core import SingleFlight
+from .storage import (
+    DEFAULT_BULK_CONCURRENCY,
+    Storage,
+    StorageBulkOperationError,
+    run_bulk,
+)
 from gcloud.aio.storage import Storage as GoogleAioStorage  # for async operations
 from google.cloud import storage  # for synchronous operations
 from gcloud.aio.auth import Token
 from tenacity import (
+    AsyncRetrying,
     retry,
     wait_random_exponential,
     after_log,
+    retry_if_exception_type,
     retry_if_not_exception_type,
+    stop_after_attempt,
 )
 
 logger = logging.getLogger(__name__)
@@ -25,6 +46,54 @@ STORAGE_EMULATOR_HOST = os.environ.get("STORAGE_EMULATOR_HOST")
 if STORAGE_EMULATOR_HOST:
     VERIFY_SSL = False
 
+# The JSON API accepts at most 100 calls in a single batch request
+# See : https://cloud.google.com/storage/docs/batch
+MAX_BATCH_SIZE = 100
+
+# streams larger than this are sent with a resumable upload, in chunks of this
+# size, which must be a multiple of 256 KiB
+# See : https://cloud.google.com/storage/docs/performing-resumable-uploads
+RESUMABLE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _api_root() -> str:
+    if STORAGE_EMULATOR_HOST:
+        if STORAGE_EMULATOR_HOST.startswith("http"):
+            return STORAGE_EMULATOR_HOST
+        return f"http://{STORAGE_EMULATOR_HOST}"
+    return "https://storage.googleapis.com"
+
+
+def _batch_delete_body(
+    bucket_name: str, object_names: List[str], boundary: str
+) -> bytes:
+    parts = []
+    for i, object_name in enumerate(object_names):
+        quoted_name = urllib.parse.quote(object_name, safe="")
+        parts.append(
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <{i}>\r\n\r\n"
+            f"DELETE /storage/v1/b/{bucket_name}/o/{quoted_name} HTTP/1.1\r\n\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n")
+    return "".join(parts).encode("utf-8")
+
+
+def _batch_response_statuses(content_type: str, body: str) -> Dict[int, int]:
+    boundary = content_type.split("boundary=", 1)[1].strip('"')
+    statuses: Dict[int, int] = {}
+    for part in body.split(f"--{boundary}"):
+        content_id = None
+        for line in part.splitlines():
+            if line.lower().startswith("content-id:"):
+                # response content ids look like <response-12>
+                content_id = int(line.split("-")[-1].strip(" >"))
+            elif line.startswith("HTTP/") and content_id is not None:
+                statuses[content_id] = int(line.split(" ")[1])
+                break
+    return statuses
+
 
 @retry(
     wait=wait_random_exponential(multiplier=1, max=60),
@@ -48,6 +117,85 @@ async def _upload(client, bucket_name, object_name, content):
     return status
 
 
+class IncompleteUploadError(aiohttp.ClientError):
+    pass
+
+
+async def _put_upload(
+    session: aiohttp.ClientSession,
+    upload_url: str,
+    data: bytes,
+    content_range: str,
+) -> Optional[int]:
+    """Returns the number of bytes GCS has persisted, or None once the upload
+    is complete."""
+    async with session.put(
+        upload_url,
+        data=data,
+        headers={"Content-Range": content_range},
+        allow_redirects=False,
+        ssl=VERIFY_SSL,
+    ) as response:
+        if response.status != 308:
+            response.raise_for_status()
+            return None
+        # the Range header looks like bytes=0-42, it is missing when nothing
+        # was persisted yet
+        persisted = response.headers.get("Range")
+        if persisted is None:
+            return 0
+        return int(persisted.rsplit("-", 1)[1]) + 1
+
+
+async def _upload_chunk(
+    session: aiohttp.ClientSession,
+    upload_url: str,
+    chunk: bytes,
+    offset: int,
+    total_size: Optional[int],
+) -> int:
+    """Sends a chunk of a resumable upload that starts at offset, and returns
+    the offset of the next chunk.
+
+    GCS answers 308 until the final chunk, which carries the total size, and
+    may persist fewer bytes than were sent; the rest is sent again. After an
+    error, the persisted size is asked for before sending again.
+    """
+    end = offset + len(chunk)
+    total = total_size or "*"
+    persisted = offset
+    async for attempt in AsyncRetrying(
+        wait=wait_random_exponential(multiplier=1, max=60),
+        retry=retry_if_exception_type(aiohttp.ClientError),
+        stop=stop_after_attempt(5),
+        after=after_log(logger, logging.DEBUG),
+        reraise=True,
+    ):
+        with attempt:
+            if attempt.retry_state.attempt_number > 1:
+                status = await _put_upload(
+                    session, upload_url, b"", f"bytes */{total}"
+                )
+                if status is None:
+                    return end
+                persisted = status
+            while persisted < end:
+                status = await _put_upload(
+                    session,
+                    upload_url,
+                    chunk[persisted - offset :],
+                    f"bytes {persisted}-{end - 1}/{total}",
+                )
+                if status is None:
+                    return end
+                if status <= persisted:
+                    raise IncompleteUploadError(
+                        f"no bytes of {upload_url} persisted after {persisted}"
+                    )
+                persisted = status
+    return persisted
+
+
 class GoogleStorage(Storage):
     def __init__(self, bucket_name: str, base_path: str):
         self.bucket_name = bucket_name
@@ -55,6 +203,7 @@ class GoogleStorage(Storage):
         self._token_session: aiohttp.ClientSession | None = None
         self._token: Token | None = None
         self._connector: aiohttp.TCPConnector | None = None
+        self._read_flights = SingleFlight()
 
     async def shutdown(self):
         try:
@@ -104,24 +253,129 @@ class GoogleStorage(Storage):
             async with GoogleAioStorage(session=session, token=self.token) as client:
                 await _upload(client, self.bucket_name, object_name, content)
 
+    async def write_stream(self, file_path: str, chunks: AsyncIterable[bytes]):
+        buffer = bytearray()
+        iterator = aiter(chunks)
+        async for chunk in iterator:
+            buffer += chunk
+            if len(buffer) > RESUMABLE_UPLOAD_CHUNK_SIZE:
+                break
+        else:
+            await self.write_file(file_path, bytes(buffer))
+            return
+
+        object_name = f"{self.base_path}/{file_path}"
+        async with aiohttp.ClientSession(
+            connector=self.connector, connector_owner=False
+        ) as session:
+            upload_url = await self._start_resumable_upload(session, object_name)
+            offset = 0
+            while True:
+                # keep the tail of the buffer, the last chunk has to be sent
+                # with the total size once the stream is exhausted
+                while len(buffer) > RESUMABLE_UPLOAD_CHUNK_SIZE:
+                    chunk = bytes(buffer[:RESUMABLE_UPLOAD_CHUNK_SIZE])
+                    del buffer[:RESUMABLE_UPLOAD_CHUNK_SIZE]
+                    offset = await _upload_chunk(
+                        session, upload_url, chunk, offset, None
+                    )
+                chunk = await anext(iterator, None)
+                if chunk is None:
+                    break
+                buffer += chunk
+            await _upload_chunk(
+                session, upload_url, bytes(buffer), offset, offset + len(buffer)
+            )
+
+    async def _start_resumable_upload(
+        self, session: aiohttp.ClientSession, object_name: str
+    ) -> str:
+        async with session.post(
+            f"{_api_root()}/upload/storage/v1/b/{self.bucket_name}/o",
+            params={"uploadType": "resumable", "name": object_name},
+            headers={
+                "Authorization": f"Bearer {await self.token.get()}",
+                "X-Upload-Content-Type": "application/octet-stream",
+            },
+            ssl=VERIFY_SSL,
+        ) as response:
+            response.raise_for_status()
+            return response.headers["Location"]
+
+    async def write_files(
+        self,
+        files: Dict[str, bytes],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ):
+        async with aiohttp.ClientSession(
+            connector=self.connector, connector_owner=False
+        ) as session:
+            async with GoogleAioStorage(session=session, token=self.token) as client:
+
+                async def _write(file_path: str):
+                    object_name = f"{self.base_path}/{file_path}"
+                    await _upload(
+                        client, self.bucket_name, object_name, files[file_path]
+                    )
+
+                await run_bulk(_write, files.keys(), concurrency, "write_files")
+
     @retry(
         wait=wait_random_exponential(multiplier=1, max=60),
         retry=retry_if_not_exception_type(FileNotFoundError),
     )
+    async def _download(self, client: GoogleAioStorage, file_path: str) -> bytes:
+        object_name = f"{self.base_path}/{file_path}"
+        try:
+            return await client.download(self.bucket_name, object_name)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                raise FileNotFoundError(f"file {file_path} not found")
+            else:
+                raise
+
+    async def _read_file(self, file_path: str) -> bytes:
+        async with aiohttp.ClientSession(
+            connector=self.connector, connector_owner=False
+        ) as session:
+            async with GoogleAioStorage(session=session, token=self.token) as client:
+                return await self._download(client, file_path)
+
     async def read_file(self, file_path: str) -> bytes:
+        # concurrent reads of the same object share a single download
+        return await self._read_flights.do(
+            file_path, lambda: self._read_file(file_path)
+        )
+
+    async def _metadata(self, file_path: str) -> Dict[str, Any]:
         object_name = f"{self.base_path}/{file_path}"
         async with aiohttp.ClientSession(
             connector=self.connector, connector_owner=False
         ) as session:
             async with GoogleAioStorage(session=session, token=self.token) as client:
                 try:
-                    content = await client.download(self.bucket_name, object_name)
-                    return content
+                    return await client.download_metadata(
+                        self.bucket_name, object_name
+                    )
                 except aiohttp.ClientResponseError as e:
                     if e.status == 404:
                         raise FileNotFoundError(f"file {file_path} not found")
-                    else:
-                        raise
+                    raise
+
+    async def md5_hash(self, file_path: str) -> Optional[str]:
+        metadata = await self._metadata(file_path)
+        # composite objects only carry a crc32c checksum
+        return metadata.get("md5Hash")
+
+    async def read_files(
+        self,
+        file_paths: Iterable[str],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ) -> Dict[str, bytes]:
+        # each download opens a session of its own, they share the connection
+        # pool; a download shared with other readers must not depend on the
+        # session of this call, which closes when this call fails
+        return await run_bulk(self.read_file, file_paths, concurrency, "read_files")
 
     def _relative_path(self, path_suffix: str):
         if self.base_path is None or self.base_path == "":
@@ -178,7 +432,7 @@ class GoogleStorage(Storage):
 
                     page_token = data["nextPageToken"]
 
-    async def make_public(self, file_path: str) -> str:
+    def _make_public(self, file_path: str) -> str:
         blob_name = f"{self.base_path}/{file_path}"
         storage_client = storage.Client()
         bucket = storage_client.bucket(self.bucket_name)
@@ -192,6 +446,10 @@ class GoogleStorage(Storage):
             else:
                 raise
 
+    async def make_public(self, file_path: str) -> str:
+        # the ACL is changed with the synchronous client, off the event loop
+        return await asyncio.to_thread(self._make_public, file_path)
+
     async def public_url(self, file_path: str) -> str:
         # simple approach, but does not provide public url
         # see https://cloud.google.com/storage/docs/access-public-data
@@ -209,11 +467,11 @@ class GoogleStorage(Storage):
         return blob.public_url
 
     async def file_exists(self, file_path: str) -> bool:
-        blob_name = f"{self.base_path}/{file_path}"
-        client = storage.Client()
-        bucket = client.get_bucket(self.bucket_name)
-        blob = bucket.blob(blob_name)
-        return blob.exists()
+        try:
+            await self._metadata(file_path)
+        except FileNotFoundError:
+            return False
+        return True
 
     def new_store(self, folder_suffix: str) -> "GoogleStorage":
         folder_path = self._relative_path(folder_suffix)
@@ -260,16 +518,99 @@ class GoogleStorage(Storage):
 
                     page_token = data["nextPageToken"]
 
-    async def remove_file(self, file_path: str):
-        full_file_path = self._relative_path(file_path)
+    async def _list_object_names(self, prefix: str) -> List[str]:
+        object_names: List[str] = []
         async with aiohttp.ClientSession(
             connector=self.connector, connector_owner=False
         ) as session:
             async with GoogleAioStorage(session=session, token=self.token) as client:
-                objects = await client.list_objects(self.bucket_name,
-                                                    params={"prefix": full_file_path})
-                for blob in objects['items']:
-                    await client.delete(self.bucket_name, blob['name'])
+                params = {"prefix": prefix, "fields": "items(name),nextPageToken"}
+                while True:
+                    data = await _list_objects(client, self.bucket_name, params)
+                    object_names.extend(item["name"] for item in data.get("items", []))
+                    if "nextPageToken" not in data:
+                        return object_names
+                    params["pageToken"] = data["nextPageToken"]
+
+    async def _batch_delete(
+        self, session: aiohttp.ClientSession, object_names: List[str]
+    ) -> Dict[str, Exception]:
+        boundary = f"batch_{uuid.uuid4().hex}"
+        headers = {
+            "Authorization": f"Bearer {await self.token.get()}",
+            "Content-Type": f"multipart/mixed; boundary={boundary}",
+        }
+        async with session.post(
+            f"{_api_root()}/batch/storage/v1",
+            data=_batch_delete_body(self.bucket_name, object_names, boundary),
+            headers=headers,
+            ssl=VERIFY_SSL,
+        ) as response:
+            response.raise_for_status()
+            statuses = _batch_response_statuses(
+                response.headers["Content-Type"], await response.text()
+            )
+
+        failed: Dict[str, Exception] = {}
+        for i, object_name in enumerate(object_names):
+            status = statuses.get(i)
+            # 404 means the object is already gone, which is what we want
+            if status not in (200, 204, 404):
+                failed[object_name] = IOError(
+                    f"delete of {object_name} failed with status {status}"
+                )
+        return failed
+
+    async def _delete_objects(
+        self,
+        object_names: List[str],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ):
+        batches = [
+            object_names[i : i + MAX_BATCH_SIZE]
+            for i in range(0, len(object_names), MAX_BATCH_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        failed: Dict[str, Exception] = {}
+
+        async with aiohttp.ClientSession(
+            connector=self.connector, connector_owner=False
+        ) as session:
+
+            async def _delete_batch(batch: List[str]):
+                async with semaphore:
+                    try:
+                        failed.update(await self._batch_delete(session, batch))
+                    except Exception as exc:
+                        failed.update({object_name: exc for object_name in batch})
+
+            await asyncio.gather(*(_delete_batch(batch) for batch in batches))
+
+        if failed:
+            raise StorageBulkOperationError(
+                f"remove failed for {len(failed)} of {len(object_names)} files",
+                failed,
+                {name: None for name in object_names if name not in failed},
+            )
+
+    async def remove_file(self, file_path: str):
+        full_file_path = self._relative_path(file_path)
+        await self._delete_objects(await self._list_object_names(full_file_path))
+
+    async def remove_files(
+        self,
+        file_paths: Iterable[str],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ):
+        await self._delete_objects(
+            [self._relative_path(file_path) for file_path in file_paths], concurrency
+        )
+
+    async def remove_folder(
+        self, folder_path: str, concurrency: int = DEFAULT_BULK_CONCURRENCY
+    ):
+        prefix = f"{self._relative_path(folder_path)}/"
+        await self._delete_objects(await self._list_object_names(prefix), concurrency)
 
     async def list_all_files(self, folder_path: str):
         prefix = f"{self._relative_path(folder_path)}/"
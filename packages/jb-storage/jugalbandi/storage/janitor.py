@@ -0,0 +1,174 @@
+import asyncio
+import contextlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JANITOR_INTERVAL = 300
+# directories accessed more recently than this are never evicted, so that a
+# query can load the files it just downloaded
+DEFAULT_MIN_IDLE = 600
+EVICTING_MARKER = ".evicting-"
+
+
+class JanitorStats(BaseModel):
+    total_bytes: int = 0
+    entries: int = 0
+    in_use: int = 0
+    evicted_entries: int = 0
+    evicted_bytes: int = 0
+    runs: int = 0
+
+
+def _disk_usage(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class LocalStorageJanitor:
+    """Evicts least recently used directories of local storage caches.
+
+    The directories managed are the immediate subdirectories of the given
+    roots (e.g. the working directories of document collections) and any
+    directory passed to touch or in_use. Directories are evicted when they
+    have not been accessed for max_age seconds, or in least recently used
+    order while the total size exceeds max_bytes. Directories that are in use,
+    or were accessed in the last min_idle seconds, are never evicted.
+    """
+
+    def __init__(
+        self,
+        roots: List[str],
+        max_bytes: int,
+        max_age: Optional[float] = None,
+        min_idle: float = DEFAULT_MIN_IDLE,
+        interval: float = DEFAULT_JANITOR_INTERVAL,
+    ):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.min_idle = min_idle
+        self.interval = interval
+        self.stats = JanitorStats()
+        self._last_access: Dict[str, float] = {}
+        self._pins: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, path: str):
+        self._last_access[os.path.abspath(path)] = time.time()
+
+    @contextlib.contextmanager
+    def in_use(self, path: str) -> Iterator[None]:
+        path = os.path.abspath(path)
+        self._pins[path] = self._pins.get(path, 0) + 1
+        self.touch(path)
+        try:
+            yield
+        finally:
+            self._pins[path] -= 1
+            if self._pins[path] == 0:
+                del self._pins[path]
+            self.touch(path)
+
+    def _scan(
+        self, tracked: List[str]
+    ) -> Tuple[Dict[str, Tuple[float, int]], List[str]]:
+        entries: Dict[str, Tuple[float, int]] = {}
+        leftovers: List[str] = []
+        paths = set(tracked)
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            for entry in os.scandir(root):
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if EVICTING_MARKER in entry.name:
+                    leftovers.append(entry.path)
+                else:
+                    paths.add(entry.path)
+        for path in paths:
+            try:
+                modified = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            entries[path] = (modified, _disk_usage(path))
+        return entries, leftovers
+
+    async def collect(self) -> JanitorStats:
+        """Runs one eviction pass and returns the updated statistics."""
+        entries, leftovers = await asyncio.to_thread(
+            self._scan, list(self._last_access)
+        )
+        for leftover in leftovers:
+            await asyncio.to_thread(shutil.rmtree, leftover, True)
+        # forget directories deleted by others, or the accesses would pile up
+        for path in list(self._last_access):
+            if path not in entries and path not in self._pins:
+                del self._last_access[path]
+
+        now = time.time()
+        last_access = {
+            path: max(modified, self._last_access.get(path, 0))
+            for path, (modified, _) in entries.items()
+        }
+        total_bytes = sum(size for _, size in entries.values())
+        remaining = len(entries)
+        for path in sorted(entries, key=last_access.__getitem__):
+            idle = now - last_access[path]
+            expired = self.max_age is not None and idle > self.max_age
+            if not expired and total_bytes <= self.max_bytes:
+                break
+            if path in self._pins or idle < self.min_idle:
+                continue
+            # renaming is atomic, readers see either the whole directory or
+            # none of it, the slow delete happens afterwards
+            evicting_path = f"{path}{EVICTING_MARKER}{uuid.uuid4().hex}"
+            try:
+                os.rename(path, evicting_path)
+            except FileNotFoundError:
+                continue
+            self._last_access.pop(path, None)
+            await asyncio.to_thread(shutil.rmtree, evicting_path, True)
+            size = entries[path][1]
+            total_bytes -= size
+            remaining -= 1
+            self.stats.evicted_entries += 1
+            self.stats.evicted_bytes += size
+            logger.info("evicted %s (%d bytes, idle %ds)", path, size, idle)
+
+        self.stats.total_bytes = total_bytes
+        self.stats.entries = remaining
+        self.stats.in_use = len(self._pins)
+        self.stats.runs += 1
+        return self.stats
+
+    async def _run(self):
+        while True:
+            try:
+                await self.collect()
+            except Exception:
+                logger.exception("local storage janitor run failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
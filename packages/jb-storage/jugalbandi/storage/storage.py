@@ -1,12 +1,133 @@
 from abc import ABC, abstractmethod
+import asyncio
+import base64
+import hashlib
 import os
-from typing import AsyncIterator, Self
+import shutil
+import uuid
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Self,
+    Tuple,
+    TypeVar,
+)
 from aiofiles import os as aiofiles_os
 import aiofiles
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+DEFAULT_BULK_CONCURRENCY = 16
+# chunks buffered per destination of a tee_write
+MAX_BUFFERED_CHUNKS = 4
+
+
+class StorageBulkOperationError(ExceptionGroup):
+    """Raised when some of the objects of a bulk operation failed.
+
+    ``failed`` maps each failed path to its exception and ``succeeded``
+    maps each successful path to its result, so callers can act on the
+    partial outcome instead of redoing the whole batch.
+    """
+
+    def __new__(
+        cls,
+        message: str,
+        failed: Dict[str, Exception],
+        succeeded: Dict[str, Any] | None = None,
+    ):
+        self = super().__new__(cls, message, list(failed.values()))
+        self.failed = failed
+        self.succeeded = succeeded or {}
+        return self
+
+    def __init__(
+        self,
+        message: str,
+        failed: Dict[str, Exception],
+        succeeded: Dict[str, Any] | None = None,
+    ):
+        super().__init__(message, list(failed.values()))
+
+    def derive(self, excs):
+        failed = {
+            path: exc
+            for path, exc in self.failed.items()
+            if any(exc is e for e in excs)
+        }
+        return StorageBulkOperationError(self.message, failed, self.succeeded)
+
+
+async def run_bulk(
+    operation: Callable[[str], Awaitable[T]],
+    paths: Iterable[str],
+    concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    description: str = "bulk operation",
+) -> Dict[str, T]:
+    semaphore = asyncio.Semaphore(concurrency)
+    succeeded: Dict[str, T] = {}
+    failed: Dict[str, Exception] = {}
+
+    async def _run(path: str):
+        async with semaphore:
+            try:
+                succeeded[path] = await operation(path)
+            except Exception as exc:
+                failed[path] = exc
+
+    await asyncio.gather(*(_run(path) for path in dict.fromkeys(paths)))
+
+    if failed:
+        raise StorageBulkOperationError(
+            f"{description} failed for {len(failed)} of "
+            f"{len(failed) + len(succeeded)} files",
+            failed,
+            succeeded,
+        )
+    return succeeded
+
+
+async def tee_write(
+    chunks: AsyncIterable[bytes],
+    destinations: List[Tuple["Storage", str]],
+    max_buffered_chunks: int = MAX_BUFFERED_CHUNKS,
+):
+    """Streams chunks to several stores at the same time.
+
+    Each destination is fed through a bounded queue, so at most
+    max_buffered_chunks chunks per destination are held in memory and the
+    source is read no faster than the slowest store accepts data.
+    """
+    queues: List[asyncio.Queue] = [
+        asyncio.Queue(max_buffered_chunks) for _ in destinations
+    ]
+
+    async def _pump():
+        async for chunk in chunks:
+            for queue in queues:
+                await queue.put(chunk)
+        for queue in queues:
+            await queue.put(None)
+
+    async def _drain(queue: asyncio.Queue) -> AsyncIterator[bytes]:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+
+    async with asyncio.TaskGroup() as task_group:
+        task_group.create_task(_pump())
+        for queue, (store, file_path) in zip(queues, destinations):
+            task_group.create_task(store.write_stream(file_path, _drain(queue)))
+
 
 class Storage(ABC):
     @abstractmethod
@@ -49,10 +170,53 @@ class Storage(ABC):
     def new_store(self, folder_suffix: str) -> Self:
         pass
 
+    @abstractmethod
+    async def remove_file(self, file_path: str):
+        pass
+
     @abstractmethod
     async def shutdown(self):
         pass
 
+    async def read_files(
+        self,
+        file_paths: Iterable[str],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ) -> Dict[str, bytes]:
+        return await run_bulk(self.read_file, file_paths, concurrency, "read_files")
+
+    async def write_files(
+        self,
+        files: Dict[str, bytes],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ):
+        async def _write(file_path: str):
+            await self.write_file(file_path, files[file_path])
+
+        await run_bulk(_write, files.keys(), concurrency, "write_files")
+
+    async def remove_files(
+        self,
+        file_paths: Iterable[str],
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ):
+        await run_bulk(self.remove_file, file_paths, concurrency, "remove_files")
+
+    async def remove_folder(
+        self, folder_path: str, concurrency: int = DEFAULT_BULK_CONCURRENCY
+    ):
+        await self.remove_file(folder_path)
+
+    async def write_stream(self, file_path: str, chunks: AsyncIterable[bytes]):
+        """Writes a file from a stream of chunks. Stores that can not write
+        incrementally collect the chunks and write them at once."""
+        await self.write_file(file_path, b"".join([chunk async for chunk in chunks]))
+
+    async def md5_hash(self, file_path: str) -> Optional[str]:
+        """Base64 encoded md5 digest of the stored file, in the encoding of the
+        md5Hash of GCS objects, or None if the store does not provide one."""
+        return None
+
 
 class LocalStorage(Storage):
     def __init__(self, base_dir: str):
@@ -68,8 +232,34 @@ class LocalStorage(Storage):
 
         await self._make_dir_for_file(file_path)
 
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(file_content)
+        # write to a unique temporary file and rename it into place, so that
+        # concurrent writers never interleave and readers never see a
+        # partially written file
+        temp_file_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(temp_file_path, "wb") as f:
+                await f.write(file_content)
+            await aiofiles_os.replace(temp_file_path, file_path)
+        except BaseException:
+            if await aiofiles_os.path.exists(temp_file_path):
+                await aiofiles_os.remove(temp_file_path)
+            raise
+
+    async def write_stream(self, file_suffix: str, chunks: AsyncIterable[bytes]):
+        file_path = self.path(file_suffix)
+
+        await self._make_dir_for_file(file_path)
+
+        temp_file_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(temp_file_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            await aiofiles_os.replace(temp_file_path, file_path)
+        except BaseException:
+            if await aiofiles_os.path.exists(temp_file_path):
+                await aiofiles_os.remove(temp_file_path)
+            raise
 
     async def read_file(self, file_suffix: str) -> bytes:
         async with aiofiles.open(self.path(file_suffix), "rb") as f:
@@ -104,6 +294,17 @@ class LocalStorage(Storage):
         folder_path = self.path(folder_suffix)
         return LocalStorage(folder_path)
 
+    async def remove_file(self, file_path: str):
+        path = self.path(file_path)
+        if await aiofiles_os.path.isdir(path):
+            await asyncio.to_thread(shutil.rmtree, path)
+        elif await aiofiles_os.path.exists(path):
+            await aiofiles_os.remove(path)
+
+    async def md5_hash(self, file_path: str) -> Optional[str]:
+        content = await self.read_file(file_path)
+        return base64.b64encode(hashlib.md5(content).digest()).decode("ascii")
+
     async def shutdown(self):
         pass
 
@@ -112,16 +313,27 @@ class NullStorage(Storage):
     async def write_file(self, file_path: str, file_content: bytes):
         pass
 
+    async def write_stream(self, file_path: str, chunks: AsyncIterable[bytes]):
+        async for _ in chunks:
+            pass
+
     async def read_file(self, file_path: str) -> bytes:
         return b""
 
     def path(self, path_suffix: str):
         return path_suffix
 
-    def list_files(
+    async def list_files(
+        self, folder_path: str, start_offset: str = "", end_offset: str = ""
+    ):
+        for file in ():
+            yield file
+
+    async def list_subfolders(
         self, folder_path: str, start_offset: str = "", end_offset: str = ""
     ):
-        yield from ()
+        for folder in ():
+            yield folder
 
     async def make_public(self, file_path: str) -> str:
         return file_path
@@ -134,3 +346,9 @@ class NullStorage(Storage):
 
     async def file_exists(self, file_name: str) -> bool:
         return False
+
+    def new_store(self, folder_suffix: str) -> "NullStorage":
+        return NullStorage()
+
+    async def remove_file(self, file_path: str):
+        pass
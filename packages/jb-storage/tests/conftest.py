@@ -0,0 +1,20 @@
+import inspect
+import tempfile
+import pytest
+import pytest_asyncio
+
+from jugalbandi.storage import LocalStorage
+
+
+@pytest_asyncio.fixture()
+async def local_store():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = LocalStorage(temp_dir)
+        yield store
+        await store.shutdown()
+
+
+def pytest_collection_modifyitems(config, items):
+    for item in items:
+        if inspect.iscoroutinefunction(item.function):
+            item.add_marker(pytest.mark.asyncio)
@@ -0,0 +1,53 @@
+import os
+import time
+from jugalbandi.storage import LocalStorage, LocalStorageJanitor
+
+
+async def _make_entry(store: LocalStorage, name: str, size: int, age: float):
+    await store.write_file(f"{name}/langchain/index.faiss", bytes(size))
+    accessed = time.time() - age
+    os.utime(store.path(name), (accessed, accessed))
+
+
+async def test_evicts_least_recently_used(local_store: LocalStorage):
+    await _make_entry(local_store, "old", 1000, 3000)
+    await _make_entry(local_store, "older", 1000, 4000)
+    await _make_entry(local_store, "recent", 1000, 2000)
+    janitor = LocalStorageJanitor([local_store.base_dir], max_bytes=2000, min_idle=60)
+
+    stats = await janitor.collect()
+
+    assert not os.path.exists(local_store.path("older"))
+    assert os.path.exists(local_store.path("old"))
+    assert os.path.exists(local_store.path("recent"))
+    assert stats.total_bytes == 2000
+    assert stats.evicted_entries == 1
+
+
+async def test_never_evicts_directories_in_use(local_store: LocalStorage):
+    await _make_entry(local_store, "busy", 1000, 4000)
+    await _make_entry(local_store, "idle", 1000, 3000)
+    janitor = LocalStorageJanitor(
+        [local_store.base_dir], max_bytes=0, max_age=1000, min_idle=60
+    )
+
+    with janitor.in_use(local_store.path("busy")):
+        stats = await janitor.collect()
+
+    assert os.path.exists(local_store.path("busy"))
+    assert not os.path.exists(local_store.path("idle"))
+    assert stats.entries == 1
+
+
+async def test_forgets_directories_removed_by_others(local_store: LocalStorage):
+    await _make_entry(local_store, "gone", 1000, 0)
+    janitor = LocalStorageJanitor([local_store.base_dir], max_bytes=2000)
+    janitor.touch(local_store.path("gone"))
+    janitor.touch(local_store.path("never-created"))
+    await local_store.remove_folder("gone")
+
+    with janitor.in_use(local_store.path("pending")):
+        await janitor.collect()
+        assert list(janitor._last_access) == [
+            os.path.abspath(local_store.path("pending"))
+        ]
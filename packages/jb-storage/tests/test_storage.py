@@ -0,0 +1,217 @@
+import asyncio
+from typing import Dict, List, Tuple
+import aiohttp
+import pytest
+from jugalbandi.storage import (
+    GoogleStorage,
+    LocalStorage,
+    NullStorage,
+    StorageBulkOperationError,
+    tee_write,
+)
+from jugalbandi.storage import google_storage
+from jugalbandi.storage.google_storage import (
+    _batch_delete_body,
+    _batch_response_statuses,
+    _upload_chunk,
+)
+
+
+async def test_write_and_read_files(local_store: LocalStorage):
+    files = {f"folder/file_{i}.txt": bytes(f"content {i}", "utf-8") for i in range(5)}
+    await local_store.write_files(files, concurrency=2)
+
+    contents = await local_store.read_files(files.keys(), concurrency=2)
+
+    assert contents == files
+
+
+async def test_read_files_partial_failure(local_store: LocalStorage):
+    await local_store.write_file("folder/present.txt", b"present")
+
+    with pytest.raises(StorageBulkOperationError) as exc_info:
+        await local_store.read_files(["folder/present.txt", "folder/missing.txt"])
+
+    assert exc_info.value.succeeded == {"folder/present.txt": b"present"}
+    assert list(exc_info.value.failed.keys()) == ["folder/missing.txt"]
+    assert exc_info.value.subgroup(FileNotFoundError) is not None
+
+
+async def test_remove_folder(local_store: LocalStorage):
+    await local_store.write_files({"folder/a.txt": b"a", "folder/sub/b.txt": b"b"})
+    await local_store.write_file("other/c.txt", b"c")
+
+    await local_store.remove_folder("folder")
+
+    assert not await local_store.file_exists("folder/a.txt")
+    assert not await local_store.file_exists("folder/sub/b.txt")
+    assert await local_store.file_exists("other/c.txt")
+
+
+def test_batch_delete_round_trip():
+    body = _batch_delete_body("bucket", ["a/b.txt", "c d.txt"], "batch_x")
+    assert b"DELETE /storage/v1/b/bucket/o/a%2Fb.txt HTTP/1.1" in body
+    assert b"DELETE /storage/v1/b/bucket/o/c%20d.txt HTTP/1.1" in body
+
+    response = (
+        "--batch_y\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-ID: <response-0>\r\n\r\n"
+        "HTTP/1.1 204 No Content\r\n\r\n"
+        "--batch_y\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-ID: <response-1>\r\n\r\n"
+        "HTTP/1.1 403 Forbidden\r\n\r\n"
+        "--batch_y--\r\n"
+    )
+    statuses = _batch_response_statuses("multipart/mixed; boundary=batch_y", response)
+    assert statuses == {0: 204, 1: 403}
+
+
+async def test_concurrent_writes_are_atomic(local_store: LocalStorage):
+    contents = [bytes(str(i), "utf-8") * 100_000 for i in range(5)]
+    await asyncio.gather(
+        *(local_store.write_file("folder/index.faiss", c) for c in contents)
+    )
+
+    assert await local_store.read_file("folder/index.faiss") in contents
+    assert [f async for f in local_store.list_files("folder")] == ["index.faiss"]
+
+
+async def test_tee_write(local_store: LocalStorage):
+    chunks = [bytes([i]) * 1000 for i in range(20)]
+
+    async def _chunks():
+        for chunk in chunks:
+            yield chunk
+
+    other_store = local_store.new_store("other")
+    await tee_write(
+        _chunks(),
+        [
+            (local_store, "folder/file.bin"),
+            (other_store, "folder/file.bin"),
+            (NullStorage(), "folder/file.bin"),
+        ],
+        max_buffered_chunks=1,
+    )
+
+    assert await local_store.read_file("folder/file.bin") == b"".join(chunks)
+    assert await other_store.read_file("folder/file.bin") == b"".join(chunks)
+
+
+class FakeUploadResponse:
+    def __init__(self, status: int, headers: Dict[str, str]):
+        self.status = status
+        self.headers = headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeUploadSession:
+    """Stores at most max_persist bytes per request, like GCS may do."""
+
+    def __init__(self, max_persist: int, fail_first: bool = False):
+        self.max_persist = max_persist
+        self.fail_first = fail_first
+        self.persisted = bytearray()
+        self.requests: List[Tuple[str, int]] = []
+
+    def _response(self) -> FakeUploadResponse:
+        headers = (
+            {"Range": f"bytes=0-{len(self.persisted) - 1}"} if self.persisted else {}
+        )
+        return FakeUploadResponse(308, headers)
+
+    def put(self, url: str, data: bytes, headers: Dict[str, str], **kwargs):
+        content_range = headers["Content-Range"]
+        self.requests.append((content_range, len(data)))
+        if content_range.startswith("bytes */"):
+            return self._response()
+        start = int(content_range.split(" ")[1].split("-")[0])
+        assert start == len(self.persisted)
+        self.persisted += data[: self.max_persist]
+        if self.fail_first:
+            # the bytes were stored, but the reply is lost
+            self.fail_first = False
+            raise aiohttp.ClientConnectionError("connection reset")
+        return self._response()
+
+
+async def _upload(session: FakeUploadSession, chunk: bytes) -> int:
+    return await _upload_chunk(
+        session, "upload", chunk, 0, None  # type: ignore[arg-type]
+    )
+
+
+async def test_upload_chunk_resends_bytes_not_persisted():
+    session = FakeUploadSession(max_persist=3)
+    assert await _upload(session, b"abcdefgh") == 8
+    assert session.persisted == b"abcdefgh"
+    assert session.requests == [
+        ("bytes 0-7/*", 8),
+        ("bytes 3-7/*", 5),
+        ("bytes 6-7/*", 2),
+    ]
+
+
+async def test_upload_chunk_asks_for_persisted_size_after_error():
+    session = FakeUploadSession(max_persist=5, fail_first=True)
+    assert await _upload(session, b"abcdefgh") == 8
+    assert session.persisted == b"abcdefgh"
+    assert session.requests == [
+        ("bytes 0-7/*", 8),
+        ("bytes */*", 0),
+        ("bytes 5-7/*", 3),
+    ]
+
+
+async def test_read_files_failure_does_not_break_shared_downloads(monkeypatch):
+    store = GoogleStorage("bucket", "base")
+    started = asyncio.Event()
+
+    async def _download(client, file_path: str) -> bytes:
+        started.set()
+        await asyncio.sleep(0.05)
+        if client.session.session.closed:
+            raise RuntimeError("Session is closed")
+        return file_path.encode()
+
+    monkeypatch.setattr(store, "_download", _download)
+    bulk_read = asyncio.ensure_future(store.read_files(["a.txt", "b.txt"]))
+    await started.wait()
+    shared_read = asyncio.ensure_future(store.read_file("a.txt"))
+    await asyncio.sleep(0)
+    bulk_read.cancel()
+
+    assert await shared_read == b"a.txt"
+    with pytest.raises(asyncio.CancelledError):
+        await bulk_read
+    await store.shutdown()
+
+
+async def test_google_file_exists_uses_async_client(monkeypatch):
+    async def _download_metadata(self, bucket: str, object_name: str, **kwargs):
+        if object_name == "base/missing.mp3":
+            raise aiohttp.ClientResponseError(None, (), status=404)  # type: ignore
+        return {"name": object_name}
+
+    def _sync_client(*args, **kwargs):
+        raise AssertionError("the synchronous client blocks the event loop")
+
+    monkeypatch.setattr(
+        google_storage.GoogleAioStorage, "download_metadata", _download_metadata
+    )
+    monkeypatch.setattr(google_storage.storage, "Client", _sync_client)
+    store = GoogleStorage("bucket", "base")
+
+    assert await store.file_exists("present.mp3")
+    assert not await store.file_exists("missing.mp3")
+    await store.shutdown()
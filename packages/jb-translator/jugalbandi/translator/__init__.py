@@ -1,15 +1,39 @@
 from .translator import (
     Translator,
+    BatchTranslator,
     DhruvaTranslator,
     GoogleTranslator,
     AzureTranslator,
     CompositeTranslator,
+    CachingTranslator,
+    LongTextTranslator,
+)
+from .routing import TranslatorRouter
+from .transliterator import (
+    Transliterator,
+    AzureTransliterator,
+    CachingTransliterator,
+)
+from .translation_cache import (
+    TranslationCache,
+    TranslationStore,
+    SqliteTranslationStore,
 )
 
 __all__ = [
     "Translator",
+    "BatchTranslator",
     "DhruvaTranslator",
     "GoogleTranslator",
     "AzureTranslator",
     "CompositeTranslator",
+    "CachingTranslator",
+    "LongTextTranslator",
+    "TranslatorRouter",
+    "Transliterator",
+    "AzureTransliterator",
+    "CachingTransliterator",
+    "TranslationCache",
+    "TranslationStore",
+    "SqliteTranslationStore",
 ]
@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+from functools import partial
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+from jugalbandi.core.routing import ProviderRouter, ProviderStats
+
+T = TypeVar("T")
+
+MIN_HEDGE_DELAY = 0.05
+MAX_HEDGE_DELAY = 10
+
+
+class RoutingStats(ProviderStats):
+    def __init__(self):
+        super().__init__()
+        self.hedges = 0
+        self.hedge_wins = 0
+
+
+class TranslatorRouter(ProviderRouter[RoutingStats]):
+    """Orders translation providers by their measured latency and error rate
+    per language pair, and keeps failing providers out of rotation with
+    circuit breakers.
+
+    With hedging enabled, when the best provider has not answered after its
+    95th percentile latency, the same request is also sent to the next best
+    provider and the first successful answer is used.
+
+    A router is meant to be shared by all requests of an application.
+    """
+
+    def __init__(self, hedging: bool = False):
+        super().__init__(RoutingStats)
+        self.hedging = hedging
+
+    def _hedge_delay(
+        self, provider: str, source: str, destination: str
+    ) -> Optional[float]:
+        if not self.hedging:
+            return None
+        p95 = self._health(provider, source, destination).p95()
+        if p95 is None:
+            return None
+        return min(max(p95, MIN_HEDGE_DELAY), MAX_HEDGE_DELAY)
+
+    async def race(
+        self,
+        primary: str,
+        hedge: Optional[str],
+        source: str,
+        destination: str,
+        call: Callable[[str], Awaitable[T]],
+    ) -> Tuple[Optional[str], Optional[T], List[Tuple[str, Exception]]]:
+        """Calls the primary provider, and the hedge provider too if the
+        primary is slow.
+
+        Returns the provider that answered first and its result, or None if
+        all providers called failed, together with the failures.
+        """
+        self._stats(primary).routed += 1
+        primary_task = asyncio.ensure_future(
+            self._call(primary, (source, destination), partial(call, primary))
+        )
+        tasks = {primary_task: primary}
+        delay = self._hedge_delay(primary, source, destination) if hedge else None
+        failures: List[Tuple[str, Exception]] = []
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    assert hedge is not None
+                    delay = None
+                    self._stats(hedge).hedges += 1
+                    task = asyncio.ensure_future(
+                        self._call(hedge, (source, destination), partial(call, hedge))
+                    )
+                    tasks[task] = hedge
+                    continue
+                for task in done:
+                    provider = tasks.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        if provider != primary:
+                            self._stats(provider).hedge_wins += 1
+                        return provider, task.result(), failures
+                    if not isinstance(exc, Exception):
+                        raise exc
+                    failures.append((provider, exc))
+            # a primary failing before the hedge delay leaves the hedge
+            # provider to the caller, to be tried next in order
+            return None, None, failures
+        finally:
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
@@ -0,0 +1,97 @@
+import re
+from typing import List, Tuple
+from jugalbandi.core import Language
+
+# sentence terminators of the scripts of supported languages: latin, the
+# devanagari and bengali danda, the urdu full stop and question mark, and
+# the CJK full width terminators, which are not followed by a space
+SENTENCE_TERMINATORS = ".!?।॥۔؟"
+CJK_SENTENCE_TERMINATORS = "。！？"
+CLOSING_PUNCTUATION = "\"')]”’"
+
+_BOUNDARY = re.compile(
+    rf"(?P<end>[{SENTENCE_TERMINATORS}]+[{re.escape(CLOSING_PUNCTUATION)}]*)(?P<space>\s+)"
+    rf"|(?P<cjk>[{CJK_SENTENCE_TERMINATORS}]+)(?P<cjk_space>\s*)"
+    r"|(?P<newline>[^\S\n]*\n\s*)"
+)
+_LAST_WORD = re.compile(r"(\S+)$")
+
+# abbreviations common in legal and government text, a full stop after them
+# does not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "sr", "jr", "st", "no", "nos", "sec", "secs", "art",
+    "cl", "para", "ch", "vol", "pp", "vs", "v", "viz", "etc", "e.g", "i.e", "govt",
+    "dept", "hon'ble", "ltd", "co", "inc", "rs",
+}
+# languages whose abbreviations end in a full stop
+LATIN_SCRIPT_LANGUAGES = {Language.EN}
+
+Segment = Tuple[str, str]
+
+
+def _is_abbreviation(text: str) -> bool:
+    match = _LAST_WORD.search(text)
+    if match is None:
+        return False
+    word = match.group(1).lstrip("(\"'").lower()
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def _split_long(segment: str, max_chars: int) -> List[Segment]:
+    """Splits a segment longer than max_chars at the last space that keeps
+    the parts within max_chars."""
+    parts: List[Segment] = []
+    while len(segment) > max_chars:
+        cut = segment.rfind(" ", 0, max_chars + 1)
+        while cut > 0 and segment[cut - 1] == " ":
+            cut -= 1
+        if cut <= 0:
+            cut = max_chars
+        rest = segment[cut:].lstrip(" ")
+        parts.append((segment[:cut], segment[cut:len(segment) - len(rest)]))
+        segment = rest
+    parts.append((segment, ""))
+    return parts
+
+
+def split_segments(text: str, language: Language, max_chars: int) -> List[Segment]:
+    """Splits text into sentences, as pairs of a sentence and the whitespace
+    that follows it, so that joining all pairs gives back the text.
+
+    Paragraph and line breaks always end a sentence, sentences longer than
+    max_chars are split further.
+    """
+    segments: List[Segment] = []
+    start = 0
+    leading = len(text) - len(text.lstrip())
+    if leading:
+        segments.append(("", text[:leading]))
+        start = leading
+
+    sentence_start = start
+    for match in _BOUNDARY.finditer(text, start):
+        if match.group("end") is not None:
+            end, space = match.end("end"), match.group("space")
+            if (
+                language in LATIN_SCRIPT_LANGUAGES
+                and match.group("end") == "."
+                and "\n" not in space
+                and _is_abbreviation(text[sentence_start:match.start()])
+            ):
+                continue
+        elif match.group("cjk") is not None:
+            end, space = match.end("cjk"), match.group("cjk_space")
+        else:
+            end, space = match.start(), match.group("newline")
+        sentence = text[sentence_start:end]
+        if sentence:
+            *parts, (last, _) = _split_long(sentence, max_chars)
+            segments.extend(parts)
+            segments.append((last, space))
+        elif segments:
+            segments[-1] = (segments[-1][0], segments[-1][1] + space)
+        sentence_start = match.end()
+
+    if sentence_start < len(text):
+        segments.extend(_split_long(text[sentence_start:], max_chars))
+    return segments
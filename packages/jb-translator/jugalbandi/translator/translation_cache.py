@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from cachetools import LRUCache
+from jugalbandi.core import Language
+from jugalbandi.core.caching import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSLATION_CACHE_SIZE = 10_000
+# older SQLite versions allow at most 999 parameters per statement
+SQLITE_MAX_VARIABLES = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def translation_key(
+    text: str,
+    source_language: Language,
+    destination_language: Language,
+    provider: str,
+) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return (
+        f"{provider}:{source_language.name.lower()}:"
+        f"{destination_language.name.lower()}:{digest}"
+    )
+
+
+class TranslationStore(ABC):
+    @abstractmethod
+    async def get(self, keys: List[str]) -> Dict[str, str]:
+        pass
+
+    @abstractmethod
+    async def set(self, translations: Dict[str, str]):
+        pass
+
+
+class SqliteTranslationStore(TranslationStore):
+    """Persists translations in a table of a SQLite database file, which can
+    be shared by the workers of a server."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    key TEXT PRIMARY KEY,
+                    translation TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _get(self, keys: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            connection = self._connect()
+            for i in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[i:i + SQLITE_MAX_VARIABLES]
+                rows = connection.execute(
+                    "SELECT key, translation FROM translations WHERE key IN "
+                    f"({', '.join('?' for _ in chunk)})",
+                    chunk,
+                )
+                found.update(rows.fetchall())
+        return found
+
+    def _set(self, translations: Dict[str, str]):
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)",
+                translations.items(),
+            )
+            connection.commit()
+
+    async def get(self, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        return await asyncio.to_thread(self._get, keys)
+
+    async def set(self, translations: Dict[str, str]):
+        if translations:
+            await asyncio.to_thread(self._set, translations)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class TranslationCache:
+    """Translations keyed by provider, language pair and normalized text.
+
+    Recently used translations are kept in memory, all translations are
+    written through to the store when one is given.
+    """
+
+    def __init__(
+        self,
+        store: Optional[TranslationStore] = None,
+        maxsize: int = DEFAULT_TRANSLATION_CACHE_SIZE,
+    ):
+        self.store = store
+        self._memory: LRUCache = LRUCache(maxsize=maxsize)
+        self._lookups = SingleFlight()
+
+    async def get(
+        self,
+        text: str,
+        source_language: Language,
+        destination_language: Language,
+        providers: List[str],
+    ) -> Optional[str]:
+        """Returns the cached translation of the first provider in providers
+        that has one."""
+        translations = await self.get_batch(
+            [text], source_language, destination_language, providers
+        )
+        return translations[0]
+
+    async def get_batch(
+        self,
+        texts: List[str],
+        source_language: Language,
+        destination_language: Language,
+        providers: List[str],
+    ) -> List[Optional[str]]:
+        keys = [
+            [
+                translation_key(text, source_language, destination_language, provider)
+                for provider in providers
+            ]
+            for text in texts
+        ]
+        translations: List[Optional[str]] = [
+            next((self._memory[key] for key in text_keys if key in self._memory), None)
+            for text_keys in keys
+        ]
+        store = self.store
+        missing = [
+            key
+            for text_keys, translation in zip(keys, translations)
+            if translation is None
+            for key in text_keys
+        ]
+        if store is None or not missing:
+            return translations
+
+        try:
+            found = await self._lookups.do(tuple(missing), lambda: store.get(missing))
+        except Exception:
+            # the store only saves provider calls, translate without it
+            logger.exception("translation store lookup failed")
+            return translations
+        for i, text_keys in enumerate(keys):
+            if translations[i] is not None:
+                continue
+            for key in text_keys:
+                if key in found:
+                    self._memory[key] = translations[i] = found[key]
+                    break
+        return translations
+
+    async def set(
+        self,
+        text: str,
+        source_language: Language,
+        destination_language: Language,
+        provider: str,
+        translation: str,
+    ):
+        await self.set_batch(
+            [text], source_language, destination_language, provider, [translation]
+        )
+
+    async def set_batch(
+        self,
+        texts: List[str],
+        source_language: Language,
+        destination_language: Language,
+        provider: str,
+        translations: List[str],
+    ):
+        entries = {}
+        for text, translation in zip(texts, translations):
+            key = translation_key(text, source_language, destination_language, provider)
+            entries[key] = translation
+        self._memory.update(entries)
+        if self.store is not None:
+            try:
+                await self.store.set(entries)
+            except Exception:
+                logger.exception("translation store write failed")
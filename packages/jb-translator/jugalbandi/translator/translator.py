@@ -1,3 +1,4 @@
+import asyncio
 import httpx
 import os
 from abc import ABC, abstractmethod
@@ -5,10 +6,51 @@ from google.cloud.translate import TranslationServiceAsyncClient
 from jugalbandi.core import (
     Language,
     InternalServerException,
+    HttpClients,
+)
+from jugalbandi.core.bhashini import (
+    BhashiniPipelineConfig,
+    BhashiniPipelineConfigCache,
 )
 import json
 import uuid
-import aiohttp
+from typing import Dict, Iterator, List, Optional
+from .routing import TranslatorRouter
+from .segmentation import split_segments
+from .translation_cache import TranslationCache
+
+DEFAULT_BATCH_CONCURRENCY = 4
+# per request limits of the provider APIs, Bhashini does not document one
+DHRUVA_MAX_BATCH_TEXTS = 25
+DHRUVA_MAX_BATCH_CHARS = 10_000
+AZURE_MAX_BATCH_TEXTS = 100
+AZURE_MAX_BATCH_CHARS = 50_000
+AZURE_MAX_TRANSLITERATION_TEXTS = 10
+AZURE_MAX_TRANSLITERATION_CHARS = 5_000
+GOOGLE_MAX_BATCH_TEXTS = 1024
+GOOGLE_MAX_BATCH_CHARS = 30_000
+# texts from this length on are translated sentence by sentence
+LONG_TEXT_MIN_CHARS = 500
+LONG_TEXT_MAX_SEGMENT_CHARS = 1000
+LONG_TEXT_MAX_REQUEST_CHARS = 2000
+LONG_TEXT_MAX_REQUEST_SEGMENTS = 20
+
+
+def split_batch(
+    texts: List[str], max_texts: int, max_chars: int
+) -> Iterator[List[str]]:
+    """Splits texts into consecutive batches within the limits of a provider,
+    a text longer than max_chars makes a batch of its own."""
+    batch: List[str] = []
+    chars = 0
+    for text in texts:
+        if batch and (len(batch) == max_texts or chars + len(text) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(text)
+        chars += len(text)
+    if batch:
+        yield batch
 
 
 class Translator(ABC):
@@ -18,125 +60,129 @@ class Translator(ABC):
     ) -> str:
         pass
 
+    async def translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        """Translates texts, returning the translations in the same order.
+
+        Translates the texts one by one, translators whose API accepts
+        several texts per request override this.
+        """
+        semaphore = asyncio.Semaphore(DEFAULT_BATCH_CONCURRENCY)
+
+        async def _translate(text: str) -> str:
+            async with semaphore:
+                return await self.translate_text(
+                    text, source_language, destination_language
+                )
+
+        return list(await asyncio.gather(*(_translate(text) for text in texts)))
+
+
+class BatchTranslator(Translator):
+    """A translator whose API translates several texts per request, batches
+    are split to stay within max_batch_texts and max_batch_chars."""
+
+    max_batch_texts: int
+    max_batch_chars: int
+
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        translations = await self.translate_batch(
+            [text], source_language, destination_language
+        )
+        return translations[0]
+
+    async def translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        batches = split_batch(texts, self.max_batch_texts, self.max_batch_chars)
+        semaphore = asyncio.Semaphore(DEFAULT_BATCH_CONCURRENCY)
+
+        async def _translate(batch: List[str]) -> List[str]:
+            async with semaphore:
+                return await self._translate_batch(
+                    batch, source_language, destination_language
+                )
+
+        translations = await asyncio.gather(*(_translate(batch) for batch in batches))
+        return [translation for batch in translations for translation in batch]
+
+    @abstractmethod
+    async def _translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        pass
+
+
+class DhruvaTranslator(BatchTranslator):
+    max_batch_texts = DHRUVA_MAX_BATCH_TEXTS
+    max_batch_chars = DHRUVA_MAX_BATCH_CHARS
 
-class DhruvaTranslator(Translator):
     def __init__(self):
-        self.bhashini_user_id = os.getenv('BHASHINI_USER_ID')
-        self.bhashini_api_key = os.getenv('BHASHINI_API_KEY')
-        self.bhashini_pipleline_id = os.getenv('BHASHINI_PIPELINE_ID')
+        self.bhashini_configs = BhashiniPipelineConfigCache()
         self.bhashini_inference_url = "https://dhruva-api.bhashini.gov.in/services/inference/pipeline"
 
-    async def perform_bhashini_config_call(self,
-                                           task: str,
-                                           source_language: str,
-                                           target_language: str | None = None):
-        url = "https://meity-auth.ulcacontrib.org/ulca/apis/v0/model/getModelsPipeline"
-        if task in ['asr', 'tts']:
-            payload = json.dumps({
-                "pipelineTasks": [
-                    {
-                        "taskType": task,
-                        "config": {
-                            "language": {
-                                "sourceLanguage": source_language
-                            }
-                        }
-                    }
-                ],
-                "pipelineRequestConfig": {
-                    "pipelineId": "64392f96daac500b55c543cd"
-                }
-            })
-        else:
+    async def _translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        source = source_language.name.lower()
+        destination = destination_language.name.lower()
+
+        async def _request(config: BhashiniPipelineConfig) -> httpx.Response:
             payload = json.dumps({
                 "pipelineTasks": [
                     {
                         "taskType": "translation",
                         "config": {
                             "language": {
-                                "sourceLanguage": source_language,
-                                "targetLanguage": target_language
-                            }
+                                "sourceLanguage": config.source_language,
+                                "targetLanguage": config.target_language
+                            },
+                            "serviceId": config.service_id
                         }
                     }
                 ],
-                "pipelineRequestConfig": {
-                    "pipelineId": self.bhashini_pipleline_id
+                "inputData": {
+                    "input": [{"source": text} for text in texts]
                 }
             })
-        headers = {
-            'userID': self.bhashini_user_id,
-            'ulcaApiKey': self.bhashini_api_key,
-            'Content-Type': 'application/json'
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, data=payload)  # type: ignore
-
-        return response.json()
-
-    async def translate_text(
-        self, text: str, source_language: Language, destination_language: Language
-    ) -> str:
-        source = source_language.name.lower()
-        destination = destination_language.name.lower()
-
-        bhashini_translation_config = await self.perform_bhashini_config_call(
-            task='translation', source_language=source, target_language=destination)
-
-        payload = json.dumps({
-            "pipelineTasks": [
-                {
-                    "taskType": "translation",
-                    "config": {
-                        "language": {
-                            "sourceLanguage": bhashini_translation_config['languages'][0]['sourceLanguage'],
-                            "targetLanguage": bhashini_translation_config['languages'][0]['targetLanguageList'][
-                                0]
-                        },
-                        "serviceId": bhashini_translation_config['pipelineResponseConfig'][0]['config'][0][
-                            'serviceId']
-                    }
-                }
-            ],
-            "inputData": {
-                "input": [
-                    {
-                        "source": text
-                    }
-                ]
+            headers = {
+                'Accept': '*/*',
+                'User-Agent': 'Thunder Client (https://www.thunderclient.com)',
+                **config.inference_headers(),
+                'Content-Type': 'application/json'
             }
-        })
-        headers = {
-            'Accept': '*/*',
-            'User-Agent': 'Thunder Client (https://www.thunderclient.com)',
-            bhashini_translation_config['pipelineInferenceAPIEndPoint']['inferenceApiKey']['name']:
-                bhashini_translation_config['pipelineInferenceAPIEndPoint']['inferenceApiKey']['value'],
-            'Content-Type': 'application/json'
-        }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url=self.bhashini_inference_url,
-                                         headers=headers,
-                                         data=payload)  # type: ignore
+            client = HttpClients().httpx_client("bhashini")
+            return await client.post(url=self.bhashini_inference_url,
+                                     headers=headers,
+                                     data=payload)  # type: ignore
+
+        response = await self.bhashini_configs.infer(
+            'translation', source, destination, _request)
         if response.status_code != 200:
             raise InternalServerException(
                 f"Request failed with response.text: {response.text} and "
                   f"status_code: {response.status_code}")
 
-        indicText = response.json()['pipelineResponse'][0]['output'][0]['target']
-        return indicText
+        outputs = response.json()['pipelineResponse'][0]['output']
+        return [output['target'] for output in outputs]
+
 
+class AzureTranslator(BatchTranslator):
+    max_batch_texts = AZURE_MAX_BATCH_TEXTS
+    max_batch_chars = AZURE_MAX_BATCH_CHARS
 
-class AzureTranslator(Translator):
     def __init__(self):
         self.subscription_key = os.getenv('AZURE_TRANSLATION_KEY')
         self.resource_location = os.getenv('AZURE_TRANSLATION_RESOURCE_LOCATION')
         self.endpoint = "https://api.cognitive.microsofttranslator.com"
 
-    async def translate_text(
-            self, text: str, source_language: Language, destination_language: Language
-    ) -> str:
+    async def _translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
         path = '/translate'
         constructed_url = self.endpoint + path
 
@@ -161,14 +207,24 @@ class AzureTranslator(Translator):
             'Content-type': 'application/json',
             'X-ClientTraceId': str(uuid.uuid4())
         }
-        body = [{'text': text}]
+        body = [{'text': text} for text in texts]
 
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.post(constructed_url, params=params, headers=headers, json=body) as response:
-                response = await response.json()
-                return response[0]['translations'][0]['text']
+        session = HttpClients().aiohttp_session("azure-translator", ssl=False)
+        async with session.post(constructed_url, params=params, headers=headers, json=body) as response:
+            response = await response.json()
+            return [item['translations'][0]['text'] for item in response]
 
     async def transliterate_text(self, text: str, source_language: Language, from_script: str, to_script: str) -> str:
+        transliterations = await self.transliterate_batch(
+            [text], source_language, from_script, to_script
+        )
+        return transliterations[0]
+
+    async def transliterate_batch(
+        self, texts: List[str], source_language: Language, from_script: str, to_script: str
+    ) -> List[str]:
+        """Transliterates texts in a single request, callers keep within
+        AZURE_MAX_TRANSLITERATION_TEXTS and AZURE_MAX_TRANSLITERATION_CHARS."""
         path = '/transliterate'
         constructed_url = self.endpoint + path
 
@@ -184,20 +240,22 @@ class AzureTranslator(Translator):
             'Content-type': 'application/json',
             'X-ClientTraceId': str(uuid.uuid4())
         }
-        body = [{'text': text}]
+        body = [{'text': text} for text in texts]
 
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.post(constructed_url, params=params, headers=headers, json=body) as response:
-                response = await response.json()
-                print(response)
-                return response[0]['text']
+        session = HttpClients().aiohttp_session("azure-translator", ssl=False)
+        async with session.post(constructed_url, params=params, headers=headers, json=body) as response:
+            response = await response.json()
+            return [item['text'] for item in response]
 
 
-class GoogleTranslator(Translator):
-    async def translate_text(
-        self, text: str, source_language: Language, destination_language: Language
-    ) -> str:
-        client = TranslationServiceAsyncClient()
+class GoogleTranslator(BatchTranslator):
+    max_batch_texts = GOOGLE_MAX_BATCH_TEXTS
+    max_batch_chars = GOOGLE_MAX_BATCH_CHARS
+
+    async def _translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        client = HttpClients().client("google-translate", TranslationServiceAsyncClient)
         location = "global"
         # TODO: make the project_id versatile
         project_id = "indian-legal-bert"
@@ -205,33 +263,251 @@ class GoogleTranslator(Translator):
         response = await client.translate_text(
             request={
                 "parent": parent,
-                "contents": [text],
+                "contents": texts,
                 "mime_type": "text/plain",
                 "source_language_code": source_language.name.lower(),
                 "target_language_code": destination_language.name.lower(),
             }
         )
-        return response.translations[0].translated_text
+        return [translation.translated_text for translation in response.translations]
+
+
+def provider_name(translator: Translator) -> str:
+    return type(translator).__name__
+
+
+class CachingTranslator(Translator):
+    def __init__(self, translator: Translator, cache: TranslationCache):
+        self.translator = translator
+        self.cache = cache
+        self.provider = provider_name(translator)
+
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        translations = await self.translate_batch(
+            [text], source_language, destination_language
+        )
+        return translations[0]
+
+    async def translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        if source_language.value == destination_language.value:
+            return list(texts)
+
+        cached = await self.cache.get_batch(
+            texts, source_language, destination_language, [self.provider]
+        )
+        missing = [
+            i for i, text in enumerate(texts) if cached[i] is None and text.strip()
+        ]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            translations = await self.translator.translate_batch(
+                missing_texts, source_language, destination_language
+            )
+            await self.cache.set_batch(
+                missing_texts,
+                source_language,
+                destination_language,
+                self.provider,
+                translations,
+            )
+            for i, translation in zip(missing, translations):
+                cached[i] = translation
+        return [
+            translation if translation is not None else text
+            for text, translation in zip(texts, cached)
+        ]
 
 
 class CompositeTranslator(Translator):
-    def __init__(self, *translators: Translator):
+    def __init__(
+        self,
+        *translators: Translator,
+        cache: Optional[TranslationCache] = None,
+        router: Optional[TranslatorRouter] = None,
+    ):
         self.translators = translators
+        self.cache = cache
+        self.router = router
 
     async def translate_text(
         self, text: str, source_language: Language, destination_language: Language
     ) -> str:
+        translations = await self.translate_batch(
+            [text], source_language, destination_language
+        )
+        return translations[0]
+
+    async def translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        """Translates texts with the first translator that succeeds for each
+        text, a text that a translator fails on is tried with the next one.
+
+        Translators are tried in the given order, or in the order of the
+        router, which may also race the two best translators.
+        """
         if source_language.value == destination_language.value:
-            return text
+            return list(texts)
+
+        # translations cached for any of the providers are used before
+        # calling a provider, preferring providers in their usual order
+        results: List[Optional[str]] = [None] * len(texts)
+        if self.cache is not None:
+            results = await self.cache.get_batch(
+                texts,
+                source_language,
+                destination_language,
+                [provider_name(translator) for translator in self.translators],
+            )
+        for i, text in enumerate(texts):
+            if results[i] is None and not text.strip():
+                results[i] = text
 
-        excs = []
+        translators: Dict[str, Translator] = {}
         for translator in self.translators:
-            try:
-                print("INSIDE THIS translator", translator)
-                return await translator.translate_text(
-                    text, source_language, destination_language
+            name = provider_name(translator)
+            label, n = name, 1
+            while label in translators:
+                n += 1
+                label = f"{name}-{n}"
+            translators[label] = translator
+        source = source_language.name.lower()
+        destination = destination_language.name.lower()
+        remaining = list(translators)
+        if self.router is not None:
+            remaining = self.router.rank(remaining, source, destination)
+
+        excs: List[Exception] = []
+        while remaining:
+            pending = [i for i, result in enumerate(results) if result is None]
+            if not pending:
+                break
+            pending_texts = [texts[i] for i in pending]
+
+            async def _translate(provider: str) -> List[str]:
+                return await translators[provider].translate_batch(
+                    pending_texts, source_language, destination_language
+                )
+
+            primary = remaining.pop(0)
+            provider: Optional[str] = primary
+            translations: Optional[List[str]] = None
+            if self.router is None:
+                try:
+                    translations = await _translate(primary)
+                except Exception as exc:
+                    excs.append(exc)
+                    continue
+            else:
+                hedge = None
+                if remaining and self.router.available(
+                    remaining[0], source, destination
+                ):
+                    hedge = remaining[0]
+                provider, translations, failures = await self.router.race(
+                    primary, hedge, source, destination, _translate
+                )
+                excs.extend(exc for _, exc in failures)
+                tried = {failed for failed, _ in failures} | {provider}
+                remaining = [p for p in remaining if p not in tried]
+            if provider is None or translations is None:
+                continue
+
+            translated = [
+                (i, translation)
+                for i, translation in zip(pending, translations)
+                if translation
+            ]
+            for i, translation in translated:
+                results[i] = translation
+            if self.cache is not None:
+                await self.cache.set_batch(
+                    [texts[i] for i, _ in translated],
+                    source_language,
+                    destination_language,
+                    provider_name(translators[provider]),
+                    [translation for _, translation in translated],
+                )
+
+        if any(result is None for result in results):
+            if not excs:
+                excs.append(
+                    InternalServerException("no translation returned for some texts")
+                )
+            raise ExceptionGroup("CompositeTranslator translation failed", excs)
+        return [result for result in results if result is not None]
+
+
+class LongTextTranslator(Translator):
+    """Translates long texts, such as generated answers, sentence by sentence.
+
+    Sentences are grouped into requests of at most max_request_chars, at
+    most concurrency of which are in flight at a time, and each distinct
+    sentence is translated once. The translations are joined back in order
+    with the original whitespace. Shorter texts are passed on as they are.
+    """
+
+    def __init__(
+        self,
+        translator: Translator,
+        min_chars: int = LONG_TEXT_MIN_CHARS,
+        max_request_chars: int = LONG_TEXT_MAX_REQUEST_CHARS,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ):
+        self.translator = translator
+        self.min_chars = min_chars
+        self.max_request_chars = max_request_chars
+        self.concurrency = concurrency
+
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        if (
+            len(text) < self.min_chars
+            or source_language.value == destination_language.value
+        ):
+            return await self.translator.translate_text(
+                text, source_language, destination_language
+            )
+
+        segments = split_segments(
+            text,
+            source_language,
+            min(LONG_TEXT_MAX_SEGMENT_CHARS, self.max_request_chars),
+        )
+        sentences = list(
+            dict.fromkeys(sentence for sentence, _ in segments if sentence.strip())
+        )
+        requests = split_batch(
+            sentences, LONG_TEXT_MAX_REQUEST_SEGMENTS, self.max_request_chars
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _translate(request: List[str]) -> List[str]:
+            async with semaphore:
+                return await self.translator.translate_batch(
+                    request, source_language, destination_language
                 )
-            except Exception as exc:
-                excs.append(exc)
 
-        raise ExceptionGroup("CompositeTranslator translation failed", excs)
+        results = await asyncio.gather(*(_translate(request) for request in requests))
+        translations = dict(
+            zip(sentences, (translation for result in results for translation in result))
+        )
+        return "".join(
+            translations.get(sentence, sentence) + space for sentence, space in segments
+        )
+
+    async def translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        if all(len(text) < self.min_chars for text in texts):
+            return await self.translator.translate_batch(
+                texts, source_language, destination_language
+            )
+        return await super().translate_batch(
+            texts, source_language, destination_language
+        )
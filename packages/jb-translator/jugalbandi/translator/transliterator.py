@@ -0,0 +1,166 @@
+import asyncio
+import re
+import string
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from jugalbandi.core import Language
+from .translation_cache import TranslationCache
+from .translator import (
+    AZURE_MAX_TRANSLITERATION_CHARS,
+    AZURE_MAX_TRANSLITERATION_TEXTS,
+    DEFAULT_BATCH_CONCURRENCY,
+    AzureTranslator,
+    split_batch,
+)
+
+# runs of letters, including the vowel signs \w does not match
+_WORDS = re.compile(rf"([^\s\d{re.escape(string.punctuation)}]+)")
+
+# the most frequent words of romanized hindi, which are spelled consistently
+# enough to be transliterated without a provider
+HINDI_DEVANAGARI_WORDS: Dict[str, str] = {
+    "hai": "है",
+    "hain": "हैं",
+    "kya": "क्या",
+    "ka": "का",
+    "ki": "की",
+    "ke": "के",
+    "ko": "को",
+    "se": "से",
+    "mein": "में",
+    "aur": "और",
+    "nahi": "नहीं",
+    "nahin": "नहीं",
+    "ye": "ये",
+    "yeh": "यह",
+    "wo": "वो",
+    "woh": "वह",
+    "mera": "मेरा",
+    "meri": "मेरी",
+    "mere": "मेरे",
+    "mujhe": "मुझे",
+    "aap": "आप",
+    "hum": "हम",
+    "tum": "तुम",
+    "kaise": "कैसे",
+    "kab": "कब",
+    "kahan": "कहाँ",
+    "kyun": "क्यों",
+    "kaun": "कौन",
+    "bhi": "भी",
+    "tha": "था",
+    "thi": "थी",
+    "ho": "हो",
+    "kar": "कर",
+    "karna": "करना",
+    "liye": "लिए",
+    "par": "पर",
+    "sakta": "सकता",
+    "sakte": "सकते",
+    "chahiye": "चाहिए",
+    "toh": "तो",
+    "agar": "अगर",
+    "koi": "कोई",
+    "kuch": "कुछ",
+    "ab": "अब",
+    "jab": "जब",
+    "tak": "तक",
+    "ek": "एक",
+    "apna": "अपना",
+    "apni": "अपनी",
+}
+
+LOCAL_TRANSLITERATIONS: Dict[Tuple[Language, str, str], Dict[str, str]] = {
+    (Language.HI, "Latn", "Deva"): HINDI_DEVANAGARI_WORDS,
+}
+
+
+class Transliterator(ABC):
+    @abstractmethod
+    async def transliterate_batch(
+        self, texts: List[str], language: Language, from_script: str, to_script: str
+    ) -> List[str]:
+        pass
+
+    async def transliterate_text(
+        self, text: str, language: Language, from_script: str, to_script: str
+    ) -> str:
+        transliterations = await self.transliterate_batch(
+            [text], language, from_script, to_script
+        )
+        return transliterations[0]
+
+
+class AzureTransliterator(Transliterator):
+    def __init__(self, translator: Optional[AzureTranslator] = None):
+        self.translator = translator or AzureTranslator()
+
+    async def transliterate_batch(
+        self, texts: List[str], language: Language, from_script: str, to_script: str
+    ) -> List[str]:
+        batches = split_batch(
+            texts, AZURE_MAX_TRANSLITERATION_TEXTS, AZURE_MAX_TRANSLITERATION_CHARS
+        )
+        semaphore = asyncio.Semaphore(DEFAULT_BATCH_CONCURRENCY)
+
+        async def _transliterate(batch: List[str]) -> List[str]:
+            async with semaphore:
+                return await self.translator.transliterate_batch(
+                    batch, language, from_script, to_script
+                )
+
+        results = await asyncio.gather(*(_transliterate(batch) for batch in batches))
+        return [transliteration for result in results for transliteration in result]
+
+
+class CachingTransliterator(Transliterator):
+    """Transliterates word by word, since words of transliterated text repeat
+    a lot.
+
+    Common words are transliterated with a local table, other words are
+    looked up in the cache, and only words that were never seen before are
+    sent to the transliterator, in batches.
+    """
+
+    def __init__(self, transliterator: Transliterator, cache: TranslationCache):
+        self.transliterator = transliterator
+        self.cache = cache
+        self.provider = f"{type(transliterator).__name__}-transliteration"
+
+    async def transliterate_batch(
+        self, texts: List[str], language: Language, from_script: str, to_script: str
+    ) -> List[str]:
+        # texts alternate between separators and words, words are at odd indexes
+        parts = [_WORDS.split(text) for text in texts]
+        words = list(
+            dict.fromkeys(
+                part.lower() for text_parts in parts for part in text_parts[1::2]
+            )
+        )
+        local = LOCAL_TRANSLITERATIONS.get((language, from_script, to_script), {})
+        transliterations = {word: local[word] for word in words if word in local}
+
+        unknown = [word for word in words if word not in transliterations]
+        provider = f"{self.provider}:{from_script}-{to_script}"
+        cached = await self.cache.get_batch(unknown, language, language, [provider])
+        missing = []
+        for word, transliteration in zip(unknown, cached):
+            if transliteration is None:
+                missing.append(word)
+            else:
+                transliterations[word] = transliteration
+
+        if missing:
+            results = await self.transliterator.transliterate_batch(
+                missing, language, from_script, to_script
+            )
+            await self.cache.set_batch(missing, language, language, provider, results)
+            transliterations.update(zip(missing, results))
+
+        return [
+            "".join(
+                transliterations.get(part.lower(), part) if i % 2 else part
+                for i, part in enumerate(text_parts)
+            )
+            for text_parts in parts
+        ]
@@ -0,0 +1,74 @@
+import asyncio
+import httpx
+import pytest
+from jugalbandi.core import SingletonMeta
+from jugalbandi.core.bhashini import (
+    BhashiniPipelineConfig,
+    BhashiniPipelineConfigCache,
+)
+
+
+def _config_response(service_id: str):
+    return {
+        "languages": [{"sourceLanguage": "hi", "targetLanguageList": ["en"]}],
+        "pipelineResponseConfig": [{"config": [{"serviceId": service_id}]}],
+        "pipelineInferenceAPIEndPoint": {
+            "inferenceApiKey": {"name": "Authorization", "value": "key"}
+        },
+    }
+
+
+@pytest.fixture
+def config_cache():
+    SingletonMeta._instances.pop(BhashiniPipelineConfigCache, None)
+    cache = BhashiniPipelineConfigCache()
+    cache.loads = 0
+
+    async def _load(key):
+        cache.loads += 1
+        await asyncio.sleep(0.01)
+        config = BhashiniPipelineConfig(_config_response(f"service-{cache.loads}"))
+        cache._configs[key] = config
+        return config
+
+    cache._load = _load
+    yield cache
+    SingletonMeta._instances.pop(BhashiniPipelineConfigCache, None)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_shared(config_cache):
+    configs = await asyncio.gather(
+        *(config_cache.get("translation", "hi", "en") for _ in range(10))
+    )
+
+    assert config_cache.loads == 1
+    assert all(config is configs[0] for config in configs)
+    assert configs[0].service_id == "service-1"
+    assert await config_cache.get("translation", "hi", "en") is configs[0]
+
+
+@pytest.mark.asyncio
+async def test_background_refresh(config_cache):
+    config = await config_cache.get("asr", "hi")
+    config.fetched_at -= config_cache.refresh_after
+
+    # the old config is served while a new one is loaded
+    assert await config_cache.get("asr", "hi") is config
+    await asyncio.gather(*config_cache._refreshes)
+    assert (await config_cache.get("asr", "hi")).service_id == "service-2"
+
+
+@pytest.mark.asyncio
+async def test_stale_config_is_reloaded(config_cache):
+    service_ids = []
+
+    async def _request(config: BhashiniPipelineConfig) -> httpx.Response:
+        service_ids.append(config.service_id)
+        status_code = 403 if config.service_id == "service-1" else 200
+        return httpx.Response(status_code)
+
+    response = await config_cache.infer("translation", "hi", "en", _request)
+
+    assert response.status_code == 200
+    assert service_ids == ["service-1", "service-2"]
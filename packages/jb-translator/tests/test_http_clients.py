@@ -0,0 +1,37 @@
+import pytest
+import pytest_asyncio
+from jugalbandi.core import HttpClients, SingletonMeta
+
+
+@pytest_asyncio.fixture()
+async def http_clients():
+    SingletonMeta._instances.pop(HttpClients, None)
+    http_clients = HttpClients()
+    yield http_clients
+    await http_clients.close()
+    SingletonMeta._instances.pop(HttpClients, None)
+
+
+@pytest.mark.asyncio
+async def test_http_clients_are_shared(http_clients):
+    client = http_clients.httpx_client("bhashini")
+    assert HttpClients().httpx_client("bhashini") is client
+    assert http_clients.httpx_client("bhashini-config") is not client
+    assert client.timeout.read == 60
+
+    session = http_clients.aiohttp_session("azure-translator", ssl=False)
+    assert http_clients.aiohttp_session("azure-translator", ssl=False) is session
+
+    sdk_client = http_clients.client("google-translate", object)
+    assert http_clients.client("google-translate", object) is sdk_client
+
+
+@pytest.mark.asyncio
+async def test_http_clients_recreated_after_close(http_clients):
+    client = http_clients.httpx_client("bhashini")
+    session = http_clients.aiohttp_session("azure-translator")
+    await http_clients.close()
+    assert client.is_closed
+    assert session.closed
+    assert http_clients.httpx_client("bhashini") is not client
+    assert http_clients.aiohttp_session("azure-translator") is not session
@@ -0,0 +1,73 @@
+from typing import List
+import pytest
+from jugalbandi.core import Language
+from jugalbandi.translator import (
+    CompositeTranslator,
+    LongTextTranslator,
+    TranslationCache,
+    Translator,
+)
+from jugalbandi.translator.segmentation import split_segments
+
+
+class UpperTranslator(Translator):
+    def __init__(self):
+        self.requests: List[List[str]] = []
+
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        return text.upper()
+
+    async def translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        self.requests.append(texts)
+        return [text.upper() for text in texts]
+
+
+def test_split_segments_english():
+    text = "  See Sec. 5 of the Act, e.g. this one! Is it?\n\nNew paragraph."
+    segments = split_segments(text, Language.EN, 100)
+    assert segments == [
+        ("", "  "),
+        ("See Sec. 5 of the Act, e.g. this one!", " "),
+        ("Is it?", "\n\n"),
+        ("New paragraph.", ""),
+    ]
+    assert "".join(sentence + space for sentence, space in segments) == text
+
+
+def test_split_segments_indic_and_long():
+    segments = split_segments("यह एक वाक्य है। दूसरा वाक्य॥ तीसरा", Language.HI, 100)
+    assert [sentence for sentence, _ in segments] == [
+        "यह एक वाक्य है।",
+        "दूसरा वाक्य॥",
+        "तीसरा",
+    ]
+    text = "one two three four five six"
+    segments = split_segments(text, Language.EN, 10)
+    assert all(len(sentence) <= 10 for sentence, _ in segments)
+    assert "".join(sentence + space for sentence, space in segments) == text
+
+
+@pytest.mark.asyncio
+async def test_long_text_translator():
+    provider = UpperTranslator()
+    translator = LongTextTranslator(
+        CompositeTranslator(provider, cache=TranslationCache()),
+        min_chars=20,
+        max_request_chars=30,
+    )
+    text = "First sentence. Second one here.\nFirst sentence. Last!"
+    translation = await translator.translate_text(text, Language.EN, Language.HI)
+    assert translation == text.upper()
+    # the repeated sentence is translated once, requests stay small
+    assert sorted(sum(provider.requests, [])) == sorted(
+        ["First sentence.", "Second one here.", "Last!"]
+    )
+    assert all(sum(map(len, request)) <= 30 for request in provider.requests)
+
+    await translator.translate_text("Last! First sentence.", Language.EN, Language.HI)
+    assert len(sum(provider.requests, [])) == 3
+    assert await translator.translate_text("short", Language.EN, Language.HI) == "SHORT"
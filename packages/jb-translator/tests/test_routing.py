@@ -0,0 +1,96 @@
+import asyncio
+from typing import List
+import pytest
+from jugalbandi.core import Language, routing
+from jugalbandi.translator import CompositeTranslator, Translator, TranslatorRouter
+
+
+class SleepingTranslator(Translator):
+    def __init__(self, delay: float, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("provider unavailable")
+        return f"{type(self).__name__}:{text}"
+
+
+class SlowTranslator(SleepingTranslator):
+    pass
+
+
+class FastTranslator(SleepingTranslator):
+    pass
+
+
+class BrokenTranslator(SleepingTranslator):
+    pass
+
+
+async def _translate(translator: Translator, times: int) -> List[str]:
+    return [
+        await translator.translate_text("hello", Language.EN, Language.HI)
+        for _ in range(times)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_router_prefers_fastest_provider():
+    slow, fast = SlowTranslator(0.03), FastTranslator(0.001)
+    translator = CompositeTranslator(slow, fast, router=TranslatorRouter())
+
+    # unmeasured providers are tried first, so each is measured once
+    await _translate(CompositeTranslator(fast, router=translator.router), 1)
+    translations = await _translate(translator, 5)
+    assert translations == ["SlowTranslator:hello"] + ["FastTranslator:hello"] * 4
+    assert slow.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_router_opens_circuit(monkeypatch):
+    broken, fast = BrokenTranslator(0, fail=True), FastTranslator(0.001)
+    router = TranslatorRouter()
+    translator = CompositeTranslator(broken, fast, router=router)
+
+    # the broken provider is tried first while it looks fastest
+    await _translate(translator, routing.FAILURE_THRESHOLD + 3)
+    assert broken.calls == routing.FAILURE_THRESHOLD
+    assert router.stats["BrokenTranslator"].circuit_opens == 1
+    assert not router.available("BrokenTranslator", "en", "hi")
+
+    # after the open period a trial request closes the circuit again
+    monkeypatch.setattr(routing, "CIRCUIT_OPEN_SECONDS", 0)
+    broken.fail = False
+    await _translate(CompositeTranslator(broken, router=router), 1)
+    assert router.available("BrokenTranslator", "en", "hi")
+
+
+@pytest.mark.asyncio
+async def test_router_hedges_slow_provider(monkeypatch):
+    monkeypatch.setattr(routing, "MIN_HEDGE_SAMPLES", 1)
+    slow, fast = SlowTranslator(0.001), FastTranslator(0.01)
+    router = TranslatorRouter(hedging=True)
+    translator = CompositeTranslator(slow, fast, router=router)
+    await _translate(CompositeTranslator(slow, router=router), 1)
+    await _translate(CompositeTranslator(fast, router=router), 1)
+
+    # the usually fast provider stalls, the hedge answers
+    slow.delay = 1
+    assert await _translate(translator, 1) == ["FastTranslator:hello"]
+    assert router.stats["FastTranslator"].hedges == 1
+    assert router.stats["FastTranslator"].hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_router_all_providers_fail():
+    translator = CompositeTranslator(
+        BrokenTranslator(0, fail=True), router=TranslatorRouter()
+    )
+    with pytest.raises(ExceptionGroup):
+        await _translate(translator, 1)
@@ -0,0 +1,96 @@
+import asyncio
+from typing import List
+import pytest
+from jugalbandi.core import Language
+from jugalbandi.translator import (
+    BatchTranslator,
+    CompositeTranslator,
+    TranslationCache,
+    Translator,
+)
+from jugalbandi.translator.translator import DEFAULT_BATCH_CONCURRENCY, split_batch
+
+
+class RecordingBatchTranslator(BatchTranslator):
+    max_batch_texts = 2
+    max_batch_chars = 10
+
+    def __init__(self, skip: str = ""):
+        self.skip = skip
+        self.requests: List[List[str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _translate_batch(
+        self, texts: List[str], source_language: Language, destination_language: Language
+    ) -> List[str]:
+        self.requests.append(texts)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return ["" if text == self.skip else text.upper() for text in texts]
+
+
+class FailingTranslator(Translator):
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        raise ValueError("provider unavailable")
+
+
+def test_split_batch():
+    texts = ["a", "bb", "ccccccccccc", "d", "e", "f"]
+    assert list(split_batch(texts, 2, 10)) == [
+        ["a", "bb"],
+        ["ccccccccccc"],
+        ["d", "e"],
+        ["f"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_translator_splits_requests():
+    translator = RecordingBatchTranslator()
+    translations = await translator.translate_batch(
+        ["one", "two", "three"], Language.EN, Language.HI
+    )
+    assert translations == ["ONE", "TWO", "THREE"]
+    assert translator.requests == [["one", "two"], ["three"]]
+
+
+@pytest.mark.asyncio
+async def test_batch_translator_bounds_concurrent_requests():
+    translator = RecordingBatchTranslator()
+    texts = [f"text {i}" for i in range(4 * DEFAULT_BATCH_CONCURRENCY)]
+    translations = await translator.translate_batch(texts, Language.EN, Language.HI)
+    assert translations == [text.upper() for text in texts]
+    assert len(translator.requests) == len(texts)
+    assert translator.max_in_flight == DEFAULT_BATCH_CONCURRENCY
+
+
+@pytest.mark.asyncio
+async def test_composite_translate_batch_falls_back_per_item():
+    first = RecordingBatchTranslator(skip="two")
+    second = RecordingBatchTranslator()
+    translator = CompositeTranslator(
+        FailingTranslator(), first, second, cache=TranslationCache()
+    )
+
+    translations = await translator.translate_batch(
+        ["one", "", "two"], Language.EN, Language.HI
+    )
+    assert translations == ["ONE", "", "TWO"]
+    assert first.requests == [["one", "two"]]
+    assert second.requests == [["two"]]
+
+    assert await translator.translate_text("two", Language.EN, Language.HI) == "TWO"
+    assert second.requests == [["two"]]
+
+
+@pytest.mark.asyncio
+async def test_composite_translate_batch_failure():
+    translator = CompositeTranslator(FailingTranslator(), FailingTranslator())
+    with pytest.raises(ExceptionGroup) as exc_info:
+        await translator.translate_batch(["one", "two"], Language.EN, Language.HI)
+    assert len(exc_info.value.exceptions) == 2
@@ -0,0 +1,75 @@
+import pytest
+from jugalbandi.core import Language
+from jugalbandi.translator import (
+    CachingTranslator,
+    CompositeTranslator,
+    SqliteTranslationStore,
+    TranslationCache,
+    Translator,
+)
+
+
+class CountingTranslator(Translator):
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    async def translate_text(
+        self, text: str, source_language: Language, destination_language: Language
+    ) -> str:
+        self.calls += 1
+        if self.fail:
+            raise ValueError("provider unavailable")
+        return f"{destination_language.name}:{text.strip()}"
+
+
+class OtherTranslator(CountingTranslator):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_composite_translator_cache(tmp_path):
+    store = SqliteTranslationStore(str(tmp_path / "translations.db"))
+    failing, other = CountingTranslator(fail=True), OtherTranslator()
+    translator = CompositeTranslator(
+        failing, other, cache=TranslationCache(store=store)
+    )
+
+    translation = await translator.translate_text("hello  world", Language.EN, Language.HI)
+    assert translation == "HI:hello  world"
+    assert (failing.calls, other.calls) == (1, 1)
+
+    # normalized text hits the cache before any provider is tried
+    assert (
+        await translator.translate_text(" hello world\n", Language.EN, Language.HI)
+        == translation
+    )
+    assert (failing.calls, other.calls) == (1, 1)
+    await translator.translate_text("hello world", Language.EN, Language.KN)
+    assert other.calls == 2
+
+    # a new process finds the translation in the store
+    store.close()
+    restarted = CompositeTranslator(
+        CountingTranslator(),
+        OtherTranslator(),
+        cache=TranslationCache(store=SqliteTranslationStore(store.path)),
+    )
+    assert (
+        await restarted.translate_text("hello world", Language.EN, Language.HI)
+        == translation
+    )
+    assert [t.calls for t in restarted.translators] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_caching_translator_keyed_by_provider():
+    cache = TranslationCache()
+    first = CachingTranslator(CountingTranslator(), cache)
+    second = CachingTranslator(OtherTranslator(), cache)
+
+    await first.translate_text("hello", Language.EN, Language.HI)
+    await first.translate_text("hello", Language.EN, Language.HI)
+    await second.translate_text("hello", Language.EN, Language.HI)
+    assert first.translator.calls == 1
+    assert second.translator.calls == 1
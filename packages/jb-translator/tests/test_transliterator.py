@@ -0,0 +1,38 @@
+from typing import List
+import pytest
+from jugalbandi.core import Language
+from jugalbandi.translator import (
+    CachingTransliterator,
+    TranslationCache,
+    Transliterator,
+)
+
+
+class RecordingTransliterator(Transliterator):
+    def __init__(self):
+        self.requests: List[List[str]] = []
+
+    async def transliterate_batch(
+        self, texts: List[str], language: Language, from_script: str, to_script: str
+    ) -> List[str]:
+        self.requests.append(texts)
+        return [f"<{text}>" for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_caching_transliterator():
+    provider = RecordingTransliterator()
+    transliterator = CachingTransliterator(provider, TranslationCache())
+
+    transliterations = await transliterator.transliterate_batch(
+        ["Mera case kya hai?", "bail, bail 2 baar"], Language.HI, "Latn", "Deva"
+    )
+    assert transliterations == ["मेरा <case> क्या है?", "<bail>, <bail> 2 <baar>"]
+    # common words are transliterated locally, other words once
+    assert provider.requests == [["case", "bail", "baar"]]
+
+    assert (
+        await transliterator.transliterate_text("case kya", Language.HI, "Latn", "Deva")
+        == "<case> क्या"
+    )
+    assert len(provider.requests) == 1